@@ -101,6 +101,41 @@ class OverheadSuite:
             )
 
 
+class VectorizedNUTSSuite:
+    """
+    Compares sampling many chains of a small model in lockstep in one process
+    against sampling them one after the other
+    """
+
+    params = [4, 16, 64]
+    param_names = ["chains"]
+    timeout = 360.0
+    timer = timeit.default_timer
+
+    def setup(self, chains):
+        self.n_steps = 500
+        with pm.Model() as self.model:
+            pm.Normal("x", mu=0, sigma=1, shape=3)
+
+    def _sample(self, chains, **kwargs):
+        with self.model:
+            pm.sample(
+                self.n_steps,
+                tune=self.n_steps,
+                chains=chains,
+                random_seed=1,
+                progressbar=False,
+                compute_convergence_checks=False,
+                **kwargs,
+            )
+
+    def time_vectorized(self, chains):
+        self._sample(chains, chain_method="vectorized")
+
+    def time_sequential(self, chains):
+        self._sample(chains, cores=1)
+
+
 class ExampleSuite:
     """Implements examples to keep up with benchmarking them."""
 
@@ -16,6 +16,23 @@
 
 The NDArray (pymc.backends.NDArray) backend holds the entire trace in memory.
 
+The ChunkedNPY (pymc.backends.ChunkedNPY) backend writes the trace to one
+``.npy`` file per variable in chunks of draws, and reads it back lazily.
+It is selected by passing an instance to the `trace` argument of `sample`.
+
+    >>> trace = pm.sample(trace=pm.backends.ChunkedNPY("trace_dir"))
+
+The draws written by an interrupted run can be recovered with
+`pymc.backends.load_chunked_npy`.
+
+Both backends can keep running statistics of the draws after tuning, that are
+updated with every recorded draw, when they are created with ``online_stats=True``.
+They can be polled while sampling, e.g. from a `callback`, without reading the
+stored draws.
+
+    >>> trace.online_stats.mean('x'), trace.online_stats.ess('x')  # of one chain
+    >>> mtrace.get_online_stats()  # combined over all chains
+
 Selecting values from a backend
 -------------------------------
 
@@ -65,6 +82,7 @@ from typing import Dict, List, Optional
 
 from pymc.backends.arviz import predictions_to_inference_data, to_inference_data
 from pymc.backends.base import BaseTrace
+from pymc.backends.chunked import ChunkedNPY, load_chunked_npy
 from pymc.backends.ndarray import NDArray, point_list_to_multitrace
 
 __all__ = ["to_inference_data", "predictions_to_inference_data"]
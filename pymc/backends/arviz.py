@@ -1,5 +1,7 @@
 """PyMC-ArviZ conversion code."""
 import logging
+import os
+import re
 import warnings
 
 from typing import (  # pylint: disable=unused-import
@@ -129,7 +131,7 @@ class _DefaultTrace:
         # initialize if necessary
         if k not in self.trace_dict:
             array_shape = (self._len,) + value_shape
-            self.trace_dict[k] = np.empty(array_shape, dtype=np.array(v).dtype)
+            self.trace_dict[k] = self._allocate(k, array_shape, np.array(v).dtype)
 
         # do the actual insertion
         if value_shape == ():
@@ -137,6 +139,78 @@ class _DefaultTrace:
         else:
             self.trace_dict[k][idx, :] = v
 
+    def insert_chunk(self, k: str, v: np.ndarray, idx: slice):
+        """
+        Insert the values of several consecutive samples for the variable `k`.
+
+        Parameters
+        ----------
+        k: str
+            Name of the variable.
+        v: numpy array
+            The values of the samples, stacked along the first dimension.
+        idx: slice
+            The indices of the samples we are inserting into the trace.
+        """
+        v = np.asarray(v)
+
+        # initialize if necessary
+        if k not in self.trace_dict:
+            array_shape = (self._len,) + v.shape[1:]
+            self.trace_dict[k] = self._allocate(k, array_shape, v.dtype)
+
+        self.trace_dict[k][idx] = v
+
+    def _allocate(self, k: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        return np.empty(shape, dtype=dtype)
+
+    def flush(self):
+        """Make sure that all inserted samples are stored."""
+
+
+def _sanitize_filename(name: str) -> str:
+    """Replace the characters of `name` that are unsafe in file names by ``_``."""
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+class _MemmapTrace(_DefaultTrace):
+    """
+    Utility for collecting samples into memory-mapped ``.npy`` files.
+
+    Works like :class:`_DefaultTrace`, but every variable is stored in the file
+    ``<k>.npy`` inside of `directory`, so that the samples are written to disk as
+    they are inserted instead of being kept in memory. The arrays in ``trace_dict``
+    are memory maps of these files, whose values are only read when accessed.
+
+    Characters of the variable names that are not letters, digits, ``_``, ``-`` or ``.``
+    are replaced by ``_`` in the file names. Existing files are never overwritten.
+
+    Parameters
+    ----------
+    samples : int
+        The number of samples that will be collected, per variable,
+        into the trace.
+    directory : str or path
+        Directory in which the ``.npy`` files are created. It is created if it doesn't exist.
+    """
+
+    def __init__(self, samples: int, directory: Union[str, os.PathLike]):
+        super().__init__(samples)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _allocate(self, k: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        filename = os.path.join(self.directory, f"{_sanitize_filename(k)}.npy")
+        if os.path.exists(filename):
+            raise FileExistsError(
+                f"Can't store the samples of {k} in {filename}, because the file already exists."
+            )
+        return np.lib.format.open_memmap(filename, mode="w+", dtype=dtype, shape=shape)
+
+    def flush(self):
+        for array in self.trace_dict.values():
+            array.flush()
+
 
 class InferenceDataConverter:  # pylint: disable=too-many-instance-attributes
     """Encapsulate InferenceData specific logic."""
@@ -21,11 +21,12 @@ import logging
 import warnings
 
 from abc import ABC
-from typing import List, Sequence, Tuple, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
 
 import numpy as np
 import pytensor.tensor as at
 
+from pymc.backends.online import OnlineStats, combine_online_stats
 from pymc.backends.report import SamplerReport
 from pymc.model import modelcontext
 from pymc.util import get_var_name
@@ -51,9 +52,12 @@ class BaseTrace(ABC):
         `model.unobserved_RVs` is used.
     test_point: dict
         use different test point that might be with changed variables shapes
+    online_stats: bool
+        If True, keep running statistics of the draws after tuning in `online_stats`,
+        which are updated with every recorded draw. See :class:`~pymc.backends.online.OnlineStats`.
     """
 
-    def __init__(self, name, model=None, vars=None, test_point=None):
+    def __init__(self, name, model=None, vars=None, test_point=None, online_stats=False):
         self.name = name
 
         model = modelcontext(model)
@@ -82,6 +86,8 @@ class BaseTrace(ABC):
         self.chain = None
         self._is_base_setup = False
         self.sampler_vars = None
+        self._track_online_stats = online_stats
+        self.online_stats: Optional[OnlineStats] = None
 
     # Sampling methods
 
@@ -116,6 +122,14 @@ class BaseTrace(ABC):
         """
         self._set_sampler_vars(sampler_vars)
         self._is_base_setup = True
+        if self._track_online_stats and len(self) == 0:
+            # Copies of a trace for other chains must not share the statistics
+            self.online_stats = OnlineStats(self.var_shapes)
+
+    def _update_online_stats(self, values, sampler_stats) -> None:
+        """Add a recorded draw to the running statistics, if they are tracked."""
+        if self.online_stats is not None:
+            self.online_stats.update(dict(zip(self.varnames, values)), sampler_stats)
 
     def record(self, point, sampler_states=None):
         """Record results of a sampling iteration.
@@ -518,9 +532,42 @@ class MultiTrace:
         ]
         return _squeeze_cat(results, combine, squeeze)
 
+    def get_online_stats(self, chains=None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Get the running statistics of the draws after tuning, combined over chains.
+
+        Requires traces that were created with ``online_stats=True``. The statistics
+        are computed while sampling, and do not read the stored draws.
+
+        Parameters
+        ----------
+        chains: int or list of ints, optional
+            Chains to combine. Defaults to all chains.
+
+        Returns
+        -------
+        A dictionary with the ``"mean"``, ``"sd"``, ``"ess"`` and ``"r_hat"`` of every
+        variable, and the total number of divergences under the key ``"diverging"``.
+        """
+        if chains is None:
+            chains = self.chains
+        try:
+            chains = iter(chains)
+        except TypeError:
+            chains = [chains]
+
+        stats = [self._straces[chain].online_stats for chain in chains]
+        if any(chain_stats is None for chain_stats in stats):
+            raise ValueError("The traces were not created with online_stats=True.")
+        summary: Dict[str, Any] = combine_online_stats(stats)
+        summary["diverging"] = sum(chain_stats.n_divergences for chain_stats in stats)
+        return summary
+
     def _slice(self, slice):
         """Return a new MultiTrace object sliced according to `slice`."""
         new_traces = [trace._slice(slice) for trace in self._straces.values()]
+        # The running statistics always describe all draws of the chain after tuning
+        for new_trace, old_trace in zip(new_traces, self._straces.values()):
+            new_trace.online_stats = old_trace.online_stats
         trace = MultiTrace(new_traces)
         idxs = slice.indices(len(self))
         trace._report = self._report._slice(*idxs)
@@ -0,0 +1,327 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Chunked NPY trace backend
+
+Store sampling values on disk, with one ``.npy`` file per variable and
+sampler statistic, that are written in chunks of draws.
+"""
+
+import json
+import os
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from pymc.backends import base
+from pymc.backends.base import MultiTrace
+from pymc.model import Model, modelcontext
+
+__all__ = ["ChunkedNPY", "load_chunked_npy"]
+
+_META_FILE = "meta.json"
+_STAT_PREFIX = "__stat"
+
+
+class ChunkedNPY(base.BaseTrace):
+    """Chunked NPY trace object
+
+    The draws of every chain are stored in the subdirectory ``chain-<chain>`` of
+    the directory `name`, with one memory-mapped ``.npy`` file per variable and per
+    sampler statistic. Draws are collected in a buffer of `buffer_size` draws, which
+    is written to disk whenever it is full, so that only the buffer has to be held in
+    memory, and the draws written so far can be recovered with :func:`load_chunked_npy`
+    if the sampling is interrupted. Values are read lazily from the files when they
+    are selected.
+
+    Sampler statistics with an ``object`` dtype (such as warnings) can not be stored
+    in memory-mapped files, and are kept in memory instead.
+
+    Parameters
+    ----------
+    name: str
+        Directory in which the trace is stored.
+    model: Model
+        If None, the model is taken from the `with` context.
+    vars: list of variables
+        Sampling values will be stored for these variables. If None,
+        `model.unobserved_RVs` is used.
+    buffer_size: int
+        Number of draws that are buffered in memory before they are written to disk.
+    online_stats: bool
+        If True, keep running statistics of the draws in `online_stats`.
+    """
+
+    def __init__(
+        self, name, model=None, vars=None, test_point=None, buffer_size=100, online_stats=False
+    ):
+        if name is None:
+            raise ValueError("The ChunkedNPY backend requires the name of a directory.")
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size must be a positive integer, but is {buffer_size}.")
+        super().__init__(name, model, vars, test_point, online_stats)
+        self.buffer_size = buffer_size
+        self.draw_idx = 0
+        self.draws = None
+        self.samples: Dict[str, np.ndarray] = {}
+        self._stats: Optional[List[Dict[str, np.ndarray]]] = None
+        self._flushed_idx = 0
+        self._buffer_len = buffer_size
+        self._buffer: Dict[str, np.ndarray] = {}
+        self._stats_buffer: List[Dict[str, np.ndarray]] = []
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(self.name, f"chain-{self.chain}")
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    # Sampling methods
+
+    def setup(self, draws, chain, sampler_vars=None) -> None:
+        """Perform chain-specific setup.
+
+        Parameters
+        ----------
+        draws: int
+            Expected number of draws
+        chain: int
+            Chain number
+        sampler_vars: list of dicts
+            Names and dtypes of the variables that are
+            exported by the samplers.
+        """
+        super().setup(draws, chain, sampler_vars)
+        if len(self) > 0:
+            raise ValueError("Continuation of traces is no longer supported.")
+
+        self.chain = chain
+        self.draws = draws
+        self.draw_idx = 0
+        self._flushed_idx = 0
+        os.makedirs(self.directory, exist_ok=True)
+        buffer_size = self._buffer_len = max(1, min(self.buffer_size, draws))
+
+        self.samples = {}
+        self._buffer = {}
+        for varname, shape in self.var_shapes.items():
+            dtype = self.var_dtypes[varname]
+            self.samples[varname] = np.lib.format.open_memmap(
+                self._filename(varname), mode="w+", dtype=dtype, shape=(draws,) + shape
+            )
+            self._buffer[varname] = np.zeros((buffer_size,) + shape, dtype=dtype)
+
+        self._stats = None
+        self._stats_buffer = []
+        if sampler_vars is not None:
+            self._stats = []
+            for sampler_idx, sampler in enumerate(sampler_vars):
+                data: Dict[str, np.ndarray] = {}
+                buffer: Dict[str, np.ndarray] = {}
+                self._stats.append(data)
+                self._stats_buffer.append(buffer)
+                for varname, dtype in sampler.items():
+                    if np.dtype(dtype) == np.dtype(object):
+                        data[varname] = np.empty(draws, dtype=object)
+                        continue
+                    data[varname] = np.lib.format.open_memmap(
+                        self._filename(f"{_STAT_PREFIX}_{sampler_idx}_{varname}"),
+                        mode="w+",
+                        dtype=dtype,
+                        shape=(draws,),
+                    )
+                    buffer[varname] = np.zeros(buffer_size, dtype=dtype)
+        self._write_meta()
+
+    def record(self, point, sampler_stats=None) -> None:
+        """Record results of a sampling iteration.
+
+        Parameters
+        ----------
+        point: dict
+            Values mapped to variable names
+        """
+        buffer_idx = self.draw_idx - self._flushed_idx
+        values = self.fn(point)
+        for varname, value in zip(self.varnames, values):
+            self._buffer[varname][buffer_idx] = value
+
+        if self._stats is not None and sampler_stats is None:
+            raise ValueError("Expected sampler_stats")
+        if self._stats is None and sampler_stats is not None:
+            raise ValueError("Unknown sampler_stats")
+        if sampler_stats is not None:
+            for data, buffer, vars in zip(self._stats, self._stats_buffer, sampler_stats):
+                for key, val in vars.items():
+                    if key in buffer:
+                        buffer[key][buffer_idx] = val
+                    else:
+                        data[key][self.draw_idx] = val
+        self._update_online_stats(values, sampler_stats)
+        self.draw_idx += 1
+
+        if self.draw_idx - self._flushed_idx == self._buffer_len:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered draws to disk."""
+        n_buffered = self.draw_idx - self._flushed_idx
+        if n_buffered == 0:
+            return
+        idx = slice(self._flushed_idx, self.draw_idx)
+        for varname, values in self.samples.items():
+            values[idx] = self._buffer[varname][:n_buffered]
+            values.flush()
+        for data, buffer in zip(self._stats or [], self._stats_buffer):
+            for varname, values in buffer.items():
+                data[varname][idx] = values[:n_buffered]
+                data[varname].flush()
+        self._flushed_idx = self.draw_idx
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "draws": self._flushed_idx,
+            "varnames": self.varnames,
+            "sampler_vars": [
+                {key: np.dtype(dtype).str for key, dtype in sampler.items()}
+                for sampler in self.sampler_vars or []
+            ],
+        }
+        with open(os.path.join(self.directory, _META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def _get_sampler_stats(self, varname, sampler_idx, burn, thin):
+        self.flush()
+        return self._stats[sampler_idx][varname][: self._flushed_idx][burn::thin]
+
+    def close(self):
+        self.flush()
+        if self.draw_idx == self.draws:
+            return
+        # Remove trailing zeros if interrupted before completed all
+        # draws.
+        self.samples = {var: vtrace[: self.draw_idx] for var, vtrace in self.samples.items()}
+        if self._stats is not None:
+            self._stats = [
+                {var: trace[: self.draw_idx] for var, trace in stats.items()}
+                for stats in self._stats
+            ]
+
+    # Selection methods
+
+    def __len__(self):
+        if not self.samples:  # `setup` has not been called.
+            return 0
+        return self.draw_idx
+
+    def get_values(self, varname: str, burn=0, thin=1) -> np.ndarray:
+        """Get values from trace.
+
+        The values are a view of the memory-mapped file, that is only read
+        when the values are accessed.
+
+        Parameters
+        ----------
+        varname: str
+        burn: int
+        thin: int
+
+        Returns
+        -------
+        A NumPy array
+        """
+        self.flush()
+        return self.samples[varname][: self._flushed_idx][burn::thin]
+
+    def _slice(self, idx):
+        self.flush()
+        idx = slice(*idx.indices(len(self)))
+
+        sliced = ChunkedNPY(self.name, model=self.model, vars=self.vars)
+        sliced.chain = self.chain
+        sliced.samples = {varname: values[idx] for varname, values in self.samples.items()}
+        sliced.sampler_vars = self.sampler_vars
+        sliced.draws = len(range(idx.start, idx.stop, idx.step))
+        sliced.draw_idx = sliced._flushed_idx = sliced.draws
+
+        if self._stats is None:
+            return sliced
+        sliced._stats = [{key: vals[idx] for key, vals in vars.items()} for vars in self._stats]
+        return sliced
+
+    def point(self, idx) -> Dict[str, Any]:
+        """Return dictionary of point values at `idx` for current chain
+        with variable names as keys.
+        """
+        self.flush()
+        idx = int(idx)
+        return {varname: values[idx] for varname, values in self.samples.items()}
+
+
+def load_chunked_npy(name: str, model: Optional[Model] = None) -> MultiTrace:
+    """Load the draws stored by a :class:`ChunkedNPY` backend.
+
+    Only the draws that were written to disk are loaded, so that this can be
+    used to recover the draws of an interrupted sampling run. Sampler statistics
+    with an ``object`` dtype are not stored on disk, and are filled with None.
+
+    Parameters
+    ----------
+    name: str
+        Directory in which the trace was stored.
+    model: Model
+        If None, the model is taken from the `with` context.
+
+    Returns
+    -------
+    MultiTrace
+    """
+    model = modelcontext(model)
+    straces = []
+    for chain_dir in sorted(os.listdir(name)):
+        if not chain_dir.startswith("chain-"):
+            continue
+        with open(os.path.join(name, chain_dir, _META_FILE)) as f:
+            meta = json.load(f)
+        draws = meta["draws"]
+        sampler_vars = [
+            {key: np.dtype(dtype) for key, dtype in sampler.items()}
+            for sampler in meta["sampler_vars"]
+        ] or None
+
+        strace = ChunkedNPY(name, model=model, vars=[model[vn] for vn in meta["varnames"]])
+        strace.chain = int(chain_dir[len("chain-") :])
+        strace._set_sampler_vars(sampler_vars)
+        strace.samples = {
+            varname: np.load(strace._filename(varname), mmap_mode="r")[:draws]
+            for varname in strace.varnames
+        }
+        if sampler_vars is not None:
+            strace._stats = [
+                {
+                    key: np.full(draws, None, dtype=object)
+                    if dtype == np.dtype(object)
+                    else np.load(
+                        strace._filename(f"{_STAT_PREFIX}_{sampler_idx}_{key}"), mmap_mode="r"
+                    )[:draws]
+                    for key, dtype in sampler.items()
+                }
+                for sampler_idx, sampler in enumerate(sampler_vars)
+            ]
+        strace.draws = strace.draw_idx = strace._flushed_idx = draws
+        straces.append(strace)
+    return MultiTrace(straces)
@@ -39,10 +39,12 @@ class NDArray(base.BaseTrace):
     vars: list of variables
         Sampling values will be stored for these variables. If None,
         `model.unobserved_RVs` is used.
+    online_stats: bool
+        If True, keep running statistics of the draws in `online_stats`.
     """
 
-    def __init__(self, name=None, model=None, vars=None, test_point=None):
-        super().__init__(name, model, vars, test_point)
+    def __init__(self, name=None, model=None, vars=None, test_point=None, online_stats=False):
+        super().__init__(name, model, vars, test_point, online_stats)
         self.draw_idx = 0
         self.draws = None
         self.samples = {}
@@ -56,7 +58,7 @@ class NDArray(base.BaseTrace):
         Parameters
         ----------
         draws: int
-            Expected number of draws
+            Expected number of draws. The arrays grow if more draws are recorded.
         chain: int
             Chain number
         sampler_vars: list of dicts
@@ -106,7 +108,10 @@ class NDArray(base.BaseTrace):
         point: dict
             Values mapped to variable names
         """
-        for varname, value in zip(self.varnames, self.fn(point)):
+        if self.draw_idx == self.draws:
+            self._grow()
+        values = self.fn(point)
+        for varname, value in zip(self.varnames, values):
             self.samples[varname][self.draw_idx] = value
 
         if self._stats is not None and sampler_stats is None:
@@ -117,8 +122,20 @@ class NDArray(base.BaseTrace):
             for data, vars in zip(self._stats, sampler_stats):
                 for key, val in vars.items():
                     data[key][self.draw_idx] = val
+        self._update_online_stats(values, sampler_stats)
         self.draw_idx += 1
 
+    def _grow(self) -> None:
+        """Double the length of the arrays, once more draws are recorded than expected."""
+        n_new = max(1, self.draws)
+        for varname, values in self.samples.items():
+            new = np.zeros((n_new,) + values.shape[1:], dtype=values.dtype)
+            self.samples[varname] = np.concatenate([values, new])
+        for data in self._stats or []:
+            for varname, values in data.items():
+                data[varname] = np.concatenate([values, np.zeros(n_new, dtype=values.dtype)])
+        self.draws += n_new
+
     def _get_sampler_stats(self, varname, sampler_idx, burn, thin):
         return self._stats[sampler_idx][varname][burn::thin]
 
@@ -168,7 +185,7 @@ class NDArray(base.BaseTrace):
         sliced.chain = self.chain
         sliced.samples = {varname: values[idx] for varname, values in self.samples.items()}
         sliced.sampler_vars = self.sampler_vars
-        sliced.draw_idx = (idx.stop - idx.start) // idx.step
+        sliced.draw_idx = len(range(idx.start, idx.stop, idx.step))
 
         if self._stats is None:
             return sliced
@@ -199,11 +216,11 @@ def _slice_as_ndarray(strace, idx):
         sliced.samples = {
             v: strace.get_values(v, burn=idx.start, thin=idx.step) for v in strace.varnames
         }
-        sliced.draw_idx = (stop - start) // step
+        sliced.draw_idx = len(range(start, stop, step))
     else:
         start, stop, step = idx.indices(len(strace))
         sliced.samples = {v: strace.get_values(v)[start:stop:step] for v in strace.varnames}
-        sliced.draw_idx = (stop - start) // step
+        sliced.draw_idx = len(range(start, stop, step))
 
     return sliced
 
@@ -0,0 +1,148 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Running statistics of the draws of a chain, that are updated while sampling."""
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+__all__ = ["OnlineStats", "combine_online_stats"]
+
+
+class OnlineStats:
+    """Running mean, variance and effective sample size of the draws of one chain.
+
+    The statistics are updated with every recorded draw in constant time and memory,
+    so that they can be polled during sampling without reading the trace. The mean and
+    variance are computed with Welford's algorithm. The effective sample size is a
+    batch-means estimate: the draws are summed in at most ``2 * max_batches`` batches,
+    and whenever they are all filled, neighbouring batches are merged and the batch
+    size is doubled. Draws during tuning are not included.
+
+    Parameters
+    ----------
+    var_shapes: dict
+        Shapes of the variables, by name.
+    batch_size: int
+        Initial number of draws per batch of the ESS estimate.
+    max_batches: int
+        Minimum number of batches that are kept once the batch size starts growing.
+    """
+
+    def __init__(
+        self, var_shapes: Dict[str, Tuple[int, ...]], batch_size: int = 10, max_batches: int = 32
+    ):
+        if batch_size < 1 or max_batches < 2:
+            raise ValueError("batch_size must be positive and max_batches at least 2.")
+        self.n_draws = 0
+        self.n_divergences = 0
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._mean = {name: np.zeros(shape) for name, shape in var_shapes.items()}
+        self._m2 = {name: np.zeros(shape) for name, shape in var_shapes.items()}
+        self._batches = {
+            name: np.zeros((2 * max_batches,) + shape) for name, shape in var_shapes.items()
+        }
+        self._batch_sum = {name: np.zeros(shape) for name, shape in var_shapes.items()}
+        self._n_batches = 0
+        self._n_in_batch = 0
+
+    def update(
+        self, values: Dict[str, np.ndarray], sampler_stats: Optional[Sequence[Dict[str, Any]]]
+    ) -> None:
+        """Add a draw with the values of the variables and the stats of the samplers."""
+        if sampler_stats is not None:
+            if any(stats.get("tune", False) for stats in sampler_stats):
+                return
+            self.n_divergences += int(any(stats.get("diverging", False) for stats in sampler_stats))
+
+        self.n_draws += 1
+        self._n_in_batch += 1
+        for name, value in values.items():
+            mean = self._mean[name]
+            delta = value - mean
+            mean += delta / self.n_draws
+            self._m2[name] += delta * (value - mean)
+            self._batch_sum[name] += value
+
+        if self._n_in_batch < self.batch_size:
+            return
+        for name, batch_sum in self._batch_sum.items():
+            self._batches[name][self._n_batches] = batch_sum
+            batch_sum[...] = 0
+        self._n_batches += 1
+        self._n_in_batch = 0
+        if self._n_batches == 2 * self.max_batches:
+            for batches in self._batches.values():
+                batches[: self.max_batches] = batches[0::2] + batches[1::2]
+                batches[self.max_batches :] = 0
+            self._n_batches = self.max_batches
+            self.batch_size *= 2
+
+    def mean(self, varname: str) -> np.ndarray:
+        """Mean of the draws of a variable."""
+        if self.n_draws == 0:
+            return np.full_like(self._mean[varname], np.nan)
+        return self._mean[varname].copy()
+
+    def var(self, varname: str) -> np.ndarray:
+        """Sample variance of the draws of a variable."""
+        if self.n_draws < 2:
+            return np.full_like(self._m2[varname], np.nan)
+        return self._m2[varname] / (self.n_draws - 1)
+
+    def ess(self, varname: str) -> np.ndarray:
+        """Batch-means estimate of the effective sample size of a variable."""
+        if self._n_batches < 2:
+            return np.full_like(self._mean[varname], np.nan)
+        batch_means = self._batches[varname][: self._n_batches] / self.batch_size
+        # The asymptotic variance of the mean is estimated from the variance of the batch means
+        asymptotic_var = self.batch_size * np.var(batch_means, axis=0, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.n_draws * self.var(varname) / asymptotic_var
+
+
+def combine_online_stats(stats: Sequence[OnlineStats]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Combine the running statistics of several chains.
+
+    Returns a dictionary with the ``"mean"``, ``"sd"``, ``"ess"`` (summed over the
+    chains) and ``"r_hat"`` (the Gelman-Rubin statistic from the means and variances
+    of the chains) of every variable.
+    """
+    n_draws = np.array([chain.n_draws for chain in stats])
+    summary = {}
+    for name in stats[0]._mean:
+        means = np.stack([chain.mean(name) for chain in stats])
+        variances = np.stack([chain.var(name) for chain in stats])
+        weights = (n_draws / n_draws.sum()).reshape((-1,) + (1,) * (means.ndim - 1))
+        mean = np.sum(weights * means, axis=0)
+        # Pooled variance of all draws, from the variances within and between the chains
+        var = np.sum(weights * (variances + (means - mean) ** 2), axis=0)
+        summary[name] = {
+            "mean": mean,
+            "sd": np.sqrt(var),
+            "ess": np.sum([chain.ess(name) for chain in stats], axis=0),
+            "r_hat": _r_hat(means, variances, n_draws.mean()),
+        }
+    return summary
+
+
+def _r_hat(means: np.ndarray, variances: np.ndarray, n: float) -> np.ndarray:
+    if len(means) < 2:
+        return np.full_like(means[0], np.nan)
+    within = np.mean(variances, axis=0)
+    between_by_n = np.var(means, axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(((n - 1) / n * within + between_by_n) / within)
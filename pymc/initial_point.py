@@ -149,7 +149,12 @@ def make_initial_point_fn(
     # Replace original rng shared variables so that we don't mess with them
     # when calling the final seeded function
     initial_values = replace_rng_nodes(initial_values)
-    func = compile_pymc(inputs=[], outputs=initial_values, mode=pytensor.compile.mode.FAST_COMPILE)
+    # The compiled function can be a copy of a cached one, whose graph holds other RNG
+    # variables than the ones it uses, so they are collected before compiling
+    rngs = find_rng_nodes(initial_values)
+    func = compile_pymc(
+        inputs=[], outputs=initial_values, mode=pytensor.compile.mode.FAST_COMPILE, cache=True
+    )
 
     varnames = []
     for var in model.free_RVs:
@@ -161,9 +166,6 @@ def make_initial_point_fn(
         varnames.append(name)
 
     def make_seeded_function(func):
-
-        rngs = find_rng_nodes(func.maker.fgraph.outputs)
-
         @functools.wraps(func)
         def inner(seed, *args, **kwargs):
             reseed_rngs(rngs, seed)
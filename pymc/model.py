@@ -17,6 +17,7 @@ import threading
 import types
 import warnings
 
+from collections import defaultdict
 from sys import modules
 from typing import (
     TYPE_CHECKING,
@@ -39,6 +40,7 @@ import pytensor.sparse as sparse
 import pytensor.tensor as at
 import scipy.sparse as sps
 
+from cachetools import LRUCache
 from pytensor.compile.sharedvalue import SharedVariable
 from pytensor.graph.basic import Constant, Variable, graph_inputs
 from pytensor.graph.fg import FunctionGraph
@@ -69,6 +71,7 @@ from pymc.pytensorf import (
     gradient,
     hessian,
     inputvars,
+    join_nonshared_inputs,
     replace_rvs_by_values,
 )
 from pymc.util import (
@@ -78,6 +81,7 @@ from pymc.util import (
     get_transformed_name,
     get_value_vars_from_user_vars,
     get_var_name,
+    hash_key,
     treedict,
     treelist,
 )
@@ -303,6 +307,13 @@ class ValueGradFunction:
         back from the array dtype to the variable dtype.
     compute_grads: bool, default=True
         If False, return only the logp, not the gradient.
+    ravel_inputs: bool, default=False
+        If True, the compiled function takes a single flat vector with the values of
+        `grad_vars` and returns the gradient as a single flat vector, so that the
+        values do not have to be split and joined for every call.
+    initial_point: dict, optional
+        Values of `grad_vars` that determine their shapes. Required if `ravel_inputs`
+        is True.
     kwargs
         Extra arguments are passed on to `pytensor.function`.
 
@@ -323,6 +334,8 @@ class ValueGradFunction:
         dtype=None,
         casting="no",
         compute_grads=True,
+        ravel_inputs=False,
+        initial_point=None,
         **kwargs,
     ):
         if extra_vars_and_values is None:
@@ -384,9 +397,29 @@ class ValueGradFunction:
         else:
             outputs = [cost]
 
-        inputs = grad_vars
+        self._ravel_inputs = ravel_inputs
+        if ravel_inputs:
+            if initial_point is None:
+                raise ValueError("initial_point is required to ravel the inputs.")
+            if compute_grads:
+                outputs = [cost, at.concatenate([grad.ravel() for grad in grads])]
+            outputs, joined_inputs = join_nonshared_inputs(initial_point, outputs, grad_vars)
+            q = at.vector("q", dtype=self.dtype)
+            outputs = pytensor.clone_replace(
+                outputs, {joined_inputs: q.astype(joined_inputs.dtype)}
+            )
+            if compute_grads:
+                # The gradient is copied into the output buffer of the caller,
+                # so it does not need to be copied out of the function storage
+                outputs = [outputs[0], pytensor.Out(outputs[1].astype(self.dtype), borrow=True)]
+            inputs = [q]
+        else:
+            inputs = grad_vars
 
-        self._pytensor_function = compile_pymc(inputs, outputs, givens=givens, **kwargs)
+        self._pytensor_function = compile_pymc(inputs, outputs, givens=givens, cache=True, **kwargs)
+        if ravel_inputs:
+            # The values are converted to the dtype of the input in `__call__`
+            self._pytensor_function.trust_input = True
 
     def set_weights(self, values):
         if values.shape != (self._n_costs - 1,):
@@ -411,6 +444,17 @@ class ValueGradFunction:
         if not self._extra_are_set:
             raise ValueError("Extra values are not set.")
 
+        if self._ravel_inputs:
+            if isinstance(grad_vars, RaveledVars):
+                grad_vars = grad_vars.data
+            cost, *grads = self._pytensor_function(np.asarray(grad_vars, dtype=self.dtype))
+            if not grads:
+                return cost
+            if grad_out is None:
+                return cost, grads[0].copy()
+            np.copyto(grad_out, grads[0])
+            return cost
+
         if isinstance(grad_vars, RaveledVars):
             grad_vars = list(DictToArrayBijection.rmap(grad_vars).values())
 
@@ -613,7 +657,44 @@ class Model(WithMemoization, metaclass=ContextMeta):
     def isroot(self):
         return self.parent is None
 
-    def logp_dlogp_function(self, grad_vars=None, tempered=False, **kwargs):
+    def _compiled_function(self, name: str, build: Callable[[], Any], *args, **kwargs) -> Any:
+        """Return the function compiled by ``build``, reusing it across calls.
+
+        The functions are kept in an LRU cache of the root model, keyed by ``name``,
+        the model and the arguments ``args`` and ``kwargs`` of the compiling method.
+        The cache is dropped whenever a variable is added or the shapes of the model
+        can change (see ``_clear_compiled_functions``).
+
+        The returned object is shared by all callers and must not be modified. Functions
+        that are handed out to users are copied by ``_compiled_point_func``.
+        """
+        cache = self.root.__dict__.setdefault("_cache", defaultdict(lambda: LRUCache(128)))[
+            "compiled_functions"
+        ]
+        key = (name, self) + hash_key(*args, **kwargs)
+        fn = cache.get(key)
+        if fn is None:
+            fn = cache[key] = build()
+        return fn
+
+    def _compiled_point_func(
+        self, name: str, build: Callable[[], PointFunc], *args, **kwargs
+    ) -> PointFunc:
+        """Return a copy of the ``PointFunc`` compiled by ``build``, see ``_compiled_function``.
+
+        The copy shares the compiled code and the shared variables with the cached
+        function, but changes to it, like setting ``trust_input``, do not affect
+        the other copies.
+        """
+        fn = self._compiled_function(name, build, *args, **kwargs)
+        return PointFunc(fn.f.copy())
+
+    def _clear_compiled_functions(self):
+        cache = self.root.__dict__.get("_cache")
+        if cache is not None:
+            cache.pop("compiled_functions", None)
+
+    def logp_dlogp_function(self, grad_vars=None, tempered=False, ravel_inputs=False, **kwargs):
         """Compile an PyTensor function that computes logp and gradient.
 
         Parameters
@@ -624,6 +705,9 @@ class Model(WithMemoization, metaclass=ContextMeta):
         tempered: bool
             Compute the tempered logp `free_logp + alpha * observed_logp`.
             `alpha` can be changed using `ValueGradFunction.set_weights([alpha])`.
+        ravel_inputs: bool
+            Compile a function that takes the values of `grad_vars` as one flat vector,
+            and returns their gradient as one flat vector. See `ValueGradFunction`.
         """
         if grad_vars is None:
             grad_vars = self.continuous_value_vars
@@ -645,7 +729,11 @@ class Model(WithMemoization, metaclass=ContextMeta):
             for var in self.value_vars
             if var in input_vars and var not in grad_vars
         }
-        return ValueGradFunction(costs, grad_vars, extra_vars_and_values, **kwargs)
+        if ravel_inputs:
+            kwargs["initial_point"] = ip
+        return ValueGradFunction(
+            costs, grad_vars, extra_vars_and_values, ravel_inputs=ravel_inputs, **kwargs
+        )
 
     def compile_logp(
         self,
@@ -666,7 +754,13 @@ class Model(WithMemoization, metaclass=ContextMeta):
             Whether to sum all logp terms or return elemwise logp for each variable.
             Defaults to True.
         """
-        return self.model.compile_fn(self.logp(vars=vars, jacobian=jacobian, sum=sum))
+        return self._compiled_point_func(
+            "compile_logp",
+            lambda: self.model.compile_fn(self.logp(vars=vars, jacobian=jacobian, sum=sum)),
+            vars,
+            jacobian,
+            sum,
+        )
 
     def compile_dlogp(
         self,
@@ -683,7 +777,12 @@ class Model(WithMemoization, metaclass=ContextMeta):
         jacobian:
             Whether to include jacobian terms in logprob graph. Defaults to True.
         """
-        return self.model.compile_fn(self.dlogp(vars=vars, jacobian=jacobian))
+        return self._compiled_point_func(
+            "compile_dlogp",
+            lambda: self.model.compile_fn(self.dlogp(vars=vars, jacobian=jacobian)),
+            vars,
+            jacobian,
+        )
 
     def compile_d2logp(
         self,
@@ -700,7 +799,12 @@ class Model(WithMemoization, metaclass=ContextMeta):
         jacobian:
             Whether to include jacobian terms in logprob graph. Defaults to True.
         """
-        return self.model.compile_fn(self.d2logp(vars=vars, jacobian=jacobian))
+        return self._compiled_point_func(
+            "compile_d2logp",
+            lambda: self.model.compile_fn(self.d2logp(vars=vars, jacobian=jacobian)),
+            vars,
+            jacobian,
+        )
 
     def logp(
         self,
@@ -1108,6 +1212,7 @@ class Model(WithMemoization, metaclass=ContextMeta):
                 )
             self._coords[name] = tuple(coord_values)
         self.dim_lengths[name].set_value(new_length)
+        self._clear_compiled_functions()
         return
 
     def initial_point(self, random_seed: SeedSequenceSeed = None) -> Dict[str, np.ndarray]:
@@ -1123,7 +1228,15 @@ class Model(WithMemoization, metaclass=ContextMeta):
         ip : dict of {str : array_like}
             Maps names of transformed variables to numeric initial values in the transformed space.
         """
-        fn = make_initial_point_fn(model=self, return_transformed=True)
+        # The initial values are compiled into the function, and can be changed through
+        # `rvs_to_initial_values`, so the function is cached by their identity. The cached
+        # entry references them, such that their ids can not be reused by other objects.
+        initvals = tuple(self.rvs_to_initial_values.values())
+        _, fn = self._compiled_function(
+            "initial_point",
+            lambda: (initvals, make_initial_point_fn(model=self, return_transformed=True)),
+            tuple(id(initval) for initval in initvals),
+        )
         return Point(fn(random_seed), model=self)
 
     @property
@@ -1280,6 +1393,8 @@ class Model(WithMemoization, metaclass=ContextMeta):
                 # store it as tuple for immutability as in add_coord
                 self._coords[dname] = tuple(new_coords)
 
+        if values.shape != shared_object.get_value(borrow=True).shape:
+            self._clear_compiled_functions()
         shared_object.set_value(values)
 
     def register_rv(
@@ -1547,6 +1662,7 @@ class Model(WithMemoization, metaclass=ContextMeta):
         self.named_vars[var.name] = var
         if not hasattr(self, self.name_of(var.name)):
             setattr(self, self.name_of(var.name), var)
+        self._clear_compiled_functions()
 
     @property
     def prefix(self) -> str:
@@ -1646,6 +1762,7 @@ class Model(WithMemoization, metaclass=ContextMeta):
                 allow_input_downcast=True,
                 accept_inplace=True,
                 mode=mode,
+                cache=True,
                 **kwargs,
             )
 
@@ -1703,22 +1820,27 @@ class Model(WithMemoization, metaclass=ContextMeta):
         shapes : dict
             Maps untransformed and transformed variable names to shape tuples.
         """
-        names = []
-        outputs = []
-        for rv in self.free_RVs:
-            transform = self.rvs_to_transforms[rv]
-            if transform is not None:
-                names.append(get_transformed_name(rv.name, transform))
-                outputs.append(transform.forward(rv, *rv.owner.inputs).shape)
-            names.append(rv.name)
-            outputs.append(rv.shape)
-        f = pytensor.function(
-            inputs=[],
-            outputs=outputs,
-            givens=[(obs, self.rvs_to_values[obs]) for obs in self.observed_RVs],
-            mode=pytensor.compile.mode.FAST_COMPILE,
-            on_unused_input="ignore",
-        )
+
+        def compile_shapes_fn():
+            names = []
+            outputs = []
+            for rv in self.free_RVs:
+                transform = self.rvs_to_transforms[rv]
+                if transform is not None:
+                    names.append(get_transformed_name(rv.name, transform))
+                    outputs.append(transform.forward(rv, *rv.owner.inputs).shape)
+                names.append(rv.name)
+                outputs.append(rv.shape)
+            f = pytensor.function(
+                inputs=[],
+                outputs=outputs,
+                givens=[(obs, self.rvs_to_values[obs]) for obs in self.observed_RVs],
+                mode=pytensor.compile.mode.FAST_COMPILE,
+                on_unused_input="ignore",
+            )
+            return names, f
+
+        names, f = self._compiled_function("eval_rv_shapes", compile_shapes_fn)
         return {name: tuple(shape) for name, shape in zip(names, f())}
 
     def check_start_vals(self, start):
@@ -1791,13 +1913,13 @@ class Model(WithMemoization, metaclass=ContextMeta):
             point = self.initial_point()
 
         factors = self.basic_RVs + self.potentials
-        factor_logps_fn = [at.sum(factor) for factor in self.logp(factors, sum=False)]
+        factor_logps_fn = self._compiled_function(
+            "point_logps",
+            lambda: self.compile_fn([at.sum(factor) for factor in self.logp(factors, sum=False)]),
+        )
         return {
             factor.name: np.round(np.asarray(factor_logp), round_vals)
-            for factor, factor_logp in zip(
-                factors,
-                self.compile_fn(factor_logps_fn)(point),
-            )
+            for factor, factor_logp in zip(factors, factor_logps_fn(point))
         }
 
 
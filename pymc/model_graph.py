@@ -452,3 +452,37 @@ def model_to_graphviz(
         )
     model = pm.modelcontext(model)
     return ModelGraph(model).make_graph(var_names=var_names, formatting=formatting)
+
+
+def markov_blanket_terms(model, vars: Sequence[TensorVariable]) -> List[TensorVariable]:
+    """Find the model variables whose logp terms depend on the values of `vars`.
+
+    These are the random variables of `vars` themselves, and all random variables
+    and potentials that depend on them, directly or through deterministics. The sum
+    of their logp terms only differs from the model logp by terms that do not depend
+    on the values of `vars`.
+
+    Parameters
+    ----------
+    model : Model
+    vars : list of TensorVariable
+        Value variables of the model.
+
+    Returns
+    -------
+    List of random variables and potentials that can be passed to `Model.logp`
+    """
+    rvs = {model.values_to_rvs[var] for var in vars}
+    basic_rvs = set(model.basic_RVs)
+
+    def depends_on_vars(graphs):
+        return any(var in rvs for var in ancestors(graphs, blockers=basic_rvs))
+
+    terms = []
+    for rv in model.free_RVs + model.observed_RVs:
+        if rv in rvs or depends_on_vars(rv.owner.inputs):
+            terms.append(rv)
+    for potential in model.potentials:
+        if depends_on_vars([potential]):
+            terms.append(potential)
+    return terms
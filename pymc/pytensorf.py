@@ -11,6 +11,11 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
 import warnings
 
 from typing import (
@@ -32,8 +37,9 @@ import pytensor
 import pytensor.tensor as at
 import scipy.sparse as sps
 
+from cachetools import LRUCache
 from pytensor import scalar
-from pytensor.compile import Function, Mode, get_mode
+from pytensor.compile import Function, Mode, Out, get_mode
 from pytensor.gradient import grad
 from pytensor.graph import node_rewriter, rewrite_graph
 from pytensor.graph.basic import (
@@ -47,6 +53,7 @@ from pytensor.graph.basic import (
 )
 from pytensor.graph.fg import FunctionGraph
 from pytensor.graph.op import Op
+from pytensor.link.basic import Container
 from pytensor.scalar.basic import Cast
 from pytensor.tensor.basic import _as_tensor_variable
 from pytensor.tensor.elemwise import Elemwise
@@ -85,6 +92,7 @@ __all__ = [
     "generator",
     "convert_observed_data",
     "compile_pymc",
+    "set_compile_cache_dir",
     "constant_fold",
 ]
 
@@ -1054,11 +1062,196 @@ def collect_default_updates(
     return rng_updates
 
 
+_compile_cache_dir: Optional[str] = os.environ.get("PYMC_COMPILE_CACHE_DIR") or None
+
+
+def set_compile_cache_dir(directory: Optional[str]) -> None:
+    """Set the directory of the persistent cache of compiled functions.
+
+    The logp and gradient functions of models and the forward sampling functions are
+    stored in the directory after their graphs were rewritten, so that later processes
+    load them instead of rewriting the same graphs again. The entries are keyed by a
+    hash of the structure of the graphs, including the values of constants and the
+    versions of the libraries. The values of shared variables are not part of the key,
+    a loaded function uses the shared variables of the graph it was requested for.
+
+    The cache is disabled by default. It can also be enabled by setting the
+    ``PYMC_COMPILE_CACHE_DIR`` environment variable.
+
+    Parameters
+    ----------
+    directory: str, optional
+        The directory of the cache, or None to disable it.
+    """
+    global _compile_cache_dir
+    _compile_cache_dir = None if directory is None else os.fspath(directory)
+
+
+class _HashWriter:
+    def __init__(self):
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+
+
+class _StructuralPickler(pickle.Pickler):
+    """Pickle a graph without the values of its shared variables, and without the
+    attributes of its variables that differ between processes."""
+
+    def __init__(self, file):
+        super().__init__(file, protocol=4)
+        # In the order in which they are first found in the graph
+        self.shared_variables: List[SharedVariable] = []
+
+    def reducer_override(self, obj):
+        if isinstance(obj, SharedVariable):
+            self.shared_variables.append(obj)
+            return type(obj), (), {"type": obj.type, "name": obj.name}
+        if isinstance(obj, (Variable, Apply)):
+            state = {
+                key: value for key, value in vars(obj).items() if key not in ("auto_name", "tag")
+            }
+            return type(obj), (), state
+        return NotImplemented
+
+
+def _function_cache_key(
+    inputs, outputs, updates: Dict, mode: Mode, kwargs: Dict
+) -> Tuple[Optional[str], List[SharedVariable]]:
+    """Hash the structure of the graph of a function and the arguments it is compiled with.
+
+    Returns None if the function can not be cached, and the shared variables of the graph.
+    """
+    from pymc import __version__
+
+    givens = kwargs.get("givens", [])
+    other_kwargs = sorted((key, value) for key, value in kwargs.items() if key != "givens")
+    if kwargs.get("profile") or any(
+        not isinstance(value, (bool, int, float, str, type(None))) for _, value in other_kwargs
+    ):
+        return None, []
+
+    writer = _HashWriter()
+    pickler = _StructuralPickler(writer)
+    try:
+        pickler.dump(
+            (
+                (sys.version_info[:2], np.__version__, pytensor.__version__, __version__),
+                (type(mode.linker).__name__, str(mode.provided_optimizer)),
+                other_kwargs,
+                inputs,
+                outputs,
+                list(updates.items()),
+                list(givens.items()) if isinstance(givens, dict) else list(givens),
+            )
+        )
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+        return None, []
+    return writer.hash.hexdigest(), pickler.shared_variables
+
+
+def _cached_function_file(key: str) -> str:
+    return os.path.join(_compile_cache_dir, f"{key}.pkl")
+
+
+def _shared_variable_positions(
+    fn: Function, shared_variables: List[SharedVariable]
+) -> Optional[List[int]]:
+    """Positions of the shared variables used by a function in the graph it was compiled for."""
+    positions = []
+    for inp in fn.maker.inputs:
+        if inp.implicit:
+            matches = [pos for pos, var in enumerate(shared_variables) if var is inp.variable]
+            if not matches:
+                return None
+            positions.append(matches[0])
+    return positions
+
+
+def _copy_with_shared_variables(
+    fn: Function, positions: List[int], shared_variables: List[SharedVariable]
+) -> Function:
+    """Copy a function, and let it use the shared variables of another graph."""
+    implicit_inputs = [inp.variable for inp in fn.maker.inputs if inp.implicit]
+    swap = {var: shared_variables[pos] for var, pos in zip(implicit_inputs, positions)}
+    return fn.copy(swap=swap)
+
+
+def _load_cached_function(key: str, shared_variables: List[SharedVariable]) -> Optional[Function]:
+    """Load a function from the cache, and let it use the given shared variables."""
+    filename = _cached_function_file(key)
+    if not os.path.exists(filename):
+        return None
+    try:
+        with open(filename, "rb") as f:
+            fn, positions = pickle.load(f)
+        # The unpickled function has its own copies of the shared variables
+        return _copy_with_shared_variables(fn, positions, shared_variables)
+    except Exception as err:
+        warnings.warn(f"The cached function {filename} could not be loaded: {err}")
+        return None
+
+
+def _save_cached_function(key: str, fn: Function, positions: List[int]) -> None:
+    try:
+        data = pickle.dumps((fn, positions), protocol=-1)
+    except Exception:
+        # Not all functions can be pickled, e.g. if an Op holds a lambda
+        return
+    os.makedirs(_compile_cache_dir, exist_ok=True)
+    filename = _cached_function_file(key)
+    # Replace the file in one step, so that other processes never load a partial entry.
+    # The temporary file has a unique name, because other threads may store the same key.
+    with tempfile.NamedTemporaryFile(dir=_compile_cache_dir, suffix=".tmp", delete=False) as f:
+        f.write(data)
+    os.replace(f.name, filename)
+
+
+# The functions compiled in this process, by the key of their graph, with the positions of
+# their shared variables. They are copied before they are handed out, and compiled against
+# the types of the shared variables, which do not fix the shapes of data containers.
+# So a function is reused when only the values or the shapes of the data have changed.
+_compiled_functions: LRUCache = LRUCache(maxsize=32)
+
+
+def _copy_without_shared_values(fn: Function) -> Function:
+    """Copy a function, and let it use placeholders of its shared variables that hold no value."""
+    swap = {}
+    for inp in fn.maker.inputs:
+        if inp.implicit:
+            var = inp.variable
+            placeholder = var.clone()
+            placeholder.container = Container(
+                placeholder,
+                storage=[None],
+                readonly=var.container.readonly,
+                strict=var.container.strict,
+                allow_downcast=var.container.allow_downcast,
+            )
+            swap[var] = placeholder
+    return fn.copy(swap=swap)
+
+
+def _remember_function(
+    key: str, fn: Function, shared_variables: List[SharedVariable]
+) -> Optional[List[int]]:
+    positions = _shared_variable_positions(fn, shared_variables)
+    if positions is not None:
+        # Keep a copy, so that changes of the returned function, e.g. to `trust_input`,
+        # are not passed on to the functions that are copied from it. The copy does not
+        # use the shared variables of the graph, so that the cache does not keep their
+        # values, like the data of discarded models, alive.
+        _compiled_functions[key] = (_copy_without_shared_values(fn), positions)
+    return positions
+
+
 def compile_pymc(
     inputs,
     outputs,
     random_seed: SeedSequenceSeed = None,
     mode=None,
+    cache: bool = False,
     **kwargs,
 ) -> Function:
     """Use ``pytensor.function`` with specialized pymc rewrites always enabled.
@@ -1077,6 +1270,11 @@ def compile_pymc(
         If not specified, the value of original shared variables will still be overwritten.
     mode: optional
         PyTensor mode used to compile the function
+    cache: bool, default False
+        Whether to reuse a function that was compiled before for a graph of the same
+        structure, which differs at most in the values and shapes of its shared variables.
+        The functions are kept in memory, and in the persistent cache if a directory was
+        set with :func:`set_compile_cache_dir`.
 
     Included rewrites
     -----------------
@@ -1097,7 +1295,9 @@ def compile_pymc(
     """
     # Create an update mapping of RandomVariable's RNG so that it is automatically
     # updated after every function call
-    rng_updates = collect_default_updates(inputs, outputs)
+    output_vars = outputs if isinstance(outputs, (list, tuple)) else [outputs]
+    output_vars = [out.variable if isinstance(out, Out) else out for out in output_vars]
+    rng_updates = collect_default_updates(inputs, output_vars)
 
     # We always reseed random variables as this provides RNGs with no chances of collision
     if rng_updates:
@@ -1118,13 +1318,35 @@ def compile_pymc(
     mode = get_mode(mode)
     opt_qry = mode.provided_optimizer.including("random_make_inplace", check_parameter_opt)
     mode = Mode(linker=mode.linker, optimizer=opt_qry)
+    updates = {**rng_updates, **kwargs.pop("updates", {})}
+
+    cache_key = None
+    if cache:
+        cache_key, shared_variables = _function_cache_key(inputs, outputs, updates, mode, kwargs)
+    if cache_key is not None:
+        persist = _compile_cache_dir is not None
+        if cache_key in _compiled_functions:
+            fn, positions = _compiled_functions[cache_key]
+            if persist and not os.path.exists(_cached_function_file(cache_key)):
+                _save_cached_function(cache_key, fn, positions)
+            return _copy_with_shared_variables(fn, positions, shared_variables)
+        if persist:
+            pytensor_function = _load_cached_function(cache_key, shared_variables)
+            if pytensor_function is not None:
+                _remember_function(cache_key, pytensor_function, shared_variables)
+                return pytensor_function
+
     pytensor_function = pytensor.function(
         inputs,
         outputs,
-        updates={**rng_updates, **kwargs.pop("updates", {})},
+        updates=updates,
         mode=mode,
         **kwargs,
     )
+    if cache_key is not None:
+        positions = _remember_function(cache_key, pytensor_function, shared_variables)
+        if positions is not None and _compile_cache_dir is not None:
+            _save_cached_function(cache_key, pytensor_function, positions)
     return pytensor_function
 
 
@@ -12,5 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from pymc.sampling.deterministic import *
 from pymc.sampling.forward import *
 from pymc.sampling.mcmc import *
+from pymc.sampling.parallel import *
@@ -0,0 +1,114 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Evaluation of model graphs for chunks of posterior draws."""
+
+import numpy as np
+import pytensor
+import pytensor.tensor as at
+
+from fastprogress import progress_bar
+
+from pymc.backends.arviz import _DefaultTrace
+from pymc.pytensorf import clone_replace
+
+
+def _compile_batched_fn(model, rvs, outputs):
+    """Compile a function that evaluates `outputs` for a batch of values of the variables `rvs`.
+
+    The values of every variable are passed by its name, and are mapped to its value
+    variable in ``model.rvs_to_values``. Every input of the returned function has an
+    extra leading dimension, over which the graph is mapped, and the outputs are stacked
+    along the same dimension.
+    """
+    inputs = [model.rvs_to_values[rv] for rv in rvs]
+    batched_inputs = [
+        at.TensorType(inp.dtype, shape=(None, *inp.type.shape))(rv.name)
+        for rv, inp in zip(rvs, inputs)
+    ]
+
+    def step(*values):
+        return clone_replace(outputs, replace=dict(zip(inputs, values)))
+
+    batched_outputs, _ = pytensor.scan(step, sequences=batched_inputs)
+    if not isinstance(batched_outputs, (list, tuple)):
+        batched_outputs = [batched_outputs]
+
+    return model.compile_fn(
+        inputs=batched_inputs,
+        outs=batched_outputs,
+        on_unused_input="ignore",
+        point_fn=False,
+    )
+
+
+def _evaluate_in_chunks(
+    batched_fn,
+    posterior_values,
+    var_names,
+    *,
+    sample_dims,
+    chunk_size,
+    max_memory,
+    dtype,
+    progressbar,
+):
+    """Evaluate a batched function over chunks of posterior draws.
+
+    The values of the variables in `posterior_values` are passed to `batched_fn` by name.
+    The results are written into arrays of shape ``(*sample_dims, *value_shape)`` that are
+    allocated once, so that only one chunk of intermediate values lives in memory at a time.
+    """
+    posterior_values = posterior_values.transpose(*sample_dims, ...)
+    sample_shape = tuple(posterior_values.sizes[dim] for dim in sample_dims)
+    n_pts = int(np.prod(sample_shape))
+    # Flat views over the sample dimensions, no per-draw point dictionaries are created
+    input_arrays = {
+        name: array.values.reshape((n_pts, *array.shape[len(sample_dims) :]))
+        for name, array in posterior_values.data_vars.items()
+    }
+
+    def evaluate(idx):
+        return batched_fn(**{name: array[idx] for name, array in input_arrays.items()})
+
+    trace = _DefaultTrace(n_pts)
+
+    def insert(values, idx):
+        for name, value in zip(var_names, values):
+            if dtype is not None:
+                value = value.astype(dtype, copy=False)
+            trace.insert_chunk(name, value, idx)
+
+    start = 0
+    if max_memory is not None:
+        # Evaluate a single draw to find out how much memory every draw requires
+        first = slice(0, 1)
+        values = evaluate(first)
+        insert(values, first)
+        start = 1
+        bytes_per_draw = sum(value.nbytes for value in values)
+        max_chunk_size = max(1, max_memory // max(bytes_per_draw, 1))
+        chunk_size = max_chunk_size if chunk_size is None else min(chunk_size, max_chunk_size)
+
+    chunks = [slice(i, min(i + chunk_size, n_pts)) for i in range(start, n_pts, chunk_size)]
+    if progressbar:
+        chunks = progress_bar(chunks, total=len(chunks), display=progressbar)
+
+    for idx in chunks:
+        insert(evaluate(idx), idx)
+
+    results = trace.trace_dict
+    for key, array in results.items():
+        results[key] = array.reshape((*sample_shape, *array.shape[1:]))
+    return results
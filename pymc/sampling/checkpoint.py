@@ -0,0 +1,258 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Checkpoints of sampling chains, that allow to resume an interrupted run."""
+
+import io
+import os
+import pickle
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import cloudpickle
+import numpy as np
+
+from pytensor.compile.function.types import Function
+from pytensor.graph.basic import Variable
+
+from pymc.backends.base import BaseTrace
+from pymc.initial_point import PointType
+from pymc.model import Model, ValueGradFunction
+from pymc.pytensorf import PointFunc
+
+# Objects that are not part of the state of a step method. They are not stored
+# in a checkpoint, but taken from the step method that the state is loaded into.
+_EXTERNAL_TYPES = (Model, Variable, Function, PointFunc, ValueGradFunction)
+
+
+class ChainCheckpoint(NamedTuple):
+    """The state of a chain after `draw` draws, with its draws from `start` on."""
+
+    draw: int
+    point: PointType
+    step_state: bytes
+    random_state: Any
+    samples: Dict[str, np.ndarray]
+    stats: Optional[List[Dict[str, np.ndarray]]]
+    start: int = 0
+
+
+def _find_external_objects(obj, path: Tuple, found: Dict[Tuple, Any], seen: set):
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, _EXTERNAL_TYPES):
+        found[path] = obj
+    elif isinstance(obj, (str, bytes, np.ndarray)):
+        return
+    elif isinstance(obj, (list, tuple)):
+        for i, item in enumerate(obj):
+            _find_external_objects(item, path + (i,), found, seen)
+    elif isinstance(obj, dict):
+        for i, (key, item) in enumerate(obj.items()):
+            _find_external_objects(key, path + (i, "key"), found, seen)
+            _find_external_objects(item, path + (i,), found, seen)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        for name, item in vars(obj).items():
+            _find_external_objects(item, path + (name,), found, seen)
+
+
+class _StatePickler(cloudpickle.CloudPickler):
+    def __init__(self, file, external: Dict[int, Tuple]):
+        super().__init__(file, protocol=-1)
+        self._external = external
+
+    def persistent_id(self, obj):
+        return self._external.get(id(obj))
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, external: Dict[Tuple, Any]):
+        super().__init__(file)
+        self._external = external
+
+    def persistent_load(self, pid):
+        try:
+            return self._external[pid]
+        except KeyError:
+            raise ValueError(
+                "The checkpoint does not match the step method. "
+                "Resume it with the same model and step methods."
+            )
+
+
+def dump_step_state(step) -> bytes:
+    """Serialize the state of a step method.
+
+    The model, the PyTensor variables and the compiled functions that the step method
+    refers to are not serialized, but stored as references to where they are found
+    in the step method.
+    """
+    found: Dict[Tuple, Any] = {}
+    _find_external_objects(step, (), found, set())
+    file = io.BytesIO()
+    _StatePickler(file, {id(obj): path for path, obj in found.items()}).dump(step)
+    return file.getvalue()
+
+
+def _restore_object(obj, restored, seen: set) -> None:
+    """Copy the attributes of `restored` into `obj`, restoring the objects that
+    `obj` refers to in place, so that references to them stay valid."""
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    for name, value in vars(restored).items():
+        current = obj.__dict__.get(name)
+        if _is_restorable(current, value):
+            _restore_object(current, value, seen)
+        elif (
+            isinstance(current, list)
+            and type(value) is list
+            and len(current) == len(value)
+            and all(_is_restorable(a, b) for a, b in zip(current, value))
+        ):
+            # E.g. the step methods of a CompoundStep
+            for item, restored_item in zip(current, value):
+                _restore_object(item, restored_item, seen)
+        else:
+            obj.__dict__[name] = value
+
+
+def _is_restorable(current, value) -> bool:
+    return (
+        current is not value
+        and type(current) is type(value)
+        and hasattr(current, "__dict__")
+        and not isinstance(current, (type,) + _EXTERNAL_TYPES)
+    )
+
+
+def load_step_state(step, step_state: bytes) -> None:
+    """Restore the state of a step method that was serialized with `dump_step_state`.
+
+    The step method has to be created from the same model and with the same
+    arguments as the one whose state was serialized. Its model, variables and
+    compiled functions are kept, and the objects that make up the rest of its
+    state, like its potential or step size adaptation, are restored in place.
+    """
+    found: Dict[Tuple, Any] = {}
+    _find_external_objects(step, (), found, set())
+    restored = _StateUnpickler(io.BytesIO(step_state), found).load()
+    _restore_object(step, restored, set())
+
+
+def make_checkpoint(
+    strace: BaseTrace,
+    draw: int,
+    point: PointType,
+    step_state: bytes,
+    random_state,
+    start: int = 0,
+) -> ChainCheckpoint:
+    """Collect the checkpoint of a chain, including the draws `start` to `draw` of its trace.
+
+    The draws before `start` are expected to be saved with the previous checkpoint.
+    """
+    missing = set(point) - set(strace.varnames)
+    if missing:
+        raise ValueError(f"Checkpoints require the trace to store the variables {missing}.")
+    samples = {name: np.array(strace.get_values(name)[start:draw]) for name in point}
+    stats = None
+    if strace.sampler_vars is not None:
+        stats = [
+            {
+                key: np.array(strace._get_sampler_stats(key, sampler_idx, 0, 1)[start:draw])
+                for key in sampler_vars
+            }
+            for sampler_idx, sampler_vars in enumerate(strace.sampler_vars)
+        ]
+    return ChainCheckpoint(draw, point, step_state, random_state, samples, stats, start)
+
+
+def restore_trace(strace: BaseTrace, checkpoint: ChainCheckpoint) -> None:
+    """Record the draws of a checkpoint in a new trace."""
+    for i in range(checkpoint.draw):
+        point = {name: values[i] for name, values in checkpoint.samples.items()}
+        stats = None
+        if checkpoint.stats is not None:
+            stats = [{key: values[i] for key, values in data.items()} for data in checkpoint.stats]
+        strace.record(point, stats)
+
+
+def _checkpoint_file(directory: str, chain: int) -> str:
+    return os.path.join(directory, f"chain-{chain}.pkl")
+
+
+def _draws_file(directory: str, chain: int) -> str:
+    return os.path.join(directory, f"chain-{chain}-draws.pkl")
+
+
+def save_checkpoint(directory: str, chain: int, checkpoint: ChainCheckpoint) -> None:
+    """Write the checkpoint of a chain to `directory`.
+
+    The draws of the checkpoint are appended to the draws of the previous checkpoints,
+    which is replaced if the checkpoint starts at the first draw. The state of the chain
+    replaces the previous one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(_draws_file(directory, chain), "ab" if checkpoint.start > 0 else "wb") as f:
+        pickle.dump((checkpoint.samples, checkpoint.stats), f, protocol=-1)
+        f.flush()
+        os.fsync(f.fileno())
+    # The state is written last and replaced in one step, so that an interruption never
+    # leaves a partial checkpoint. Draws that are appended after it are ignored.
+    filename = _checkpoint_file(directory, chain)
+    state = (checkpoint.draw, checkpoint.point, checkpoint.step_state, checkpoint.random_state)
+    with open(filename + ".tmp", "wb") as f:
+        pickle.dump(state, f, protocol=-1)
+    os.replace(filename + ".tmp", filename)
+
+
+def load_checkpoint(directory: str, chain: int) -> Optional[ChainCheckpoint]:
+    """Read the checkpoint of a chain from `directory`, or return None if there is none.
+
+    Draws that were written after the last complete checkpoint, when the run was
+    interrupted while saving it, are removed from the file of draws.
+    """
+    filename = _checkpoint_file(directory, chain)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "rb") as f:
+        draw, point, step_state, random_state = pickle.load(f)
+
+    blocks = []
+    n_draws = 0
+    with open(_draws_file(directory, chain), "r+b") as f:
+        while n_draws < draw:
+            samples, stats = pickle.load(f)
+            blocks.append((samples, stats))
+            n_draws += len(next(iter(samples.values())))
+        f.truncate(f.tell())
+    if n_draws != draw:
+        raise ValueError(f"The checkpoint of chain {chain} does not match its draws.")
+
+    samples = {
+        name: np.concatenate([block_samples[name] for block_samples, _ in blocks])
+        for name in blocks[0][0]
+    }
+    stats = None
+    if blocks[0][1] is not None:
+        stats = [
+            {
+                key: np.concatenate([block_stats[sampler_idx][key] for _, block_stats in blocks])
+                for key in sampler_stats
+            }
+            for sampler_idx, sampler_stats in enumerate(blocks[0][1])
+        ]
+    return ChainCheckpoint(draw, point, step_state, random_state, samples, stats)
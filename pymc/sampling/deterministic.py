@@ -0,0 +1,142 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Computation of Deterministics from posterior draws, after sampling."""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from arviz import dict_to_dataset
+from xarray import Dataset
+
+import pymc
+
+from pymc.model import Model, modelcontext
+from pymc.sampling.batched import _compile_batched_fn, _evaluate_in_chunks
+
+__all__ = ("compute_deterministics",)
+
+
+def compute_deterministics(
+    dataset: Dataset,
+    *,
+    var_names: Optional[Sequence[str]] = None,
+    model: Optional[Model] = None,
+    sample_dims: Sequence[str] = ("chain", "draw"),
+    merge_dataset: bool = False,
+    progressbar: bool = True,
+    chunk_size: Optional[int] = 100,
+    max_memory: Optional[int] = None,
+) -> Dataset:
+    """Compute the Deterministics of a model for the draws of its free variables.
+
+    The Deterministics are evaluated for ``chunk_size`` draws at a time in a single call
+    of a vectorized function. This is much faster than recording them for every draw
+    while sampling, which can be avoided with ``pm.sample(defer_deterministics=True)``.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Dataset with the draws of all free variables of the model, e.g. ``idata.posterior``.
+    var_names : sequence of str, optional
+        Names of the Deterministics to compute. Defaults to all Deterministics of the model.
+    model : Model, optional
+    sample_dims : sequence of str, default ("chain", "draw")
+    merge_dataset : bool, default False
+        Whether to return the Deterministics together with the variables of ``dataset``.
+    progressbar : bool, default True
+    chunk_size : int, optional
+        Number of draws that are evaluated in a single call. Defaults to 100.
+    max_memory : int, optional
+        Upper bound, in bytes, on the size of the Deterministics computed in one chunk.
+        The number of draws per chunk is derived from it (and capped at ``chunk_size`` if
+        both are given).
+
+    Returns
+    -------
+    Dataset
+        Dataset with the Deterministics, and with the variables of ``dataset`` if
+        ``merge_dataset`` is True.
+    """
+    model = modelcontext(model)
+
+    if var_names is None:
+        deterministics = model.deterministics
+    else:
+        deterministics = [model[name] for name in var_names]
+        if not set(deterministics).issubset(model.deterministics):
+            raise ValueError(
+                f"var_names must refer to Deterministics in the model. Got: {var_names}"
+            )
+    var_names = [var.name for var in deterministics]
+
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer. Got: {chunk_size}")
+    if max_memory is not None and max_memory < 1:
+        raise ValueError(f"max_memory must be a positive integer. Got: {max_memory}")
+    if chunk_size is None and max_memory is None:
+        raise ValueError("Either chunk_size or max_memory must be given.")
+
+    if not deterministics:
+        return dataset if merge_dataset else Dataset()
+
+    # We need to temporarily disable transforms, because the dataset only holds untransformed values
+    # pylint: disable=used-before-assignment
+    try:
+        original_rvs_to_values = model.rvs_to_values
+        original_rvs_to_transforms = model.rvs_to_transforms
+
+        model.rvs_to_values = {
+            rv: rv.clone() if rv not in model.observed_RVs else value
+            for rv, value in model.rvs_to_values.items()
+        }
+        model.rvs_to_transforms = {rv: None for rv in model.basic_RVs}
+
+        batched_fn = _compile_batched_fn(
+            model, model.free_RVs, model.replace_rvs_by_values(deterministics)
+        )
+    finally:
+        model.rvs_to_values = original_rvs_to_values
+        model.rvs_to_transforms = original_rvs_to_transforms
+    # pylint: enable=used-before-assignment
+
+    values = _evaluate_in_chunks(
+        batched_fn,
+        dataset[[rv.name for rv in model.free_RVs]],
+        var_names,
+        sample_dims=sample_dims,
+        chunk_size=chunk_size,
+        max_memory=max_memory,
+        dtype=None,
+        progressbar=progressbar,
+    )
+    coords = {
+        cname: np.array(cvals) if isinstance(cvals, tuple) else cvals
+        for cname, cvals in model.coords.items()
+    }
+    # Keep the coordinates of the draws, e.g. if the tuning draws were discarded
+    coords.update({dim: dataset[dim].values for dim in sample_dims if dim in dataset.coords})
+    deterministics_dataset = dict_to_dataset(
+        values,
+        library=pymc,
+        dims={dname: list(dvals) for dname, dvals in model.named_vars_to_dims.items()},
+        coords=coords,
+        default_dims=list(sample_dims),
+        skip_event_dims=True,
+    )
+
+    if merge_dataset:
+        return dataset.assign(deterministics_dataset.data_vars)
+    return deterministics_dataset
@@ -15,6 +15,7 @@
 """Functions for prior and posterior predictive sampling."""
 
 import logging
+import os
 import warnings
 
 from typing import (
@@ -31,7 +32,9 @@ from typing import (
     cast,
 )
 
+import cloudpickle
 import numpy as np
+import pytensor
 import xarray
 
 from arviz import InferenceData
@@ -46,6 +49,7 @@ from pytensor.graph.basic import (
     walk,
 )
 from pytensor.graph.fg import FunctionGraph
+from pytensor.graph.replace import clone_replace
 from pytensor.tensor.random.var import (
     RandomGeneratorSharedVariable,
     RandomStateSharedVariable,
@@ -55,17 +59,17 @@ from typing_extensions import TypeAlias
 
 import pymc as pm
 
-from pymc.backends.arviz import _DefaultTrace
+from pymc.backends.arviz import _DefaultTrace, _MemmapTrace
 from pymc.backends.base import MultiTrace
 from pymc.blocking import PointType
 from pymc.model import Model, modelcontext
-from pymc.pytensorf import compile_pymc
+from pymc.pytensorf import collect_default_updates, compile_pymc, reseed_rngs
+from pymc.sampling.parallel import _cpu_count, _get_mp_ctx
 from pymc.util import (
     RandomState,
     _get_seeds_per_chain,
     dataset_to_point_list,
     get_default_varnames,
-    point_wrapper,
 )
 
 __all__ = (
@@ -100,6 +104,7 @@ def compile_forward_sampling_function(
     givens_dict: Optional[Dict[Variable, Any]] = None,
     constant_data: Optional[Dict[str, np.ndarray]] = None,
     constant_coords: Optional[Set[str]] = None,
+    batched: bool = False,
     **kwargs,
 ) -> Tuple[Callable[..., Union[np.ndarray, List[np.ndarray]]], Set[Variable]]:
     """Compile a function to draw samples, conditioned on the values of some variables.
@@ -170,6 +175,10 @@ def compile_forward_sampling_function(
         which case, it is considered volatile. If a ``SharedVariable`` is not found
         in either ``constant_data`` or ``constant_coords``, then it is assumed to be volatile.
         Setting ``constant_coords`` to ``None`` is equivalent to passing an empty set.
+    batched : bool, default False
+        If True, the compiled function draws several samples in a single call. It takes the
+        number of samples as input ``__samples``, and the values of the other inputs stacked
+        along a new leading sample dimension. The outputs are stacked along the same dimension.
 
     Returns
     -------
@@ -258,12 +267,56 @@ def compile_forward_sampling_function(
         for node, value in givens_dict.items()
     ]
 
+    if batched:
+        fn = _compile_batched_forward_function(inputs, fg.outputs, givens, **kwargs)
+    else:
+        fn = compile_pymc(
+            inputs, fg.outputs, givens=givens, on_unused_input="ignore", cache=True, **kwargs
+        )
     return (
-        compile_pymc(inputs, fg.outputs, givens=givens, on_unused_input="ignore", **kwargs),
+        fn,
         set(basic_rvs) & (volatile_nodes - set(givens_dict)),  # Basic RVs that will be resampled
     )
 
 
+def _compile_batched_forward_function(
+    inputs: List[Variable],
+    outputs: List[Variable],
+    givens: List[Tuple[Variable, Variable]],
+    random_seed: RandomState = None,
+    **kwargs,
+):
+    """Compile a forward sampling function that is mapped over a leading sample dimension.
+
+    The graph of the outputs is evaluated once per sample within a ``Scan``, which
+    threads the states of the random generators through the iterations.
+    """
+    outputs = clone_replace(outputs, replace=dict(givens))
+    n_samples = at.lscalar("__samples")
+    batched_inputs = [
+        at.TensorType(inp.dtype, shape=(None, *inp.type.shape))(inp.name) for inp in inputs
+    ]
+
+    def step(*sample_inputs):
+        sample_outputs = clone_replace(outputs, replace=dict(zip(inputs, sample_inputs)))
+        return sample_outputs, collect_default_updates(sample_inputs, sample_outputs)
+
+    batched_outputs, updates = pytensor.scan(step, sequences=batched_inputs, n_steps=n_samples)
+    if not isinstance(batched_outputs, list):
+        batched_outputs = [batched_outputs]
+
+    # compile_pymc only finds the random generators outside of the scan
+    reseed_rngs(list(updates.keys()), random_seed)
+    return compile_pymc(
+        [n_samples, *batched_inputs],
+        batched_outputs,
+        updates=updates,
+        on_unused_input="ignore",
+        cache=True,
+        **kwargs,
+    )
+
+
 def draw(
     vars: Union[Variable, Sequence[Variable]],
     draws: int = 1,
@@ -452,6 +505,10 @@ def sample_posterior_predictive(
     predictions: bool = False,
     idata_kwargs: dict = None,
     compile_kwargs: dict = None,
+    chunk_size: Optional[int] = None,
+    cores: Optional[int] = None,
+    output_dir: Optional[Union[str, os.PathLike]] = None,
+    mp_ctx=None,
 ) -> Union[InferenceData, Dict[str, np.ndarray]]:
     """Generate posterior predictive samples from a model given a trace.
 
@@ -488,6 +545,26 @@ def sample_posterior_predictive(
         :func:`pymc.predictions_to_inference_data` otherwise.
     compile_kwargs: dict, optional
         Keyword arguments for :func:`pymc.pytensorf.compile_pymc`.
+    chunk_size: int, optional
+        If given, the posterior predictive samples of up to ``chunk_size`` posterior draws are
+        generated in a single call of a function that is batched over the draws, instead of
+        calling a function once per draw. This is much faster for many draws, but the samples
+        differ from those generated draw by draw with the same ``random_seed``.
+    cores: int, optional
+        If given, the posterior draws are split into chunks (of ``chunk_size`` draws, or of a
+        single draw if ``chunk_size`` is None) that are sampled by ``cores`` worker processes,
+        each with its own copy of the compiled function. Every chunk is seeded independently,
+        so that the samples depend on ``random_seed`` and ``chunk_size``, but not on the number
+        of ``cores``. Use ``cores=-1`` to use all available CPUs.
+    output_dir: str or path, optional
+        If given, the posterior predictive samples are written to one ``<var_name>.npy`` file
+        per variable in this directory as they are generated, instead of being held in memory.
+        The returned arrays are memory maps of these files, so that their values are only
+        loaded when they are accessed. Combine it with ``chunk_size`` to bound the memory
+        needed for the predictive samples of large models.
+    mp_ctx : multiprocessing.context.BaseContent or str, optional
+        A multiprocessing context, or the name of a start method, for the worker processes
+        used if ``cores > 1``. See multiprocessing documentation for details.
 
     Returns
     -------
@@ -588,9 +665,17 @@ def sample_posterior_predictive(
     else:
         vars_ = model.observed_RVs + observed_dependent_deterministics(model)
 
-    indices = np.arange(samples)
-    if progressbar:
-        indices = progress_bar(indices, total=samples, display=progressbar)
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer, but is {chunk_size}.")
+    if cores == -1:
+        cores = _cpu_count()
+    if cores is not None and cores < 1:
+        raise ValueError(f"cores must be a positive integer or -1, but is {cores}.")
+
+    if chunk_size is None:
+        indices = np.arange(samples)
+    else:
+        indices = np.arange(0, samples, chunk_size)
 
     vars_to_sample = list(get_default_varnames(vars_, include_transformed=False))
 
@@ -619,34 +704,83 @@ def sample_posterior_predictive(
         random_seed=random_seed,
         constant_data=constant_data,
         constant_coords=constant_coords,
+        batched=chunk_size is not None,
         **compile_kwargs,
     )
-    sampler_fn = point_wrapper(_sampler_fn)
     # All model variables have a name, but mypy does not know this
     _log.info(f"Sampling: {list(sorted(volatile_basic_rvs, key=lambda var: var.name))}")  # type: ignore
-    ppc_trace_t = _DefaultTrace(samples)
-    try:
-        for idx in indices:
-            if nchain > 1:
-                # the trace object will either be a MultiTrace (and have _straces)...
-                if hasattr(_trace, "_straces"):
-                    chain_idx, point_idx = np.divmod(idx, len_trace)
-                    chain_idx = chain_idx % nchain
-                    param = cast(MultiTrace, _trace)._straces[chain_idx].point(point_idx)
-                # ... or a PointList
-                else:
-                    param = cast(PointList, _trace)[idx % (len_trace * nchain)]
-            # there's only a single chain, but the index might hit it multiple times if
-            # the number of indices is greater than the length of the trace.
-            else:
-                param = _trace[idx % len_trace]
 
-            values = sampler_fn(**param)
+    def get_param(idx: int) -> PointType:
+        if nchain > 1:
+            # the trace object will either be a MultiTrace (and have _straces)...
+            if hasattr(_trace, "_straces"):
+                chain_idx, point_idx = np.divmod(idx, len_trace)
+                chain_idx = chain_idx % nchain
+                return cast(MultiTrace, _trace)._straces[chain_idx].point(point_idx)
+            # ... or a PointList
+            return cast(PointList, _trace)[idx % (len_trace * nchain)]
+        # there's only a single chain, but the index might hit it multiple times if
+        # the number of indices is greater than the length of the trace.
+        return _trace[idx % len_trace]
+
+    input_names = [inp.name for inp in _sampler_fn.maker.fgraph.inputs if inp.name]
+
+    def get_inputs(idx: int) -> Dict[str, Any]:
+        if chunk_size is None:
+            param = get_param(idx)
+            return {name: param[name] for name in input_names if name in param}
+        params = [get_param(i) for i in range(idx, min(idx + chunk_size, samples))]
+        return {
+            "__samples": len(params),
+            **{
+                name: np.stack([param[name] for param in params])
+                for name in input_names
+                if name in params[0]
+            },
+        }
+
+    if cores is None:
+        results = (_sampler_fn(**get_inputs(idx)) for idx in indices)
+    else:
+        # Seed every chunk on its own, so that the draws do not depend on the number of cores
+        chunk_seeds = _get_seeds_per_chain(random_seed, len(indices))
+        tasks = ((seed, get_inputs(idx)) for seed, idx in zip(chunk_seeds, indices))
+        if cores == 1:
+            worker = _PPCWorker(_sampler_fn)
+            results = (worker(task) for task in tasks)
+        else:
+            pool = _get_mp_ctx(mp_ctx).Pool(
+                cores,
+                initializer=_init_ppc_worker,
+                initargs=(cloudpickle.dumps(_sampler_fn),),
+            )
+            results = pool.imap(
+                _sample_ppc_chunk, tasks, chunksize=max(1, len(indices) // (4 * cores))
+            )
+    if progressbar:
+        results = progress_bar(results, total=len(indices), display=progressbar)
 
-            for k, v in zip(vars_, values):
-                ppc_trace_t.insert(k.name, v, idx)
+    ppc_trace_t: _DefaultTrace
+    if output_dir is None:
+        ppc_trace_t = _DefaultTrace(samples)
+    else:
+        ppc_trace_t = _MemmapTrace(samples, output_dir)
+    try:
+        for idx, values in zip(indices, results):
+            if chunk_size is None:
+                for k, v in zip(vars_, values):
+                    ppc_trace_t.insert(k.name, v, idx)
+            else:
+                chunk = slice(idx, min(idx + chunk_size, samples))
+                for k, v in zip(vars_, values):
+                    ppc_trace_t.insert_chunk(k.name, v, chunk)
     except KeyboardInterrupt:
         pass
+    finally:
+        if cores is not None and cores > 1:
+            pool.terminate()
+            pool.join()
+        ppc_trace_t.flush()
 
     ppc_trace = ppc_trace_t.trace_dict
 
@@ -678,6 +812,39 @@ def sample_posterior_predictive(
     return idata_pp
 
 
+class _PPCWorker:
+    """Sample chunks of posterior predictive draws, reseeding the function RNGs for every chunk."""
+
+    def __init__(self, sampler_fn):
+        self.sampler_fn = sampler_fn
+        self._rngs = [
+            shared
+            for shared in sampler_fn.get_shared()
+            if isinstance(shared, (RandomStateSharedVariable, RandomGeneratorSharedVariable))
+        ]
+
+    def __call__(self, task):
+        seed, inputs = task
+        reseed_rngs(self._rngs, seed)
+        return self.sampler_fn(**inputs)
+
+
+# The worker of the current pool process, see `_init_ppc_worker`
+_ppc_worker: Optional[_PPCWorker] = None
+
+
+def _init_ppc_worker(pickled_fn: bytes):
+    # Every pool process unpickles the compiled function once,
+    # so that the tasks only carry the seeds and inputs of the chunks.
+    global _ppc_worker
+    _ppc_worker = _PPCWorker(cloudpickle.loads(pickled_fn))
+
+
+def _sample_ppc_chunk(task):
+    assert _ppc_worker is not None
+    return _ppc_worker(task)
+
+
 def sample_posterior_predictive_w(
     traces,
     samples: Optional[int] = None,
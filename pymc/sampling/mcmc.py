@@ -16,11 +16,14 @@
 
 import logging
 import pickle
+import queue
 import sys
+import threading
 import time
 import warnings
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
@@ -29,19 +32,34 @@ import pytensor.gradient as tg
 
 from arviz import InferenceData
 from fastprogress.fastprogress import progress_bar
+from pytensor.graph.basic import graph_inputs
 from typing_extensions import TypeAlias
 
 import pymc as pm
 
 from pymc.backends import _init_trace
 from pymc.backends.base import BaseTrace, MultiTrace, _choose_chains
+from pymc.backends.ndarray import NDArray
 from pymc.blocking import DictToArrayBijection
 from pymc.exceptions import SamplingError
 from pymc.initial_point import PointType, StartDict, make_initial_point_fns_per_chain
 from pymc.model import Model, modelcontext
-from pymc.sampling.parallel import Draw, _cpu_count
+from pymc.sampling.checkpoint import (
+    dump_step_state,
+    load_checkpoint,
+    load_step_state,
+    make_checkpoint,
+    restore_trace,
+    save_checkpoint,
+)
+from pymc.sampling.deterministic import compute_deterministics
+from pymc.sampling.parallel import Draw, _cpu_count, _keep_draw, _thinned_length
 from pymc.sampling.population import _sample_population
-from pymc.stats.convergence import log_warning_stats, run_convergence_checks
+from pymc.stats.convergence import (
+    ConvergenceMonitor,
+    log_warning_stats,
+    run_convergence_checks,
+)
 from pymc.step_methods import NUTS, CompoundStep, DEMetropolis
 from pymc.step_methods.arraystep import BlockedStep, PopulationArrayStepShared
 from pymc.step_methods.hmc import quadpotential
@@ -234,6 +252,19 @@ def sample(
     keep_warning_stat: bool = False,
     idata_kwargs: dict = None,
     mp_ctx=None,
+    mp_buffer_size: Optional[int] = None,
+    mp_shared_trace: bool = False,
+    chain_method: str = "processes",
+    pool=None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 100,
+    target_ess: Optional[float] = None,
+    target_rhat: Optional[float] = None,
+    max_draws: Optional[int] = None,
+    convergence_check_every: int = 100,
+    defer_deterministics: Union[bool, Sequence[str]] = False,
+    thin: int = 1,
+    var_names: Optional[Sequence[str]] = None,
     **kwargs,
 ) -> Union[InferenceData, MultiTrace]:
     r"""Draw samples from the posterior using the given step methods.
@@ -284,7 +315,8 @@ def sample(
         is passed, each entry will be used to seed each chain. A ValueError will be
         raised if the length does not match the number of chains.
     discard_tuned_samples : bool
-        Whether to discard posterior samples of the tune interval.
+        Whether to discard posterior samples of the tune interval. If ``True``, the tuning
+        draws are not stored in the traces at all.
     compute_convergence_checks : bool, default=True
         Whether to compute sampler statistics like Gelman-Rubin and ``effective_n``.
     callback : function, default=None
@@ -312,6 +344,92 @@ def sample(
     mp_ctx : multiprocessing.context.BaseContent
         A multiprocessing context for parallel sampling.
         See multiprocessing documentation for details.
+    mp_buffer_size : int, optional
+        Number of draws each chain process may write ahead into a shared memory ring buffer
+        during parallel sampling. The main process then collects the draws in batches instead
+        of requesting every draw individually, which reduces the communication overhead for
+        models with cheap log-probability evaluations. If ``None`` (default), each draw is
+        exchanged in lockstep with the main process.
+    mp_shared_trace : bool
+        If ``True``, the traces are preallocated in shared memory during parallel sampling,
+        and each chain process writes its draws and sampler statistics directly into them.
+        The main process then only keeps track of the progress, and draws are never copied
+        between processes. Only supported for the default ``NDArray`` backend. The ``point``
+        of the draws passed to ``callback`` is ``None`` in this mode. Defaults to ``False``.
+    chain_method : str, default "processes"
+        How chains are run in parallel when ``cores > 1``.
+
+        * processes: Sample each chain in a separate process.
+        * threads: Sample the chains in a pool of ``cores`` threads within the current process.
+          The step method is copied for every chain, but the copies share the compiled functions
+          and the model data, which avoids the cost of starting processes and of pickling the
+          model. This is only faster if the PyTensor functions release the GIL for most of their
+          run time, as is the case for models dominated by BLAS operations. The step methods
+          share the global NumPy random state, so the draws are not reproducible and
+          ``random_seed`` is not supported.
+        * vectorized: Sample all chains in lockstep in the current process, evaluating the
+          logp and its gradient for all chains in a single call of a compiled function. The
+          chains are still evaluated one after the other within that call, so this only pays
+          off for many chains of small models, where the overhead of calling the compiled
+          function dominates. It is only supported if all free variables are sampled by NUTS.
+    pool : SamplerPool, optional
+        A :class:`~pymc.sampling.parallel.SamplerPool` whose worker processes sample the chains.
+        The step method of the pool is used, and the workers are kept alive after sampling,
+        so that subsequent calls with new data (see :func:`~pymc.set_data`) do not have to
+        start processes or load the compiled functions again. ``step`` and ``cores`` must
+        not be given, and the tuning is restarted from the initial state of the step method
+        of the pool for every chain.
+    checkpoint : str, optional
+        Directory in which a checkpoint of every chain is saved every ``checkpoint_every``
+        draws. A checkpoint holds the draws so far, the state of the step methods (including
+        their adaptation) and of the random number generator. If the directory already holds
+        checkpoints, the chains are resumed from them, and continue exactly as if the run had
+        not been interrupted. The run has to be resumed with the same model, step methods and
+        ``random_seed``. Only supported for sequential sampling and for sampling with
+        processes in lockstep (without ``mp_buffer_size``, ``mp_shared_trace`` or ``pool``).
+    checkpoint_every : int, default 100
+        Number of draws after which the checkpoint of a chain is updated. Every update
+        appends the new draws of the chain to its checkpoint, and replaces the state of
+        the step methods and of the random number generator.
+    target_ess : float, optional
+        If set, the effective sample size of all free variables is monitored during
+        sampling, and the sampling stops as soon as the smallest ESS across the chains
+        reaches ``target_ess`` (and the R-hat is below ``target_rhat``, if set). The ESS is
+        a batch-means estimate from running statistics of the chains, see
+        :class:`~pymc.backends.online.OnlineStats`. In this mode, ``draws`` is the minimum
+        number of draws per chain, and the sampling is extended until the targets are met
+        or ``max_draws`` draws are reached. Requires the default ``NDArray`` trace and the
+        chains to run in parallel, that is ``cores > 1`` or ``chain_method="vectorized"``,
+        and ``chains <= cores`` for ``chain_method="processes"`` or ``"threads"``.
+    target_rhat : float, optional
+        If set, the Gelman-Rubin R-hat of all free variables is monitored during sampling,
+        and the sampling stops as soon as the largest R-hat falls below ``target_rhat``
+        (and the ESS reaches ``target_ess``, if set). See ``target_ess``.
+    max_draws : int, optional
+        Maximum number of draws per chain when ``target_ess`` or ``target_rhat`` are set.
+        Defaults to ``4 * draws``.
+    convergence_check_every : int, default 100
+        Number of draws per chain between two computations of the ESS and R-hat when
+        ``target_ess`` or ``target_rhat`` are set.
+    defer_deterministics : bool or sequence of str, default False
+        If ``True``, only the free variables are recorded during sampling, and the
+        Deterministics are computed after sampling for all draws at once, with
+        :func:`~pymc.compute_deterministics`. This saves the cost of evaluating them in every
+        step, and the memory of the trace during sampling. If a sequence of names, only these
+        Deterministics are computed. Requires ``return_inferencedata=True`` and the default
+        ``trace`` backend.
+    thin : int, default 1
+        Record only every ``thin``-th draw. The tuning and the posterior draws are thinned
+        separately, keeping the last draw of each, so that ``ceil(draws / thin)`` draws per
+        chain are returned. Thinned out draws are never stored, nor sent from the chain
+        processes to the main process. Not supported with population samplers, checkpoints,
+        ``mp_shared_trace`` or a ``pool``.
+    var_names : sequence of str, optional
+        Names of the variables to record. Defaults to all free variables (transformed and
+        untransformed) and Deterministics. Only supported with the default ``trace`` backend.
+        The chain processes only send the values of the free variables that the recorded
+        variables depend on, so the ``point`` of the draws that a ``callback`` receives
+        from them is restricted to these, unless checkpoints are used.
 
     Returns
     -------
@@ -393,6 +511,48 @@ def sample(
             kwargs["nuts"]["target_accept"] = kwargs.pop("target_accept")
         else:
             kwargs = {"nuts": {"target_accept": kwargs.pop("target_accept")}}
+    if checkpoint is not None:
+        if checkpoint_every < 1:
+            raise ValueError(
+                f"checkpoint_every must be a positive integer, got {checkpoint_every}."
+            )
+        if chain_method != "processes":
+            raise ValueError(f"Checkpoints are not supported with chain_method='{chain_method}'.")
+        if mp_buffer_size is not None or mp_shared_trace or pool is not None:
+            raise ValueError(
+                "Checkpoints can not be used with mp_buffer_size, mp_shared_trace or a SamplerPool."
+            )
+    monitor_convergence = target_ess is not None or target_rhat is not None
+    if monitor_convergence:
+        if max_draws is None:
+            max_draws = 4 * draws
+        if max_draws < max(draws, 1):
+            raise ValueError(f"max_draws must be at least draws, got {max_draws} < {draws}.")
+        if convergence_check_every < 1:
+            raise ValueError(
+                "convergence_check_every must be a positive integer, "
+                f"got {convergence_check_every}."
+            )
+        if checkpoint is not None or mp_shared_trace:
+            raise ValueError(
+                "target_ess and target_rhat can not be used with checkpoints or mp_shared_trace."
+            )
+        if trace is not None and not isinstance(trace, NDArray):
+            # Only the NDArray backend grows beyond the draws it was set up for
+            raise ValueError("target_ess and target_rhat require the default NDArray trace.")
+    if defer_deterministics is not False:
+        if trace is not None or not return_inferencedata:
+            raise ValueError(
+                "defer_deterministics requires return_inferencedata=True and the default trace."
+            )
+        if var_names is not None:
+            raise ValueError("var_names can not be combined with defer_deterministics.")
+    if var_names is not None and trace is not None:
+        raise ValueError("var_names can only be used with the default trace backend.")
+    if thin < 1:
+        raise ValueError(f"thin must be a positive integer, got {thin}.")
+    if thin > 1 and (checkpoint is not None or mp_shared_trace or pool is not None):
+        raise ValueError("thin can not be used with checkpoints, mp_shared_trace or a SamplerPool.")
     if isinstance(trace, list):
         raise DeprecationWarning(
             "We have removed support for partial traces because it simplified things."
@@ -405,6 +565,44 @@ def sample(
             "Cannot sample from the model, since the model does not contain any free variables."
         )
 
+    deferred_deterministics: List[str] = []
+    if defer_deterministics is not False:
+        if defer_deterministics is True:
+            deferred_deterministics = [var.name for var in model.deterministics]
+        else:
+            deferred_deterministics = list(defer_deterministics)
+        deterministic_names = {var.name for var in model.deterministics}
+        trace = NDArray(
+            model=model,
+            vars=[
+                var for var in model.unobserved_value_vars if var.name not in deterministic_names
+            ],
+        )
+    point_names = None
+    if var_names is not None:
+        recorded_vars = [var for var in model.unobserved_value_vars if var.name in var_names]
+        missing = set(var_names) - {var.name for var in recorded_vars}
+        if missing:
+            raise ValueError(f"var_names refer to variables that can not be recorded: {missing}")
+        trace = NDArray(model=model, vars=recorded_vars)
+        if checkpoint is None:
+            # The chain processes only send the values that the recorded variables depend on
+            inputs = set(graph_inputs(recorded_vars))
+            point_names = [var.name for var in model.value_vars if var in inputs]
+
+    if pool is not None:
+        if pool.model is not model:
+            raise ValueError("The SamplerPool was created for a different model.")
+        if chain_method != "processes":
+            raise ValueError("A SamplerPool can only be used with chain_method='processes'.")
+        if step is not None or cores is not None:
+            raise ValueError(
+                "step and cores can not be combined with a SamplerPool, "
+                "whose step method and number of workers are used instead."
+            )
+        step = pool.step_method
+        cores = pool.cores
+
     if cores is None:
         cores = min(4, _cpu_count())
 
@@ -432,6 +630,23 @@ def sample(
         msg = "Only %s samples in chain." % draws
         _log.warning(msg)
 
+    monitor = None
+    expected_draws = draws
+    if monitor_convergence:
+        monitor = ConvergenceMonitor(
+            chains=chains,
+            # The monitor only sees the recorded draws
+            min_draws=_thinned_length(draws, thin),
+            target_ess=target_ess,
+            target_rhat=target_rhat,
+            check_every=convergence_check_every,
+            callback=callback,
+        )
+        callback = monitor
+        # The sampling is extended until the targets are met, while the traces
+        # are only allocated for the minimum number of draws and grow as needed.
+        draws = max_draws
+
     draws += tune
 
     auto_nuts_init = True
@@ -444,7 +659,8 @@ def sample(
             auto_nuts_init = False
 
     initial_points = None
-    step = assign_step_methods(model, step, methods=pm.STEP_METHODS, step_kwargs=kwargs)
+    if pool is None:
+        step = assign_step_methods(model, step, methods=pm.STEP_METHODS, step_kwargs=kwargs)
 
     if isinstance(step, list):
         step = CompoundStep(step)
@@ -493,13 +709,28 @@ def sample(
         "cores": cores,
         "callback": callback,
         "discard_tuned_samples": discard_tuned_samples,
+        "checkpoint": checkpoint,
+        "checkpoint_every": checkpoint_every,
+        "thin": thin,
     }
+    if monitor is not None:
+        sample_args["expected_draws"] = expected_draws + tune
     parallel_args = {
         "mp_ctx": mp_ctx,
+        "mp_buffer_size": mp_buffer_size,
+        "mp_shared_trace": mp_shared_trace,
+        "pool": pool,
+        "point_names": point_names,
     }
 
     sample_args.update(kwargs)
 
+    if chain_method not in ("processes", "threads", "vectorized"):
+        raise ValueError(
+            f"Unknown chain_method: {chain_method}. "
+            "Use 'processes', 'threads' or 'vectorized' instead."
+        )
+
     has_population_samplers = np.any(
         [
             isinstance(m, PopulationArrayStepShared)
@@ -507,7 +738,43 @@ def sample(
         ]
     )
 
+    if has_population_samplers and (checkpoint is not None or thin > 1):
+        raise ValueError("Checkpoints and thin are not supported with population samplers.")
+
+    # The tuning draws are only stored if they are returned. Checkpoints, shared traces
+    # and population samplers rely on traces that hold every draw.
+    record_tune = (
+        not discard_tuned_samples
+        or checkpoint is not None
+        or mp_shared_trace
+        or has_population_samplers
+    )
+    sample_args["record_tune"] = record_tune
+
     parallel = cores > 1 and chains > 1 and not has_population_samplers
+    if pool is not None:
+        if has_population_samplers:
+            raise ValueError("Population samplers can not be used with a SamplerPool.")
+        # The step method of the pool only lives in its workers
+        parallel = True
+    if monitor is not None and not parallel and chain_method != "vectorized":
+        # Sequentially sampled chains can not be compared while sampling
+        raise ValueError(
+            "target_ess and target_rhat require the chains to be sampled in parallel "
+            "(cores > 1 or chain_method='vectorized')."
+        )
+    if parallel and chain_method == "threads" and random_seed is not None:
+        # The step methods of all threads draw from the global NumPy random state
+        raise ValueError(
+            "random_seed is not supported with chain_method='threads', "
+            "because the draws depend on how the threads are scheduled."
+        )
+    if monitor is not None and chain_method != "vectorized" and chains > cores:
+        # Chains that wait for a free core would only start once the others stopped
+        raise ValueError(
+            "target_ess and target_rhat require chains <= cores, "
+            f"got {chains} chains and {cores} cores."
+        )
     # At some point it was decided that PyMC should not set a global seed by default,
     # unless the user specified a seed. This is a symptom of the fact that PyMC samplers
     # are built around global seeding. This branch makes sure we maintain this unspoken
@@ -522,7 +789,15 @@ def sample(
         sample_args["random_seed"] = random_seed if random_seed is None else random_seed_list
 
     t_start = time.time()
-    if parallel:
+    if chain_method == "vectorized":
+        _log.info(f"Vectorized sampling ({chains} chains in 1 job)")
+        _print_step_hierarchy(step)
+        mtrace = _vectorized_sample(**sample_args)
+    elif parallel and chain_method == "threads":
+        _log.info(f"Multithreaded sampling ({chains} chains in {cores} threads)")
+        _print_step_hierarchy(step)
+        mtrace = _mt_sample(**sample_args)
+    elif parallel:
         _log.info(f"Multiprocess sampling ({chains} chains in {cores} jobs)")
         _print_step_hierarchy(step)
         try:
@@ -537,7 +812,7 @@ def sample(
             _log.warning("Could not pickle model, sampling singlethreaded.")
             _log.debug("Pickling error:", exc_info=True)
             parallel = False
-    if not parallel:
+    if not parallel and chain_method != "vectorized":
         if has_population_samplers:
             has_demcmc = np.any(
                 [
@@ -573,8 +848,11 @@ def sample(
     t_sampling = time.time() - t_start
     # count the number of tune/draw iterations that happened
     # ideally via the "tune" statistic, but not all samplers record it!
-    if "tune" in mtrace.stat_names:
-        stat = mtrace.get_sampler_stats("tune", chains=0)
+    if not record_tune:
+        n_tune = 0
+        n_draws = len(mtrace)
+    elif "tune" in mtrace.stat_names:
+        stat = mtrace.get_sampler_stats("tune", chains=mtrace.chains[0])
         # when CompoundStep is used, the stat is 2 dimensional!
         if len(stat.shape) == 2:
             stat = stat[:, 0]
@@ -583,11 +861,14 @@ def sample(
         n_draws = stat.count(False)
     else:
         # these may be wrong when KeyboardInterrupt happened, but they're better than nothing
-        n_tune = min(tune, len(mtrace))
+        n_tune = min(_thinned_length(tune, thin), len(mtrace))
         n_draws = max(0, len(mtrace) - n_tune)
 
     if discard_tuned_samples:
         mtrace = mtrace[n_tune:]
+    if not record_tune:
+        # The tuning draws were not stored, but they were still sampled
+        n_tune = _thinned_length(tune, thin)
 
     # save metadata in SamplerReport
     mtrace.report._n_tune = n_tune
@@ -601,6 +882,10 @@ def sample(
         f"took {t_sampling:.0f} seconds."
     )
     mtrace.report._log_summary()
+    if monitor is not None and not monitor.converged:
+        _log.warning(
+            f"The chains did not reach the convergence targets within {max_draws:_d} draws."
+        )
 
     idata = None
     if compute_convergence_checks or return_inferencedata:
@@ -608,9 +893,23 @@ def sample(
         if idata_kwargs:
             ikwargs.update(idata_kwargs)
         idata = pm.to_inference_data(mtrace, **ikwargs)
+        if deferred_deterministics:
+            for group in ("posterior", "warmup_posterior"):
+                if hasattr(idata, group):
+                    setattr(
+                        idata,
+                        group,
+                        compute_deterministics(
+                            getattr(idata, group),
+                            var_names=deferred_deterministics,
+                            model=model,
+                            merge_dataset=True,
+                            progressbar=progressbar,
+                        ),
+                    )
 
         if compute_convergence_checks:
-            if draws - tune < 100:
+            if n_draws < 100:
                 warnings.warn(
                     "The number of samples is too small to check convergence reliably.",
                     stacklevel=2,
@@ -659,7 +958,10 @@ def _sample_many(
     start: Sequence[PointType],
     random_seed: Optional[Sequence[RandomSeed]],
     step,
+    tune: int,
     callback=None,
+    thin: int = 1,
+    record_tune: bool = True,
     **kwargs,
 ) -> MultiTrace:
     """Samples all chains sequentially.
@@ -676,12 +978,20 @@ def _sample_many(
         A list of seeds, one for each chain
     step: function
         Step function
+    tune: int
+        Number of iterations to tune.
+    thin: int
+        Only every `thin`-th draw is recorded.
+    record_tune: bool
+        Whether the tuning draws are recorded.
 
     Returns
     -------
     mtrace: MultiTrace
         Contains samples of all chains
     """
+    n_tune = _thinned_length(tune, thin) if record_tune else 0
+    n_recorded = n_tune + _thinned_length(draws - tune, thin)
     traces: List[BaseTrace] = []
     for i in range(chains):
         trace = _sample(
@@ -690,7 +1000,10 @@ def _sample_many(
             start=start[i],
             step=step,
             random_seed=None if random_seed is None else random_seed[i],
+            tune=tune,
             callback=callback,
+            thin=thin,
+            record_tune=record_tune,
             **kwargs,
         )
         if trace is None:
@@ -698,7 +1011,7 @@ def _sample_many(
                 raise ValueError("Sampling stopped before a sample was created.")
             else:
                 break
-        elif len(trace) < draws:
+        elif len(trace) < n_recorded:
             if len(traces) == 0:
                 traces.append(trace)
             break
@@ -719,6 +1032,10 @@ def _sample(
     tune: int,
     model: Optional[Model] = None,
     callback=None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 100,
+    thin: int = 1,
+    record_tune: bool = True,
     **kwargs,
 ) -> BaseTrace:
     """Main iteration for singleprocess sampling.
@@ -746,6 +1063,14 @@ def _sample(
     tune : int
         Number of iterations to tune.
     model : Model (optional if in ``with`` context)
+    checkpoint : str, optional
+        Directory of the checkpoints to save and to resume from.
+    checkpoint_every : int
+        Number of draws after which the checkpoint is updated.
+    thin : int
+        Only every `thin`-th draw is recorded.
+    record_tune : bool
+        Whether the tuning draws are recorded.
 
     Returns
     -------
@@ -757,22 +1082,41 @@ def _sample(
     trace = copy(trace)
 
     sampling_gen = _iter_sample(
-        draws, step, start, trace, chain, tune, model, random_seed, callback
+        draws,
+        step,
+        start,
+        trace,
+        chain,
+        tune,
+        model,
+        random_seed,
+        callback,
+        checkpoint=checkpoint,
+        checkpoint_every=checkpoint_every,
+        thin=thin,
+        record_tune=record_tune,
     )
     _pbar_data = {"chain": chain, "divergences": 0}
     _desc = "Sampling chain {chain:d}, {divergences:,d} divergences"
+    pbar = None
     if progressbar:
-        sampling = progress_bar(sampling_gen, total=draws, display=progressbar)
-        sampling.comment = _desc.format(**_pbar_data)
-    else:
-        sampling = sampling_gen
+        pbar = progress_bar(range(draws), display=progressbar)
+        pbar.comment = _desc.format(**_pbar_data)
+        pbar.update(0)
+    first_draw = None
     try:
         strace = None
-        for it, (strace, diverging) in enumerate(sampling):
+        for it, (strace, diverging) in enumerate(sampling_gen):
+            if first_draw is None:
+                # A chain that resumes from a checkpoint continues after the draws of the
+                # checkpoint. Checkpoints record every draw, so they are counted by the trace.
+                first_draw = 0 if checkpoint is None else len(strace) - 1
             if it >= skip_first and diverging:
                 _pbar_data["divergences"] += 1
-                if progressbar:
-                    sampling.comment = _desc.format(**_pbar_data)
+                if pbar:
+                    pbar.comment = _desc.format(**_pbar_data)
+            if pbar:
+                pbar.update(first_draw + it + 1)
     except KeyboardInterrupt:
         pass
     if strace is None:
@@ -847,6 +1191,11 @@ def _iter_sample(
     model=None,
     random_seed: RandomSeed = None,
     callback=None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 100,
+    thin: int = 1,
+    record_tune: bool = True,
+    expected_draws: Optional[int] = None,
 ) -> Iterator[Tuple[BaseTrace, bool]]:
     """Generator for sampling one chain. (Used in singleprocess sampling.)
 
@@ -868,6 +1217,19 @@ def _iter_sample(
         Number of iterations to tune (defaults to 0).
     model : Model (optional if in ``with`` context)
     random_seed : single random seed, optional
+    checkpoint : str, optional
+        Directory in which the checkpoint of the chain is saved every `checkpoint_every`
+        draws. If it already holds a checkpoint of the chain, the sampling resumes from it.
+    checkpoint_every : int
+        Number of draws after which the checkpoint is updated.
+    thin : int, optional
+        Only every `thin`-th draw is recorded, see `pymc.sample`. The generator still
+        yields once per draw.
+    record_tune : bool, optional
+        Whether the tuning draws are recorded. Defaults to True.
+    expected_draws : int, optional
+        Number of draws, including tuning, that the traces are allocated for, if it is
+        less than `draws`. The traces grow when more draws are recorded.
 
     Yields
     ------
@@ -892,19 +1254,39 @@ def _iter_sample(
 
     point = start
 
+    if expected_draws is None:
+        expected_draws = draws
+    n_tune = _thinned_length(tune, thin) if record_tune else 0
     strace: BaseTrace = _init_trace(
-        expected_length=draws + tune,
+        expected_length=n_tune + _thinned_length(max(0, expected_draws - tune), thin),
         stats_dtypes=step.stats_dtypes,
         chain_number=chain,
         trace=trace,
         model=model,
     )
 
+    resume = None if checkpoint is None else load_checkpoint(checkpoint, chain)
+    first_draw = 0
+    if resume is not None:
+        restore_trace(strace, resume)
+        load_step_state(step, resume.step_state)
+        np.random.set_state(resume.random_state)
+        point = resume.point
+        first_draw = resume.draw
+        if first_draw == draws:
+            # The chain was already completed before
+            strace.close()
+            yield strace, False
+            return
+
+    # The number of draws that are saved in the checkpoint
+    saved_draw = first_draw
     try:
-        step.tune = bool(tune)
-        if hasattr(step, "reset_tuning"):
-            step.reset_tuning()
-        for i in range(draws):
+        if resume is None:
+            step.tune = bool(tune)
+            if hasattr(step, "reset_tuning"):
+                step.reset_tuning()
+        for i in range(first_draw, draws):
             stats = None
             diverging = False
 
@@ -913,14 +1295,27 @@ def _iter_sample(
             if i == tune:
                 step.stop_tuning()
             point, stats = step.step(point)
-            strace.record(point, stats)
             log_warning_stats(stats)
             diverging = i > tune and stats and stats[0].get("diverging")
+            if not _keep_draw(i, tune, draws, thin) or (i < tune and not record_tune):
+                yield strace, diverging
+                continue
+            strace.record(point, stats)
             if callback is not None:
                 callback(
                     trace=strace,
                     draw=Draw(chain, i == draws, i, i < tune, stats, point),
                 )
+            if checkpoint is not None and ((i + 1) % checkpoint_every == 0 or i + 1 == draws):
+                random_state = np.random.get_state()
+                save_checkpoint(
+                    checkpoint,
+                    chain,
+                    make_checkpoint(
+                        strace, i + 1, point, dump_step_state(step), random_state, saved_draw
+                    ),
+                )
+                saved_draw = i + 1
 
             yield strace, diverging
     except KeyboardInterrupt:
@@ -947,6 +1342,15 @@ def _mp_sample(
     callback=None,
     discard_tuned_samples: bool = True,
     mp_ctx=None,
+    mp_buffer_size: Optional[int] = None,
+    mp_shared_trace: bool = False,
+    pool=None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 100,
+    thin: int = 1,
+    record_tune: bool = True,
+    expected_draws: Optional[int] = None,
+    point_names: Optional[Sequence[str]] = None,
     **kwargs,
 ) -> MultiTrace:
     """Main iteration for multiprocess sampling.
@@ -980,6 +1384,27 @@ def _mp_sample(
         the ``draw.chain`` argument can be used to determine which of the active chains the sample
         is drawn from.
         Sampling can be interrupted by throwing a ``KeyboardInterrupt`` in the callback.
+    mp_buffer_size : int, optional
+        Number of draws each chain process may write ahead into shared memory.
+        If None, draws are exchanged in lockstep with the chain processes.
+    mp_shared_trace : bool
+        Whether the chain processes write directly into traces in shared memory.
+    pool : SamplerPool, optional
+        A pool of worker processes that samples the chains instead of new processes.
+    checkpoint : str, optional
+        Directory of the checkpoints to save and to resume from.
+    checkpoint_every : int
+        Number of draws after which the checkpoint of a chain is updated.
+    thin : int
+        Only every `thin`-th draw is sent by the chain processes and recorded.
+    record_tune : bool
+        Whether the tuning draws are recorded.
+    expected_draws : int, optional
+        Number of draws, including tuning, that the traces are allocated for, if it is
+        less than `draws`. The traces grow when more draws are recorded.
+    point_names : list of str, optional
+        Names of the value variables that the recorded variables depend on. If given,
+        the chain processes only send the values of these variables.
 
     Returns
     -------
@@ -988,12 +1413,15 @@ def _mp_sample(
     """
     import pymc.sampling.parallel as ps
 
+    if expected_draws is None:
+        expected_draws = draws
     # We did draws += tune in pm.sample
     draws -= tune
 
+    n_tune = _thinned_length(tune, thin) if record_tune else 0
     traces = [
         _init_trace(
-            expected_length=draws + tune,
+            expected_length=n_tune + _thinned_length(expected_draws - tune, thin),
             stats_dtypes=step.stats_dtypes,
             chain_number=chain_number,
             trace=trace,
@@ -1002,24 +1430,80 @@ def _mp_sample(
         for chain_number in range(chains)
     ]
 
-    sampler = ps.ParallelSampler(
-        draws=draws,
-        tune=tune,
-        chains=chains,
-        cores=cores,
-        seeds=random_seed,
-        start_points=start,
-        step_method=step,
-        progressbar=progressbar,
-        mp_ctx=mp_ctx,
-    )
+    resumes = [None] * chains
+    # The number of draws of every chain that are saved in its checkpoint
+    saved_draws = [0] * chains
+    if checkpoint is not None:
+        resumes = [load_checkpoint(checkpoint, chain) for chain in range(chains)]
+        start = list(start)
+        for chain, (strace, resume) in enumerate(zip(traces, resumes)):
+            if resume is None:
+                continue
+            restore_trace(strace, resume)
+            start[chain] = resume.point
+            saved_draws[chain] = resume.draw
+            if resume.draw == draws + tune:
+                # The chain was already completed before
+                strace.close()
+
+    if pool is not None:
+        if mp_buffer_size is not None or mp_shared_trace:
+            raise ValueError(
+                "mp_buffer_size and mp_shared_trace can not be used with a SamplerPool."
+            )
+        sampler = pool.run(
+            draws=draws,
+            tune=tune,
+            chains=chains,
+            seeds=random_seed,
+            start_points=start,
+            progressbar=progressbar,
+            point_names=point_names,
+        )
+    else:
+        sampler = ps.ParallelSampler(
+            draws=draws,
+            tune=tune,
+            chains=chains,
+            cores=cores,
+            seeds=random_seed,
+            start_points=start,
+            step_method=step,
+            progressbar=progressbar,
+            mp_ctx=mp_ctx,
+            buffer_size=mp_buffer_size,
+            shared_traces=traces if mp_shared_trace else None,
+            checkpoint_every=None if checkpoint is None else checkpoint_every,
+            resume_states=[
+                None if resume is None else (resume.draw, resume.step_state, resume.random_state)
+                for resume in resumes
+            ],
+            thin=thin,
+            point_names=point_names,
+        )
     try:
         try:
             with sampler:
                 for draw in sampler:
                     strace = traces[draw.chain]
-                    strace.record(draw.point, draw.stats)
                     log_warning_stats(draw.stats)
+                    if draw.tuning and not record_tune:
+                        continue
+                    if mp_shared_trace:
+                        ps._record_shared_draw(strace, draw)
+                    else:
+                        strace.record(draw.point, draw.stats)
+                    if draw.checkpoint is not None:
+                        n_draws = draw.draw_idx + 1
+                        chain_checkpoint = make_checkpoint(
+                            strace,
+                            n_draws,
+                            draw.point,
+                            *draw.checkpoint,
+                            start=saved_draws[draw.chain],
+                        )
+                        save_checkpoint(checkpoint, draw.chain, chain_checkpoint)
+                        saved_draws[draw.chain] = n_draws
                     if draw.is_last:
                         strace.close()
 
@@ -1037,7 +1521,289 @@ def _mp_sample(
         return MultiTrace(traces)
     except KeyboardInterrupt:
         if discard_tuned_samples:
-            traces, length = _choose_chains(traces, tune)
+            traces, length = _choose_chains(traces, n_tune)
+        else:
+            traces, length = _choose_chains(traces, 0)
+        return MultiTrace(traces)[:length]
+    finally:
+        for strace in traces:
+            strace.close()
+
+
+def _mt_sample(
+    draws: int,
+    tune: int,
+    step,
+    chains: int,
+    cores: int,
+    random_seed: Optional[Sequence[RandomSeed]],
+    start: Sequence[PointType],
+    progressbar: bool = True,
+    trace: Optional[BaseTrace] = None,
+    model=None,
+    callback=None,
+    discard_tuned_samples: bool = True,
+    thin: int = 1,
+    record_tune: bool = True,
+    expected_draws: Optional[int] = None,
+    **kwargs,
+) -> MultiTrace:
+    """Main iteration for multithreaded sampling.
+
+    All chains are sampled in one process, using a pool of ``cores`` threads.
+    Every chain gets a copy of the step method that shares the compiled functions
+    of ``step``, so that nothing is pickled or recompiled.
+
+    Parameters
+    ----------
+    draws : int
+        The number of samples to draw
+    tune : int
+        Number of iterations to tune.
+    step : function
+        Step function
+    chains : int
+        The number of chains to sample.
+    cores : int
+        The number of chains to run in parallel.
+    random_seed : list of random seeds, optional
+        Ignored, because the step methods share the global NumPy random state and
+        the draws depend on how the threads are scheduled.
+    start : list
+        Starting points for each chain.
+        Dicts must contain numeric (transformed) initial values for all (transformed) free variables.
+    progressbar : bool
+        Whether or not to display a progress bar in the command line.
+    trace : BaseTrace, optional
+        A backend instance, or None.
+        If None, the NDArray backend is used.
+    model : Model (optional if in ``with`` context)
+    callback : Callable
+        A function which gets called for every sample from the trace of a chain. The function is
+        called with the trace and the current draw and will contain all samples for a single trace.
+        The callback is always called from the main thread.
+        Sampling can be interrupted by throwing a ``KeyboardInterrupt`` in the callback.
+    thin : int
+        Only every `thin`-th draw is recorded.
+    expected_draws : int, optional
+        Number of draws, including tuning, that the traces are allocated for, if it is
+        less than `draws`. The traces grow when more draws are recorded.
+
+    Returns
+    -------
+    mtrace : pymc.backends.base.MultiTrace
+        A ``MultiTrace`` object that contains the samples for all chains.
+    """
+    import pymc.sampling.parallel as ps
+
+    model = modelcontext(model)
+
+    steps = [step] + [ps.thread_local_copy(step) for _ in range(chains - 1)]
+    # Setting up a trace compiles a function, which must not happen concurrently.
+    if trace is None:
+        chain_traces = [NDArray(model=model) for _ in range(chains)]
+    else:
+        chain_traces = [trace] + [ps.thread_local_copy(trace) for _ in range(chains - 1)]
+    traces: List[Optional[BaseTrace]] = [None] * chains
+    messages: queue.Queue = queue.Queue()
+    stop = threading.Event()
+
+    def run_chain(chain):
+        def report_draw(trace, draw):
+            traces[chain] = trace
+            messages.put(("draw", trace, draw))
+
+        try:
+            with model:
+                sampling = _iter_sample(
+                    draws,
+                    steps[chain],
+                    start[chain],
+                    chain_traces[chain],
+                    chain,
+                    tune,
+                    model,
+                    None,
+                    report_draw,
+                    thin=thin,
+                    record_tune=record_tune,
+                    expected_draws=expected_draws,
+                )
+                for _ in sampling:
+                    if stop.is_set():
+                        sampling.close()
+                        break
+        except BaseException as e:
+            messages.put(("error", chain, e))
+        else:
+            messages.put(("done", chain, None))
+
+    n_tune = _thinned_length(tune, thin) if record_tune else 0
+    n_divergences = 0
+    desc = "Sampling {chains:d} chains, {divergences:,d} divergences"
+    pbar = None
+    if progressbar:
+        n_recorded = n_tune + _thinned_length(draws - tune, thin)
+        pbar = progress_bar(range(chains * n_recorded), display=progressbar)
+        pbar.comment = desc.format(chains=chains, divergences=n_divergences)
+        pbar.update(0)
+    total_draws = 0
+
+    pool = ThreadPoolExecutor(max_workers=cores, thread_name_prefix="pymc_chain")
+    try:
+        for chain in range(chains):
+            pool.submit(run_chain, chain)
+        n_running = chains
+        while n_running:
+            msg = messages.get()
+            if msg[0] == "error":
+                raise msg[2]
+            if msg[0] == "done":
+                n_running -= 1
+                continue
+            _, strace, draw = msg
+            total_draws += 1
+            if not draw.tuning and draw.stats and draw.stats[0].get("diverging"):
+                n_divergences += 1
+                if pbar:
+                    pbar.comment = desc.format(chains=chains, divergences=n_divergences)
+            if pbar:
+                pbar.update(total_draws)
+            if callback is not None:
+                callback(trace=strace, draw=draw)
+        return MultiTrace(traces)
+    except KeyboardInterrupt:
+        stop.set()
+        pool.shutdown(wait=True)
+        started = [strace for strace in traces if strace is not None]
+        if discard_tuned_samples:
+            started, length = _choose_chains(started, n_tune)
+        else:
+            started, length = _choose_chains(started, 0)
+        return MultiTrace(started)[:length]
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+
+
+def _vectorized_sample(
+    draws: int,
+    tune: int,
+    step,
+    chains: int,
+    random_seed: Optional[Sequence[RandomSeed]],
+    start: Sequence[PointType],
+    progressbar: bool = True,
+    trace: Optional[BaseTrace] = None,
+    model=None,
+    callback=None,
+    discard_tuned_samples: bool = True,
+    thin: int = 1,
+    record_tune: bool = True,
+    expected_draws: Optional[int] = None,
+    **kwargs,
+) -> MultiTrace:
+    """Main iteration for vectorized sampling.
+
+    All chains are sampled in lockstep in the current process, and the logp and
+    its gradient are evaluated for all chains in a single call.
+
+    Parameters
+    ----------
+    draws : int
+        The number of samples to draw
+    tune : int
+        Number of iterations to tune.
+    step : NUTS
+        The NUTS step method, whose tuning state is copied for every chain.
+    chains : int
+        The number of chains to sample.
+    random_seed : list of random seeds, optional
+        Random seeds for each chain. Every chain draws from a NumPy random state
+        that is seeded with its own seed.
+    start : list
+        Starting points for each chain.
+        Dicts must contain numeric (transformed) initial values for all (transformed) free variables.
+    progressbar : bool
+        Whether or not to display a progress bar in the command line.
+    trace : BaseTrace, optional
+        A backend instance, or None.
+        If None, the NDArray backend is used.
+    model : Model (optional if in ``with`` context)
+    callback : Callable
+        A function which gets called for every sample from the trace of a chain. The function is
+        called with the trace and the current draw and will contain all samples for a single trace.
+        Sampling can be interrupted by throwing a ``KeyboardInterrupt`` in the callback.
+    thin : int
+        Only every `thin`-th draw is recorded.
+    expected_draws : int, optional
+        Number of draws, including tuning, that the traces are allocated for, if it is
+        less than `draws`. The traces grow when more draws are recorded.
+
+    Returns
+    -------
+    mtrace : pymc.backends.base.MultiTrace
+        A ``MultiTrace`` object that contains the samples for all chains.
+    """
+    from pymc.step_methods.hmc.vectorized import VectorizedNUTS
+
+    model = modelcontext(model)
+
+    if expected_draws is None:
+        expected_draws = draws
+    vectorized_step = VectorizedNUTS(step, chains, random_seed)
+    n_tune = _thinned_length(tune, thin) if record_tune else 0
+    traces = [
+        _init_trace(
+            expected_length=n_tune + _thinned_length(expected_draws - tune, thin),
+            stats_dtypes=step.stats_dtypes,
+            chain_number=chain,
+            trace=trace,
+            model=model,
+        )
+        for chain in range(chains)
+    ]
+
+    n_divergences = 0
+    desc = "Sampling {chains:d} chains, {divergences:,d} divergences"
+    pbar = None
+    if progressbar:
+        n_recorded = n_tune + _thinned_length(draws - tune, thin)
+        pbar = progress_bar(range(chains * n_recorded), display=progressbar)
+        pbar.comment = desc.format(chains=chains, divergences=n_divergences)
+        pbar.update(0)
+    total_draws = 0
+
+    points = list(start)
+    try:
+        vectorized_step.reset_tuning(bool(tune))
+        for i in range(draws):
+            if i == tune:
+                vectorized_step.stop_tuning()
+            draws_i = vectorized_step.step(points)
+            keep = _keep_draw(i, tune, draws, thin) and (record_tune or i >= tune)
+            for chain, (point, stats) in enumerate(draws_i):
+                points[chain] = point
+                log_warning_stats(stats)
+                if i >= tune and stats[0].get("diverging"):
+                    n_divergences += 1
+                if not keep:
+                    continue
+                strace = traces[chain]
+                strace.record(point, stats)
+                total_draws += 1
+                if callback is not None:
+                    callback(
+                        trace=strace,
+                        draw=Draw(chain, i + 1 == draws, i, i < tune, stats, point),
+                    )
+            if pbar:
+                pbar.comment = desc.format(chains=chains, divergences=n_divergences)
+                pbar.update(total_draws)
+        return MultiTrace(traces)
+    except KeyboardInterrupt:
+        if discard_tuned_samples:
+            traces, length = _choose_chains(traces, n_tune)
         else:
             traces, length = _choose_chains(traces, 0)
         return MultiTrace(traces)[:length]
@@ -12,28 +12,66 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import copy
 import ctypes
+import enum
 import logging
 import multiprocessing
 import multiprocessing.sharedctypes
 import platform
 import time
 import traceback
+import types
 
 from collections import namedtuple
-from typing import Dict, List, Sequence
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import cloudpickle
 import numpy as np
 
 from fastprogress.fastprogress import progress_bar
-
+from pytensor.compile.function.types import Function
+from pytensor.compile.sharedvalue import SharedVariable
+from pytensor.graph.basic import Variable
+from pytensor.graph.fg import FunctionGraph
+from pytensor.graph.op import Op
+from pytensor.link.basic import Container
+
+from pymc.backends.base import BaseTrace
+from pymc.backends.ndarray import NDArray
 from pymc.blocking import DictToArrayBijection
 from pymc.exceptions import SamplingError
+from pymc.model import Model, modelcontext
+from pymc.sampling.checkpoint import dump_step_state, load_step_state
 from pymc.util import RandomSeed
 
+__all__ = ["SamplerPool"]
+
 logger = logging.getLogger("pymc")
 
+# Objects that step methods sampling in different threads can safely share
+_THREAD_SHARED_TYPES = (
+    str,
+    bytes,
+    int,
+    float,
+    complex,
+    type(None),
+    type,
+    np.generic,
+    np.dtype,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.ModuleType,
+    enum.Enum,
+    Model,
+    Variable,
+    FunctionGraph,
+    Op,
+)
+
 
 class ParallelSamplingError(Exception):
     def __init__(self, message, chain):
@@ -67,7 +105,9 @@ def rebuild_exc(exc, tb):
 
 
 # Messages
-# ('writing_done', is_last, sample_idx, tuning, stats)
+# ('writing_done', is_last, sample_idx, tuning, stats, checkpoint)
+# ('writing_done_batch', [(slot, is_last, sample_idx, tuning, stats), ...])
+# ('trace_written_batch', [(is_last, sample_idx, tuning, diverging, stats), ...])
 # ('error', *exception_info)
 
 # ('abort', reason)
@@ -75,10 +115,43 @@ def rebuild_exc(exc, tb):
 # ('start',)
 
 
+def _keep_draw(draw: int, tune: int, total: int, thin: int) -> bool:
+    """Whether a draw is recorded when the draws are thinned by `thin`.
+
+    The tuning and the posterior draws are thinned separately, such that
+    the last draw of each phase is always kept.
+    """
+    end = tune if draw < tune else total
+    return (end - 1 - draw) % thin == 0
+
+
+def _thinned_length(draws: int, thin: int) -> int:
+    """Number of draws that are kept out of `draws` draws of a phase."""
+    return -(-draws // thin)
+
+
 class _Process:
     """Separate process for each chain.
     We communicate with the main process using a pipe,
     and send finished samples using shared memory.
+
+    If `buffer_size` is given, the shared memory holds `buffer_size`
+    points that are used as a ring buffer. The process then samples
+    ahead without waiting for `write_next` messages, and the number
+    of slots it may still write to is tracked by the `free_slots`
+    semaphore, which the main process releases after reading a slot.
+
+    If `shared_trace` is given, the process writes its draws and sampler
+    stats directly into the preallocated trace arrays in shared memory,
+    and only reports its progress to the main process.
+
+    If `checkpoint_every` is given, the state of the step method and of the
+    random number generator is sent along with every `checkpoint_every`-th draw,
+    and a chain can be resumed from such a state with `resume_state`.
+
+    If `thin` is larger than 1, only every `thin`-th draw is sent to the main process.
+
+    Only the values of the variables in `point_names` are sent to the main process.
     """
 
     def __init__(
@@ -91,6 +164,13 @@ class _Process:
         draws: int,
         tune: int,
         seed,
+        buffer_size: Optional[int] = None,
+        free_slots=None,
+        shared_trace=None,
+        checkpoint_every: Optional[int] = None,
+        resume_state=None,
+        thin: int = 1,
+        point_names: Sequence[str] = (),
     ):
         self._msg_pipe = msg_pipe
         self._step_method = step_method
@@ -100,6 +180,13 @@ class _Process:
         self._at_seed = seed + 1
         self._draws = draws
         self._tune = tune
+        self._buffer_size = buffer_size
+        self._free_slots = free_slots
+        self._shared_trace = shared_trace
+        self._checkpoint_every = checkpoint_every
+        self._resume_state = resume_state
+        self._thin = thin
+        self._point_names = point_names
 
     def _unpickle_step_method(self):
         unpickle_error = (
@@ -119,7 +206,12 @@ class _Process:
             # would destroy the shared memory.
             self._unpickle_step_method()
             self._point = self._make_numpy_refs()
-            self._start_loop()
+            if self._shared_trace is not None:
+                self._start_shared_trace_loop()
+            elif self._buffer_size is None:
+                self._start_loop()
+            else:
+                self._start_buffered_loop()
         except KeyboardInterrupt:
             pass
         except BaseException as e:
@@ -141,22 +233,36 @@ class _Process:
         point = {}
         # XXX: I'm assuming that the processes are properly synchronized...
         for name, (array, shape, dtype) in self._shared_point.items():
+            if self._buffer_size is not None:
+                shape = (self._buffer_size, *shape)
             point[name] = np.frombuffer(array, dtype).reshape(shape)
         return point
 
     def _write_point(self, point):
         # XXX: What do we do when the underlying points change shape?
-        for name, vals in point.items():
-            self._point[name][...] = vals
+        for name in self._point_names:
+            self._point[name][...] = point[name]
 
     def _recv_msg(self):
         return self._msg_pipe.recv()
 
+    def _checkpoint(self, draw: int, is_last: bool):
+        if self._checkpoint_every is None:
+            return None
+        if not is_last and (draw + 1) % self._checkpoint_every != 0:
+            return None
+        return dump_step_state(self._step_method), np.random.get_state()
+
     def _start_loop(self):
         np.random.seed(self._seed)
 
         draw = 0
         tuning = True
+        if self._resume_state is not None:
+            draw, step_state, random_state = self._resume_state
+            load_step_state(self._step_method, step_state)
+            np.random.set_state(random_state)
+            tuning = draw < self._tune
 
         msg = self._recv_msg()
         if msg[0] == "abort":
@@ -164,31 +270,169 @@ class _Process:
         if msg[0] != "start":
             raise ValueError("Unexpected msg " + msg[0])
 
+        total = self._draws + self._tune
+        # Thinned out draws are not written to the shared point, so the
+        # current point has to be kept by the process.
+        point = self._point
         while True:
             if draw == self._tune:
                 self._step_method.stop_tuning()
                 tuning = False
 
-            if draw < self._draws + self._tune:
+            if draw < total:
                 try:
-                    point, stats = self._step_method.step(self._point)
+                    point, stats = self._step_method.step(point)
                 except SamplingError as e:
                     e = ExceptionWithTraceback(e, e.__traceback__)
                     self._msg_pipe.send(("error", e))
             else:
                 return
 
+            if not _keep_draw(draw, self._tune, total, self._thin):
+                draw += 1
+                continue
+
             msg = self._recv_msg()
             if msg[0] == "abort":
                 raise KeyboardInterrupt()
             elif msg[0] == "write_next":
                 self._write_point(point)
                 is_last = draw + 1 == self._draws + self._tune
-                self._msg_pipe.send(("writing_done", is_last, draw, tuning, stats))
+                checkpoint = self._checkpoint(draw, is_last)
+                self._msg_pipe.send(("writing_done", is_last, draw, tuning, stats, checkpoint))
                 draw += 1
             else:
                 raise ValueError("Unknown message " + msg[0])
 
+    def _check_abort(self):
+        if self._msg_pipe.poll():
+            msg = self._recv_msg()
+            if msg[0] == "abort":
+                raise KeyboardInterrupt()
+            raise ValueError("Unexpected msg " + msg[0])
+
+    def _flush_draws(self, pending):
+        if pending:
+            self._msg_pipe.send(("writing_done_batch", pending.copy()))
+            pending.clear()
+        self._check_abort()
+
+    def _acquire_slot(self, pending):
+        if self._free_slots.acquire(block=False):
+            return
+        # The main process can only free slots after it knows about them
+        self._flush_draws(pending)
+        while not self._free_slots.acquire(timeout=0.1):
+            self._check_abort()
+
+    def _start_buffered_loop(self):
+        np.random.seed(self._seed)
+
+        msg = self._recv_msg()
+        if msg[0] == "abort":
+            raise KeyboardInterrupt()
+        if msg[0] != "start":
+            raise ValueError("Unexpected msg " + msg[0])
+
+        # The main process wrote the start point into the first slot
+        point = {name: vals[0].copy() for name, vals in self._point.items()}
+        flush_every = max(1, self._buffer_size // 2)
+        total = self._draws + self._tune
+        tuning = True
+        pending: List[Tuple] = []
+        n_written = 0
+
+        for draw in range(total):
+            if draw == self._tune:
+                self._step_method.stop_tuning()
+                tuning = False
+
+            try:
+                point, stats = self._step_method.step(point)
+            except SamplingError:
+                self._flush_draws(pending)
+                raise
+
+            if not _keep_draw(draw, self._tune, total, self._thin):
+                continue
+            self._acquire_slot(pending)
+            slot = n_written % self._buffer_size
+            n_written += 1
+            for name in self._point_names:
+                self._point[name][slot] = point[name]
+
+            is_last = draw + 1 == total
+            pending.append((slot, is_last, draw, tuning, stats))
+            if is_last or len(pending) >= flush_every:
+                self._flush_draws(pending)
+
+    def _make_trace_refs(self):
+        trace_fn, trace_fn_is_pickled, samples, stats = self._shared_trace
+        if trace_fn_is_pickled:
+            trace_fn = cloudpickle.loads(trace_fn)
+        sample_arrays = {
+            name: np.frombuffer(array, dtype, count=int(np.prod(shape))).reshape(shape)
+            for name, (array, shape, dtype) in samples.items()
+        }
+        stat_arrays = [
+            {
+                key: np.frombuffer(array, dtype, count=size)
+                for key, (array, size, dtype) in sampler_stats.items()
+            }
+            for sampler_stats in stats
+        ]
+        return trace_fn, sample_arrays, stat_arrays
+
+    def _start_shared_trace_loop(self):
+        np.random.seed(self._seed)
+
+        msg = self._recv_msg()
+        if msg[0] == "abort":
+            raise KeyboardInterrupt()
+        if msg[0] != "start":
+            raise ValueError("Unexpected msg " + msg[0])
+
+        trace_fn, sample_arrays, stat_arrays = self._make_trace_refs()
+        point = {name: vals.copy() for name, vals in self._point.items()}
+        total = self._draws + self._tune
+        tuning = True
+        pending: List[Tuple] = []
+        last_flush = time.time()
+
+        for draw in range(total):
+            if draw == self._tune:
+                self._step_method.stop_tuning()
+                tuning = False
+
+            try:
+                point, stats = self._step_method.step(point)
+            except SamplingError:
+                self._msg_pipe.send(("trace_written_batch", pending))
+                raise
+
+            for values, value in zip(sample_arrays.values(), trace_fn(point)):
+                values[draw] = value
+            # Stats that can not be stored in shared memory are sent along
+            # with the progress report.
+            unshared_stats = []
+            for arrays, sampler_stats in zip(stat_arrays, stats):
+                unshared = {}
+                for key, val in sampler_stats.items():
+                    if key in arrays:
+                        arrays[key][draw] = val
+                    else:
+                        unshared[key] = val
+                unshared_stats.append(unshared)
+
+            is_last = draw + 1 == total
+            diverging = bool(stats and stats[0].get("diverging"))
+            pending.append((is_last, draw, tuning, diverging, unshared_stats))
+            if is_last or time.time() - last_flush > 0.1:
+                self._msg_pipe.send(("trace_written_batch", pending))
+                pending = []
+                last_flush = time.time()
+                self._check_abort()
+
 
 def _run_process(*args):
     _Process(*args).run()
@@ -207,6 +451,12 @@ class ProcessAdapter:
         seed,
         start: Dict[str, np.ndarray],
         mp_ctx,
+        buffer_size: Optional[int] = None,
+        shared_trace=None,
+        checkpoint_every: Optional[int] = None,
+        resume_state=None,
+        thin: int = 1,
+        point_names: Optional[Sequence[str]] = None,
     ):
         self.chain = chain
         process_name = "worker_chain_%s" % chain
@@ -214,21 +464,36 @@ class ProcessAdapter:
 
         self._shared_point = {}
         self._point = {}
+        self._buffer_size = buffer_size
+        self._free_slots = None
+        if buffer_size is not None:
+            if buffer_size < 1:
+                raise ValueError("buffer_size must be at least 1.")
+            self._free_slots = mp_ctx.Semaphore(buffer_size)
 
         for name, shape, dtype in DictToArrayBijection.map(start).point_map_info:
             size = 1
             for dim in shape:
                 size *= int(dim)
             size *= dtype.itemsize
+            if buffer_size is not None:
+                size *= buffer_size
             if size != ctypes.c_size_t(size).value:
                 raise ValueError("Variable %s is too large" % name)
 
             array = mp_ctx.RawArray("c", size)
             self._shared_point[name] = (array, shape, dtype)
-            array_np = np.frombuffer(array, dtype).reshape(shape)
-            array_np[...] = start[name]
+            if buffer_size is None:
+                array_np = np.frombuffer(array, dtype).reshape(shape)
+                array_np[...] = start[name]
+            else:
+                array_np = np.frombuffer(array, dtype).reshape((buffer_size, *shape))
+                array_np[0] = start[name]
             self._point[name] = array_np
 
+        if point_names is None:
+            point_names = list(self._point)
+        self._point_names = point_names
         self._readable = True
         self._num_samples = 0
 
@@ -254,6 +519,13 @@ class ProcessAdapter:
                 draws,
                 tune,
                 seed,
+                buffer_size,
+                self._free_slots,
+                shared_trace,
+                checkpoint_every,
+                resume_state,
+                thin,
+                point_names,
             ),
         )
         self._process.start()
@@ -270,6 +542,11 @@ class ProcessAdapter:
             raise RuntimeError()
         return self._point
 
+    @property
+    def point_names(self) -> Sequence[str]:
+        """Names of the variables whose values the process sends."""
+        return self._point_names
+
     def _send(self, msg, *args):
         try:
             self._msg_pipe.send((msg, *args))
@@ -298,6 +575,12 @@ class ProcessAdapter:
         self._readable = False
         self._send("write_next")
 
+    def read_slot(self, slot: int) -> Dict[str, np.ndarray]:
+        """Copy the point in a ring buffer slot and hand the slot back to the process."""
+        point = {name: self._point[name][slot].copy() for name in self._point_names}
+        self._free_slots.release()
+        return point
+
     def abort(self):
         self._send("abort")
 
@@ -308,7 +591,7 @@ class ProcessAdapter:
         self._process.terminate()
 
     @staticmethod
-    def recv_draw(processes, timeout=3600):
+    def _recv_msg(processes):
         if not processes:
             raise ValueError("No processes.")
         pipes = [proc._msg_pipe for proc in processes]
@@ -328,13 +611,35 @@ class ProcessAdapter:
             else:
                 error = RuntimeError(f"Chain {proc.chain} failed.")
             raise error from old_error
-        elif msg[0] == "writing_done":
+        return proc, msg
+
+    @staticmethod
+    def recv_draw(processes, timeout=3600):
+        proc, msg = ProcessAdapter._recv_msg(processes)
+        if msg[0] == "writing_done":
             proc._readable = True
             proc._num_samples += 1
             return (proc,) + msg[1:]
         else:
             raise ValueError("Sampler sent bad message.")
 
+    @staticmethod
+    def recv_draws(processes):
+        """Receive the next batch of draws written to the ring buffer of any process.
+
+        Returns the process and a list of `(slot, is_last, draw_idx, tuning, stats)`
+        tuples. Each slot has to be read with `read_slot` before the process can
+        write to it again.
+        Processes that write to a shared trace instead report
+        `(is_last, draw_idx, tuning, diverging, stats)` tuples.
+        """
+        proc, msg = ProcessAdapter._recv_msg(processes)
+        if msg[0] in ("writing_done_batch", "trace_written_batch"):
+            proc._num_samples += len(msg[1])
+            return proc, msg[1]
+        else:
+            raise ValueError("Sampler sent bad message.")
+
     @staticmethod
     def terminate_all(processes, patience=2):
         for process in processes:
@@ -360,7 +665,29 @@ class ProcessAdapter:
                 process.join()
 
 
-Draw = namedtuple("Draw", ["chain", "is_last", "draw_idx", "tuning", "stats", "point"])
+Draw = namedtuple(
+    "Draw",
+    ["chain", "is_last", "draw_idx", "tuning", "stats", "point", "checkpoint"],
+    defaults=[None],
+)
+
+
+def _get_mp_ctx(mp_ctx):
+    if mp_ctx is None or isinstance(mp_ctx, str):
+        # Closes issue https://github.com/pymc-devs/pymc/issues/3849
+        # Related issue https://github.com/pymc-devs/pymc/issues/5339
+        if mp_ctx is None and platform.system() == "Darwin":
+            if platform.processor() == "arm":
+                mp_ctx = "fork"
+                logger.debug(
+                    "mp_ctx is set to 'fork' for MacOS with ARM architecture. "
+                    + "This might cause unexpected behavior with JAX, which is inherently multithreaded."
+                )
+            else:
+                mp_ctx = "forkserver"
+
+        mp_ctx = multiprocessing.get_context(mp_ctx)
+    return mp_ctx
 
 
 class ParallelSampler:
@@ -376,30 +703,49 @@ class ParallelSampler:
         step_method,
         progressbar: bool = True,
         mp_ctx=None,
+        buffer_size: Optional[int] = None,
+        shared_traces: Optional[Sequence[BaseTrace]] = None,
+        checkpoint_every: Optional[int] = None,
+        resume_states: Optional[Sequence] = None,
+        thin: int = 1,
+        point_names: Optional[Sequence[str]] = None,
     ):
 
         if any(len(arg) != chains for arg in [seeds, start_points]):
             raise ValueError("Number of seeds and start_points must be %s." % chains)
+        if resume_states is None:
+            resume_states = [None] * chains
+        if (checkpoint_every is not None or any(resume_states)) and (
+            buffer_size is not None or shared_traces is not None
+        ):
+            raise ValueError("Checkpoints can not be combined with buffer_size or shared_traces.")
+        if thin > 1 and (checkpoint_every is not None or shared_traces is not None):
+            raise ValueError("thin can not be combined with checkpoints or shared_traces.")
 
-        if mp_ctx is None or isinstance(mp_ctx, str):
-            # Closes issue https://github.com/pymc-devs/pymc/issues/3849
-            # Related issue https://github.com/pymc-devs/pymc/issues/5339
-            if mp_ctx is None and platform.system() == "Darwin":
-                if platform.processor() == "arm":
-                    mp_ctx = "fork"
-                    logger.debug(
-                        "mp_ctx is set to 'fork' for MacOS with ARM architecture. "
-                        + "This might cause unexpected behavior with JAX, which is inherently multithreaded."
-                    )
-                else:
-                    mp_ctx = "forkserver"
-
-            mp_ctx = multiprocessing.get_context(mp_ctx)
+        mp_ctx = _get_mp_ctx(mp_ctx)
 
         step_method_pickled = None
         if mp_ctx.get_start_method() != "fork":
             step_method_pickled = cloudpickle.dumps(step_method, protocol=-1)
 
+        if shared_traces is not None:
+            if buffer_size is not None:
+                raise ValueError("buffer_size can not be combined with shared_traces.")
+            if len(shared_traces) != chains:
+                raise ValueError("Number of shared_traces must be %s." % chains)
+            # All traces of a run are set up from the same model,
+            # so the chain processes can share one trace function.
+            trace_fn = shared_traces[0].fn
+            trace_fn_pickled = step_method_pickled is not None
+            if trace_fn_pickled:
+                trace_fn = cloudpickle.dumps(trace_fn, protocol=-1)
+            shared_trace_args = [
+                (trace_fn, trace_fn_pickled, *_share_trace_arrays(strace, mp_ctx))
+                for strace in shared_traces
+            ]
+        else:
+            shared_trace_args = [None] * chains
+
         self._samplers = [
             ProcessAdapter(
                 draws,
@@ -410,31 +756,45 @@ class ParallelSampler:
                 seed,
                 start,
                 mp_ctx,
+                buffer_size,
+                shared_trace,
+                checkpoint_every,
+                resume_state,
+                thin,
+                point_names,
+            )
+            for chain, seed, start, shared_trace, resume_state in zip(
+                range(chains), seeds, start_points, shared_trace_args, resume_states
             )
-            for chain, seed, start in zip(range(chains), seeds, start_points)
+            # Chains that were completed before are not started again
+            if resume_state is None or resume_state[0] < draws + tune
         ]
 
         self._inactive = self._samplers.copy()
         self._finished: List[ProcessAdapter] = []
         self._active: List[ProcessAdapter] = []
         self._max_active = cores
+        self._buffer_size = buffer_size
+        self._shared_traces = shared_traces
 
         self._in_context = False
 
         self._progress = None
         self._divergences = 0
-        self._total_draws = 0
+        self._total_draws = sum(state[0] for state in resume_states if state is not None)
         self._desc = "Sampling {0._chains:d} chains, {0._divergences:,d} divergences"
         self._chains = chains
         if progressbar:
-            self._progress = progress_bar(range(chains * (draws + tune)), display=progressbar)
+            n_recorded = _thinned_length(tune, thin) + _thinned_length(draws, thin)
+            self._progress = progress_bar(range(chains * n_recorded), display=progressbar)
             self._progress.comment = self._desc.format(self)
 
     def _make_active(self):
         while self._inactive and len(self._active) < self._max_active:
             proc = self._inactive.pop(0)
             proc.start()
-            proc.write_next()
+            if self._buffer_size is None and self._shared_traces is None:
+                proc.write_next()
             self._active.append(proc)
 
     def __iter__(self):
@@ -445,9 +805,16 @@ class ParallelSampler:
         if self._active and self._progress:
             self._progress.update(self._total_draws)
 
+        if self._shared_traces is not None:
+            yield from self._iter_shared_traces()
+            return
+        if self._buffer_size is not None:
+            yield from self._iter_buffered()
+            return
+
         while self._active:
             draw = ProcessAdapter.recv_draw(self._active)
-            proc, is_last, draw, tuning, stats = draw
+            proc, is_last, draw, tuning, stats, checkpoint = draw
             self._total_draws += 1
             if not tuning and stats and stats[0].get("diverging"):
                 self._divergences += 1
@@ -466,13 +833,58 @@ class ParallelSampler:
             # and only call proc.write_next() after the yield returns.
             # This seems to be faster overally though, as the worker
             # loses less time waiting.
-            point = {name: val.copy() for name, val in proc.shared_point_view.items()}
+            point = {name: proc.shared_point_view[name].copy() for name in proc.point_names}
 
             # Already called for new proc in _make_active
             if not is_last:
                 proc.write_next()
 
-            yield Draw(proc.chain, is_last, draw, tuning, stats, point)
+            yield Draw(proc.chain, is_last, draw, tuning, stats, point, checkpoint)
+
+    def _iter_buffered(self):
+        while self._active:
+            proc, draws = ProcessAdapter.recv_draws(self._active)
+            for slot, is_last, draw, tuning, stats in draws:
+                self._total_draws += 1
+                if not tuning and stats and stats[0].get("diverging"):
+                    self._divergences += 1
+                    if self._progress:
+                        self._progress.comment = self._desc.format(self)
+
+                point = proc.read_slot(slot)
+
+                if is_last:
+                    proc.join()
+                    self._active.remove(proc)
+                    self._finished.append(proc)
+                    self._make_active()
+
+                yield Draw(proc.chain, is_last, draw, tuning, stats, point)
+
+            if self._progress:
+                self._progress.update(self._total_draws)
+
+    def _iter_shared_traces(self):
+        while self._active:
+            proc, draws = ProcessAdapter.recv_draws(self._active)
+            for is_last, draw, tuning, diverging, stats in draws:
+                self._total_draws += 1
+                if not tuning and diverging:
+                    self._divergences += 1
+                    if self._progress:
+                        self._progress.comment = self._desc.format(self)
+
+                if is_last:
+                    proc.join()
+                    self._active.remove(proc)
+                    self._finished.append(proc)
+                    self._make_active()
+
+                # The values were already written to the shared trace
+                yield Draw(proc.chain, is_last, draw, tuning, stats, None)
+
+            if self._progress:
+                self._progress.update(self._total_draws)
 
     def __enter__(self):
         self._in_context = True
@@ -482,6 +894,601 @@ class ParallelSampler:
         ProcessAdapter.terminate_all(self._samplers)
 
 
+class _JobAborted(Exception):
+    """Raised in a pool worker when the main process aborts the current job."""
+
+
+def _ring_layout(
+    start: Dict[str, np.ndarray], point_names: Optional[Sequence[str]], buffer_size: int
+) -> Tuple[List[Tuple[str, Tuple[int, ...], np.dtype, int]], int]:
+    """Place `buffer_size` slots for the values of `point_names` in one block of memory.
+
+    Returns a list of `(name, shape, dtype, offset)` tuples and the size of the block in bytes.
+    """
+    layout = []
+    nbytes = 0
+    for name, shape, dtype in DictToArrayBijection.map(start).point_map_info:
+        if point_names is not None and name not in point_names:
+            continue
+        layout.append((name, shape, dtype, nbytes))
+        size = buffer_size * int(np.prod(shape, dtype=int)) * dtype.itemsize
+        # Keep the slots of every variable aligned
+        nbytes += -(-size // 64) * 64
+    return layout, nbytes
+
+
+def _ring_views(buf, layout, buffer_size: int) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray((buffer_size, *shape), dtype, buffer=buf, offset=offset)
+        for name, shape, dtype, offset in layout
+    }
+
+
+class _PoolWorker:
+    """Long-lived process of a :class:`SamplerPool`.
+
+    The step method is unpickled once, and the process then samples one chain
+    after the other. Before every chain the values of the shared data variables
+    are updated, so that the compiled functions of the step method can be reused
+    for new data.
+
+    Like a :class:`_Process` with a `buffer_size`, the worker writes its draws
+    into a ring buffer of `buffer_size` slots in shared memory, and only sends the
+    slot indices and sampler stats through the pipe. Because the shapes of the
+    variables may change between jobs, the main process passes the name and the
+    layout of the shared memory block along with every job. The number of slots the
+    worker may still write to is tracked by the `free_slots` semaphore.
+    """
+
+    def __init__(
+        self, name: str, msg_pipe, payload, payload_is_pickled: bool, buffer_size: int, free_slots
+    ):
+        self._msg_pipe = msg_pipe
+        self._payload = payload
+        self._payload_is_pickled = payload_is_pickled
+        self._buffer_size = buffer_size
+        self._free_slots = free_slots
+        self._slots: Dict[str, np.ndarray] = {}
+
+    def run(self):
+        try:
+            if self._payload_is_pickled:
+                self._payload = cloudpickle.loads(self._payload)
+            self._step_method, self._data_vars = self._payload
+            while True:
+                msg = self._msg_pipe.recv()
+                if msg[0] == "job":
+                    self._run_job(*msg[1:])
+                elif msg[0] == "abort":
+                    # The job already finished, there is nothing to abort
+                    self._msg_pipe.send(("aborted",))
+                elif msg[0] == "close":
+                    return
+                else:
+                    raise ValueError("Unknown message " + msg[0])
+        except (KeyboardInterrupt, EOFError):
+            pass
+        finally:
+            self._msg_pipe.close()
+
+    def _check_abort(self):
+        if self._msg_pipe.poll():
+            msg = self._msg_pipe.recv()
+            if msg[0] == "abort":
+                raise _JobAborted()
+            raise ValueError("Unexpected msg " + msg[0])
+
+    def _flush_draws(self, pending):
+        if pending:
+            self._msg_pipe.send(("writing_done_batch", pending.copy()))
+            pending.clear()
+
+    def _acquire_slot(self, pending):
+        if self._free_slots.acquire(block=False):
+            return
+        # The main process can only free slots after it knows about them
+        self._flush_draws(pending)
+        while not self._free_slots.acquire(timeout=0.1):
+            self._check_abort()
+
+    def _write_slot(self, slot: int, point):
+        for name, values in self._slots.items():
+            values[slot] = point[name]
+
+    def _run_job(self, draws: int, tune: int, seed, start, data, ring_name: str, layout):
+        ring = shared_memory.SharedMemory(name=ring_name)
+        self._slots = _ring_views(ring.buf, layout, self._buffer_size)
+        try:
+            for var, value in zip(self._data_vars, data):
+                var.set_value(value)
+            step = self._step_method
+            step.tune = bool(tune)
+            if hasattr(step, "reset_tuning"):
+                step.reset_tuning()
+            np.random.seed(seed)
+
+            point = start
+            tuning = True
+            pending: List[Tuple] = []
+            flush_every = max(1, self._buffer_size // 2)
+            last_flush = time.time()
+            for draw in range(draws + tune):
+                if draw == tune:
+                    step.stop_tuning()
+                    tuning = False
+                point, stats = step.step(point)
+
+                self._acquire_slot(pending)
+                slot = draw % self._buffer_size
+                self._write_slot(slot, point)
+
+                is_last = draw + 1 == draws + tune
+                pending.append((slot, is_last, draw, tuning, stats))
+                if is_last or len(pending) >= flush_every or time.time() - last_flush > 0.1:
+                    self._flush_draws(pending)
+                    last_flush = time.time()
+                    # After the last draw, the next message may already be the next job
+                    if not is_last:
+                        self._check_abort()
+        except _JobAborted:
+            self._msg_pipe.send(("aborted",))
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            # The worker stays usable for the next job
+            self._msg_pipe.send(("error", ExceptionWithTraceback(e, e.__traceback__)))
+        finally:
+            # The shared memory can only be closed after its views were released
+            self._slots = {}
+            ring.close()
+
+
+def _run_pool_worker(*args):
+    _PoolWorker(*args).run()
+
+
+class SamplerPool:
+    """A pool of worker processes that is reused across calls to :func:`pymc.sample`.
+
+    Every call to :func:`pymc.sample` usually starts new processes, which then
+    have to unpickle the step method and load its compiled functions again.
+    The workers of a pool are started once and keep the step method in memory,
+    so that sampling models that only differ in their data (see
+    :func:`pymc.set_data`) does not pay this cost again.
+
+    Before every chain, the workers receive the current values of the shared
+    variables of the model, like :class:`pymc.MutableData` containers and
+    mutable dimension lengths, as well as the initial point of the chain.
+
+    Parameters
+    ----------
+    step_method : BlockedStep or CompoundStep
+        The step method that is used for all chains sampled by the pool.
+    cores : int, optional
+        The number of worker processes. Defaults to the number of CPUs
+        on the system, but at most 4.
+    model : Model (optional if in ``with`` context)
+    mp_ctx : multiprocessing.context.BaseContent
+        A multiprocessing context for the worker processes.
+    buffer_size : int, default 100
+        Number of draws every worker may write ahead into a shared memory ring buffer,
+        before the main process has collected them (see ``mp_buffer_size`` of
+        :func:`pymc.sample`).
+
+    Examples
+    --------
+    .. code:: python
+
+        with model:
+            with pm.SamplerPool(pm.NUTS(), cores=4) as pool:
+                for data in datasets:
+                    pm.set_data({"x": data})
+                    idata = pm.sample(pool=pool)
+    """
+
+    def __init__(
+        self,
+        step_method,
+        *,
+        cores: Optional[int] = None,
+        model=None,
+        mp_ctx=None,
+        buffer_size: int = 100,
+    ):
+        self.model = modelcontext(model)
+        self.step_method = step_method
+        if cores is None:
+            cores = min(4, _cpu_count())
+        if cores < 1:
+            raise ValueError("cores must be at least 1.")
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1.")
+        self.cores = cores
+        self.buffer_size = buffer_size
+
+        self._data_vars = [
+            var for var in self.model.named_vars.values() if isinstance(var, SharedVariable)
+        ]
+        self._data_vars.extend(
+            length
+            for length in self.model.dim_lengths.values()
+            if isinstance(length, SharedVariable)
+        )
+
+        mp_ctx = _get_mp_ctx(mp_ctx)
+        # The data variables are sent along with the step method, so that setting
+        # their values in the workers updates the storage of the compiled functions.
+        payload = (step_method, self._data_vars)
+        payload_is_pickled = mp_ctx.get_start_method() != "fork"
+        if payload_is_pickled:
+            payload = cloudpickle.dumps(payload, protocol=-1)
+
+        self._pipes = []
+        self._processes = []
+        self._free_slots = [mp_ctx.Semaphore(buffer_size) for _ in range(cores)]
+        # The ring buffers are allocated for the shapes of the first job of every
+        # worker, and only replaced when a later job needs more memory.
+        self._rings: List[Optional[shared_memory.SharedMemory]] = [None] * cores
+        for i in range(cores):
+            msg_pipe, remote_conn = multiprocessing.Pipe()
+            process = mp_ctx.Process(
+                daemon=True,
+                name=f"worker_pool_{i}",
+                target=_run_pool_worker,
+                args=(
+                    f"worker_pool_{i}",
+                    remote_conn,
+                    payload,
+                    payload_is_pickled,
+                    buffer_size,
+                    self._free_slots[i],
+                ),
+            )
+            process.start()
+            remote_conn.close()
+            self._pipes.append(msg_pipe)
+            self._processes.append(process)
+        self._closed = False
+
+    def run(
+        self,
+        *,
+        draws: int,
+        tune: int,
+        chains: int,
+        seeds: Sequence["RandomSeed"],
+        start_points: Sequence[Dict[str, np.ndarray]],
+        progressbar: bool = True,
+        point_names: Optional[Sequence[str]] = None,
+    ) -> "_SamplerPoolRun":
+        """Sample chains with the workers of the pool.
+
+        Returns a context manager that yields a :class:`Draw` for every
+        sample, in the same way as :class:`ParallelSampler`. If `point_names`
+        is given, the draws only hold the values of these variables.
+        """
+        if self._closed:
+            raise RuntimeError("The SamplerPool was closed.")
+        if any(len(arg) != chains for arg in [seeds, start_points]):
+            raise ValueError("Number of seeds and start_points must be %s." % chains)
+        data = [var.get_value(borrow=True) for var in self._data_vars]
+        return _SamplerPoolRun(
+            self, draws, tune, chains, seeds, start_points, data, progressbar, point_names
+        )
+
+    def _prepare_ring(self, worker: int, nbytes: int) -> shared_memory.SharedMemory:
+        """Return a ring buffer of at least `nbytes` for an idle worker, with all slots free."""
+        ring = self._rings[worker]
+        if ring is None or ring.size < nbytes:
+            if ring is not None:
+                ring.close()
+                ring.unlink()
+            ring = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+            self._rings[worker] = ring
+        # Reclaim the slots that were not handed back before the last job of the
+        # worker was aborted or failed.
+        free_slots = self._free_slots[worker]
+        while free_slots.acquire(block=False):
+            pass
+        for _ in range(self.buffer_size):
+            free_slots.release()
+        return ring
+
+    def close(self, patience=2):
+        """Stop the worker processes."""
+        if self._closed:
+            return
+        self._closed = True
+        for msg_pipe in self._pipes:
+            try:
+                msg_pipe.send(("close",))
+            except Exception:
+                pass
+        start_time = time.time()
+        for process in self._processes:
+            process.join(max(0, start_time + patience - time.time()))
+        for process, msg_pipe in zip(self._processes, self._pipes):
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            msg_pipe.close()
+        for ring in self._rings:
+            if ring is not None:
+                ring.close()
+                ring.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _SamplerPoolRun:
+    def __init__(
+        self,
+        pool: SamplerPool,
+        draws,
+        tune,
+        chains,
+        seeds,
+        start_points,
+        data,
+        progressbar,
+        point_names=None,
+    ):
+        self._pool = pool
+        self._draws = draws
+        self._tune = tune
+        self._seeds = seeds
+        self._start_points = start_points
+        self._data = data
+        self._point_names = point_names
+        self._pending = list(range(chains))
+        self._idle = list(range(pool.cores))
+        # Maps the index of a busy worker to the chain it samples
+        self._busy: Dict[int, int] = {}
+        # The ring buffer slots of the busy workers
+        self._slots: Dict[int, Dict[str, np.ndarray]] = {}
+        self._in_context = False
+
+        self._progress = None
+        self._divergences = 0
+        self._total_draws = 0
+        self._desc = "Sampling {0._chains:d} chains, {0._divergences:,d} divergences"
+        self._chains = chains
+        if progressbar:
+            self._progress = progress_bar(range(chains * (draws + tune)), display=progressbar)
+            self._progress.comment = self._desc.format(self)
+
+    def _make_active(self):
+        while self._pending and self._idle:
+            chain = self._pending.pop(0)
+            worker = self._idle.pop(0)
+            start = self._start_points[chain]
+            buffer_size = self._pool.buffer_size
+            layout, nbytes = _ring_layout(start, self._point_names, buffer_size)
+            ring = self._pool._prepare_ring(worker, nbytes)
+            self._slots[worker] = _ring_views(ring.buf, layout, buffer_size)
+            self._pool._pipes[worker].send(
+                (
+                    "job",
+                    self._draws,
+                    self._tune,
+                    self._seeds[chain],
+                    start,
+                    self._data,
+                    ring.name,
+                    layout,
+                )
+            )
+            self._busy[worker] = chain
+
+    def _release(self, worker: int):
+        del self._busy[worker]
+        # Drop the views, so that the pool can replace the shared memory
+        del self._slots[worker]
+        self._idle.append(worker)
+
+    def _read_slot(self, worker: int, slot: int) -> Dict[str, np.ndarray]:
+        point = {name: values[slot].copy() for name, values in self._slots[worker].items()}
+        self._pool._free_slots[worker].release()
+        return point
+
+    def __iter__(self):
+        if not self._in_context:
+            raise ValueError("Use the SamplerPool run as context manager.")
+        self._make_active()
+
+        if self._busy and self._progress:
+            self._progress.update(self._total_draws)
+
+        pipes = {id(self._pool._pipes[worker]): worker for worker in range(self._pool.cores)}
+        while self._busy:
+            ready = multiprocessing.connection.wait(
+                [self._pool._pipes[worker] for worker in self._busy]
+            )
+            worker = pipes[id(ready[0])]
+            chain = self._busy[worker]
+            msg = ready[0].recv()
+            if msg[0] == "error":
+                self._release(worker)
+                raise ParallelSamplingError(f"Chain {chain} failed with: {msg[1]}", chain) from msg[
+                    1
+                ]
+            if msg[0] != "writing_done_batch":
+                raise ValueError("Sampler sent bad message.")
+
+            for slot, is_last, draw, tuning, stats in msg[1]:
+                self._total_draws += 1
+                if not tuning and stats and stats[0].get("diverging"):
+                    self._divergences += 1
+                    if self._progress:
+                        self._progress.comment = self._desc.format(self)
+
+                point = self._read_slot(worker, slot)
+
+                if is_last:
+                    self._release(worker)
+                    self._make_active()
+
+                yield Draw(chain, is_last, draw, tuning, stats, point)
+
+            if self._progress:
+                self._progress.update(self._total_draws)
+
+    def __enter__(self):
+        self._in_context = True
+        return self
+
+    def __exit__(self, *args):
+        # Stop the remaining chains, but keep the workers alive for the next run
+        for worker in self._busy:
+            self._pool._pipes[worker].send(("abort",))
+        for worker in list(self._busy):
+            msg_pipe = self._pool._pipes[worker]
+            # Every abort is acknowledged, even if the job finished or failed meanwhile
+            while msg_pipe.recv()[0] != "aborted":
+                pass
+            self._release(worker)
+
+
+def _share_trace_arrays(strace: BaseTrace, mp_ctx):
+    """Move the preallocated arrays of an NDArray trace to shared memory.
+
+    Returns the shared sample and sampler stats arrays, so that they can be
+    handed to a chain process. Sampler stats of object dtype can not be
+    shared and remain in the main process.
+    """
+    if not isinstance(strace, NDArray):
+        raise ValueError(f"Only NDArray traces can be shared, got {type(strace).__name__}.")
+
+    samples = {}
+    for varname, values in strace.samples.items():
+        array = mp_ctx.RawArray("c", max(values.nbytes, 1))
+        shared = np.frombuffer(array, values.dtype, count=values.size).reshape(values.shape)
+        shared[...] = values
+        strace.samples[varname] = shared
+        samples[varname] = (array, values.shape, values.dtype)
+
+    stats = []
+    for data in strace._stats or []:
+        sampler_stats = {}
+        for key, values in data.items():
+            if values.dtype == object:
+                continue
+            array = mp_ctx.RawArray("c", max(values.nbytes, 1))
+            shared = np.frombuffer(array, values.dtype, count=values.size)
+            shared[...] = values
+            data[key] = shared
+            sampler_stats[key] = (array, values.size, values.dtype)
+        stats.append(sampler_stats)
+    return samples, stats
+
+
+def _record_shared_draw(strace: BaseTrace, draw: Draw):
+    """Register a draw that a chain process wrote to a shared trace.
+
+    Only the stats that could not be shared are stored by the main process.
+    """
+    if draw.stats:
+        for data, sampler_stats in zip(strace._stats, draw.stats):
+            for key, val in sampler_stats.items():
+                data[key][draw.draw_idx] = val
+    strace._update_online_stats(
+        [strace.samples[varname][draw.draw_idx] for varname in strace.varnames], draw.stats
+    )
+    strace.draw_idx = draw.draw_idx + 1
+
+
+def _collect_shared_variables(obj, found: Dict[int, SharedVariable], seen: set):
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, SharedVariable):
+        found[id(obj)] = obj
+    elif isinstance(obj, (Function, _THREAD_SHARED_TYPES)):
+        # The implicit inputs of compiled functions, like data containers, are
+        # not state of the step method and stay shared between the threads.
+        return
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            _collect_shared_variables(item, found, seen)
+    elif isinstance(obj, dict):
+        for item in obj.values():
+            _collect_shared_variables(item, found, seen)
+    elif hasattr(obj, "__dict__"):
+        for item in vars(obj).values():
+            _collect_shared_variables(item, found, seen)
+
+
+def _copy_for_thread(obj, swap: Dict[SharedVariable, SharedVariable], memo: Dict[int, Any]):
+    if id(obj) in memo:
+        return memo[id(obj)]
+
+    if isinstance(obj, SharedVariable):
+        new = swap.get(obj, obj)
+    elif isinstance(obj, Function):
+        # Copying the function reuses its rewritten graph and compiled thunks,
+        # but gives the copy its own input, output and intermediate storage.
+        fn_swap = {i.variable: swap[i.variable] for i in obj.maker.inputs if i.variable in swap}
+        new = obj.copy(swap=fn_swap)
+        new.trust_input = obj.trust_input
+    elif isinstance(obj, np.ndarray):
+        new = obj.copy()
+    elif isinstance(obj, _THREAD_SHARED_TYPES):
+        new = obj
+    elif isinstance(obj, list):
+        new = []
+        memo[id(obj)] = new
+        new.extend(_copy_for_thread(item, swap, memo) for item in obj)
+    elif isinstance(obj, tuple):
+        items = [_copy_for_thread(item, swap, memo) for item in obj]
+        new = type(obj)(*items) if hasattr(obj, "_fields") else type(obj)(items)
+    elif isinstance(obj, (set, frozenset)):
+        new = type(obj)(_copy_for_thread(item, swap, memo) for item in obj)
+    elif isinstance(obj, dict):
+        new = copy.copy(obj)
+        memo[id(obj)] = new
+        for key, item in obj.items():
+            new[key] = _copy_for_thread(item, swap, memo)
+    elif hasattr(obj, "__dict__"):
+        new = copy.copy(obj)
+        memo[id(obj)] = new
+        for key, item in vars(obj).items():
+            vars(new)[key] = _copy_for_thread(item, swap, memo)
+    else:
+        new = obj
+    memo[id(obj)] = new
+    return new
+
+
+def thread_local_copy(obj):
+    """Copy a step method or trace, so that it can be used for another chain in a separate thread.
+
+    The copy refers to the same model and reuses the rewritten graphs and compiled
+    thunks of the PyTensor functions it holds, so that nothing is recompiled and
+    constants such as observed data are not duplicated. It gets its own copies of the
+    sampler state, of the shared variables that the step method holds itself (e.g.
+    in ``shared``), and of the function storage. Shared variables that are only
+    inputs of the compiled functions, like data containers, are not copied.
+    """
+    found: Dict[int, SharedVariable] = {}
+    _collect_shared_variables(obj, found, set())
+    swap = {}
+    for var in found.values():
+        new_var = var.clone()
+        new_var.container = Container(
+            new_var,
+            storage=[copy.deepcopy(var.container.storage[0])],
+            readonly=var.container.readonly,
+            strict=var.container.strict,
+            allow_downcast=var.container.allow_downcast,
+        )
+        swap[var] = new_var
+    return _copy_for_thread(obj, swap, {})
+
+
 def _cpu_count():
     """Try to guess the number of CPUs in the system.
 
@@ -36,6 +36,7 @@ from pymc.step_methods.arraystep import (
     PopulationArrayStepShared,
     StatsType,
 )
+from pymc.step_methods.metropolis import CurrentLogp
 from pymc.util import RandomSeed
 
 __all__ = ()
@@ -316,13 +317,16 @@ def _prepare_iter_population(
     steppers: List[Step] = []
     for c in range(nchains):
         # need indepenent samplers for each chain
-        # it is important to copy the actual steppers (but not the delta_logp)
+        # it is important to copy the actual steppers (but not the logp functions)
         if isinstance(step, CompoundStep):
             chainstep = CompoundStep([copy(m) for m in step.methods])
         else:
             chainstep = copy(step)
-        # link population samplers to the shared population state
         for sm in chainstep.methods if isinstance(step, CompoundStep) else [chainstep]:
+            # every chain keeps the logp at its own current point
+            if hasattr(sm, "_current_logp"):
+                sm._current_logp = CurrentLogp(sm._current_logp.other_names)
+            # link population samplers to the shared population state
             if isinstance(sm, PopulationArrayStepShared):
                 sm.link_population(population, c)
         steppers.append(chainstep)
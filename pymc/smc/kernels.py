@@ -16,9 +16,10 @@ import sys
 import warnings
 
 from abc import ABC
-from typing import Dict, cast
+from typing import Dict, Tuple, cast
 
 import numpy as np
+import pytensor
 import pytensor.tensor as at
 
 from pytensor.graph.replace import clone_replace
@@ -62,7 +63,10 @@ class SMC_KERNEL(ABC):
             The functions `self.prior_logp_func` and `self.likelihood_logp_func` are
             created in this step. These expect a 1D numpy array with the summed
             sizes of each raveled model variable (in the order specified in
-            :meth:`pymc.Model.initial_point`).
+            :meth:`pymc.Model.initial_point`). If `vectorized` is True, the functions
+            `self.prior_logp_batch_func` and `self.likelihood_logp_batch_func` are
+            created as well, which expect a 2D array with one particle per row.
+            Use :meth:`particles_logp` to evaluate all particles with either of them.
 
             Finally, this method computes the log prior and log likelihood for
             the initial particles, and saves them in `self.prior_logp` and
@@ -130,6 +134,7 @@ class SMC_KERNEL(ABC):
         model=None,
         random_seed=None,
         threshold=0.5,
+        vectorized=False,
     ):
         """
         Initialize the SMC_kernel class.
@@ -149,6 +154,10 @@ class SMC_KERNEL(ABC):
             Determines the change of beta from stage to stage, i.e.indirectly the number of stages,
             the higher the value of `threshold` the higher the number of stages. Defaults to 0.5.
             It should be between 0 and 1.
+        vectorized : bool, default False
+            Whether to compute the log prior and log likelihood of all particles in a single
+            call of functions that are batched over the particles, instead of calling a
+            function once for every particle. This is usually much faster for many particles.
 
         Attributes
         ----------
@@ -162,6 +171,7 @@ class SMC_KERNEL(ABC):
         if threshold < 0 or threshold > 1:
             raise ValueError(f"Threshold value {threshold} must be between 0 and 1")
         self.threshold = threshold
+        self.vectorized = vectorized
         self.model = model
         self.rng = np.random.default_rng(seed=random_seed)
 
@@ -175,6 +185,8 @@ class SMC_KERNEL(ABC):
         self.tempered_posterior_logp = None
         self.prior_logp_func = None
         self.likelihood_logp_func = None
+        self.prior_logp_batch_func = None
+        self.likelihood_logp_batch_func = None
         self.log_marginal_likelihood = 0
         self.beta = 0
         self.iteration = 0
@@ -238,11 +250,26 @@ class SMC_KERNEL(ABC):
             initial_point, [self.model.datalogp], self.variables, shared
         )
 
-        priors = [self.prior_logp_func(sample) for sample in self.tempered_posterior]
-        likelihoods = [self.likelihood_logp_func(sample) for sample in self.tempered_posterior]
+        if self.vectorized:
+            self.prior_logp_batch_func = _logp_forw(
+                initial_point, [self.model.varlogp], self.variables, shared, batched=True
+            )
+            self.likelihood_logp_batch_func = _logp_forw(
+                initial_point, [self.model.datalogp], self.variables, shared, batched=True
+            )
 
-        self.prior_logp = np.array(priors).squeeze()
-        self.likelihood_logp = np.array(likelihoods).squeeze()
+        self.prior_logp, self.likelihood_logp = self.particles_logp(self.tempered_posterior)
+
+    def particles_logp(self, particles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute the log prior and log likelihood of every row of `particles`."""
+        if self.vectorized:
+            return (
+                self.prior_logp_batch_func(particles),
+                self.likelihood_logp_batch_func(particles),
+            )
+        priors = [self.prior_logp_func(particle) for particle in particles]
+        likelihoods = [self.likelihood_logp_func(particle) for particle in particles]
+        return np.array(priors).squeeze(), np.array(likelihoods).squeeze()
 
     def setup_kernel(self):
         """Setup logic performed once before sampling starts"""
@@ -403,8 +430,7 @@ class IMH(SMC_KERNEL):
             forward_logp = self.proposal_dist.logpdf(proposal)
             # And to going back from that new point
             backward_logp = self.proposal_dist.logpdf(self.tempered_posterior)
-            ll = np.array([self.likelihood_logp_func(prop) for prop in proposal])
-            pl = np.array([self.prior_logp_func(prop) for prop in proposal])
+            pl, ll = self.particles_logp(proposal)
             proposal_logp = pl + ll * self.beta
             accepted = log_R < (
                 (proposal_logp + backward_logp) - (self.tempered_posterior_logp + forward_logp)
@@ -522,8 +548,7 @@ class MH(SMC_KERNEL):
                 + self.proposal_dist(num_draws=self.draws, rng=self.rng)
                 * self.proposal_scales[:, None]
             )
-            ll = np.array([self.likelihood_logp_func(prop) for prop in proposal])
-            pl = np.array([self.prior_logp_func(prop) for prop in proposal])
+            pl, ll = self.particles_logp(proposal)
 
             proposal_logp = pl + ll * self.beta
             accepted = log_R < (proposal_logp - self.tempered_posterior_logp)
@@ -594,7 +619,7 @@ def systematic_resampling(weights, rng):
     return new_indices
 
 
-def _logp_forw(point, out_vars, in_vars, shared):
+def _logp_forw(point, out_vars, in_vars, shared, batched=False):
     """Compile PyTensor function of the model and the input and output variables.
 
     Parameters
@@ -605,6 +630,9 @@ def _logp_forw(point, out_vars, in_vars, shared):
         Containing Distribution for the input variables
     shared : list
         Containing TensorVariable for depended shared data
+    batched : bool
+        If True, the function takes a matrix with one raveled point per row, and
+        returns a vector with the output for every row.
     """
 
     # Replace integer inputs with rounded float inputs
@@ -625,6 +653,15 @@ def _logp_forw(point, out_vars, in_vars, shared):
     out_list, inarray0 = join_nonshared_inputs(
         point=point, outputs=out_vars, inputs=in_vars, shared_inputs=shared
     )
-    f = compile_pymc([inarray0], out_list[0])
+    if batched:
+        inarrays = at.matrix("inarrays", dtype=inarray0.dtype)
+        # Map over the leading particle dimension inside of the compiled function
+        out, _ = pytensor.scan(
+            lambda row: clone_replace(out_list[0], replace={inarray0: row}),
+            sequences=[inarrays],
+        )
+        f = compile_pymc([inarrays], out)
+    else:
+        f = compile_pymc([inarray0], out_list[0])
     f.trust_input = True
     return f
@@ -2,12 +2,16 @@ import dataclasses
 import enum
 import logging
 
-from typing import Any, Dict, List, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
 
 import arviz
+import numpy as np
 
 from pymc.util import get_untransformed_name, is_transformed_name
 
+if TYPE_CHECKING:
+    from pymc.backends.online import OnlineStats
+
 _LEVELS = {
     "info": logging.INFO,
     "error": logging.ERROR,
@@ -79,6 +83,10 @@ def run_convergence_checks(idata: arviz.InferenceData, model) -> List[SamplerWar
         if rv_name in idata["posterior"]:
             varnames.append(rv_name)
 
+    if not varnames:
+        # None of the free variables were recorded
+        return warn_divergences(idata) + warn_treedepth(idata)
+
     ess = arviz.ess(idata, var_names=varnames)
     rhat = arviz.rhat(idata, var_names=varnames)
 
@@ -110,6 +118,98 @@ def run_convergence_checks(idata: arviz.InferenceData, model) -> List[SamplerWar
     return warnings
 
 
+class ConvergenceMonitor:
+    """Stop the sampling once the chains reach a target effective sample size and R-hat.
+
+    The monitor is called with every draw, like the ``callback`` of :func:`~pymc.sample`,
+    and updates running statistics of the free variables of every chain after tuning
+    (see :class:`~pymc.backends.online.OnlineStats`), without keeping the draws. Every
+    `check_every` draws per chain, once all chains have at least `min_draws` draws, it
+    combines the statistics of the chains into a batch-means estimate of the ESS and the
+    Gelman-Rubin R-hat. When the smallest ESS of all variables is at least `target_ess`
+    and the largest R-hat at most `target_rhat`, it interrupts the sampling by raising
+    a ``KeyboardInterrupt``.
+
+    Parameters
+    ----------
+    chains : int
+        Number of chains that are sampled.
+    min_draws : int
+        Number of draws per chain after tuning before the diagnostics are checked.
+    target_ess : float, optional
+        Minimum ESS of every variable.
+    target_rhat : float, optional
+        Maximum R-hat of every variable.
+    check_every : int
+        Number of draws per chain between two checks.
+    callback : callable, optional
+        A callback that is called with every draw before the monitor.
+    """
+
+    def __init__(
+        self,
+        chains: int,
+        min_draws: int,
+        target_ess: Optional[float] = None,
+        target_rhat: Optional[float] = None,
+        check_every: int = 100,
+        callback: Optional[Callable] = None,
+    ):
+        if check_every < 1:
+            raise ValueError(f"check_every must be a positive integer, got {check_every}.")
+        self.chains = chains
+        self.min_draws = min_draws
+        self.target_ess = target_ess
+        self.target_rhat = target_rhat
+        self.check_every = check_every
+        self.callback = callback
+        self.converged = False
+        self.ess: Optional[Dict[str, float]] = None
+        self.rhat: Optional[Dict[str, float]] = None
+        self._stats: Optional[List["OnlineStats"]] = None
+        self._n_checked = 0
+
+    def __call__(self, trace, draw):
+        if self.callback is not None:
+            self.callback(trace=trace, draw=draw)
+        if draw.tuning or draw.point is None:
+            return
+        if self._stats is None:
+            # Avoid a circular import with pymc.backends
+            from pymc.backends.online import OnlineStats
+
+            var_shapes = {name: np.shape(value) for name, value in draw.point.items()}
+            self._stats = [OnlineStats(var_shapes) for _ in range(self.chains)]
+        self._stats[draw.chain].update(draw.point, None)
+
+        n_draws = min(stats.n_draws for stats in self._stats)
+        if n_draws < max(self.min_draws, self._n_checked + self.check_every):
+            return
+        self._n_checked = n_draws
+        if self.check():
+            self.converged = True
+            logger.info(
+                f"The chains reached the convergence targets after {n_draws:_d} draws, "
+                "stopping the sampling."
+            )
+            raise KeyboardInterrupt
+
+    def check(self) -> bool:
+        """Compute the diagnostics of the draws so far, and return whether they meet the targets."""
+        from pymc.backends.online import combine_online_stats
+
+        summary = combine_online_stats(self._stats)
+        converged = True
+        # NaN values, e.g. of constant variables, never meet the targets
+        if self.target_ess is not None:
+            self.ess = {name: float(np.min(stats["ess"])) for name, stats in summary.items()}
+            converged &= all(ess >= self.target_ess for ess in self.ess.values())
+        if self.target_rhat is not None:
+            self.rhat = {name: float(np.max(stats["r_hat"])) for name, stats in summary.items()}
+            converged &= all(rhat <= self.target_rhat for rhat in self.rhat.values())
+        return converged
+
+
 def warn_divergences(idata: arviz.InferenceData) -> List[SamplerWarning]:
     """Checks sampler stats and creates a list of warnings about divergences."""
     sampler_stats = idata.get("sample_stats", None)
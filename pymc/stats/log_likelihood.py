@@ -22,6 +22,7 @@ import pymc
 
 from pymc.backends.arviz import _DefaultTrace
 from pymc.model import Model, modelcontext
+from pymc.sampling.batched import _compile_batched_fn, _evaluate_in_chunks
 from pymc.util import dataset_to_point_list
 
 __all__ = ("compute_log_likelihood",)
@@ -35,6 +36,9 @@ def compute_log_likelihood(
     model: Optional[Model] = None,
     sample_dims: Sequence[str] = ("chain", "draw"),
     progressbar=True,
+    chunk_size: Optional[int] = None,
+    max_memory: Optional[int] = None,
+    dtype: Optional[str] = None,
 ):
     """Compute elemwise log_likelihood of model given InferenceData with posterior group
 
@@ -49,6 +53,16 @@ def compute_log_likelihood(
     model : Model, optional
     sample_dims : sequence of str, default ("chain", "draw")
     progressbar : bool, default True
+    chunk_size : int, optional
+        If given, the log_likelihood is evaluated for ``chunk_size`` draws at a time in a
+        single call of a vectorized function, instead of once per draw.
+    max_memory : int, optional
+        Upper bound, in bytes, on the size of the log_likelihood values computed in one chunk.
+        The number of draws per chunk is derived from it (and capped at ``chunk_size`` if
+        both are given).
+    dtype : str, optional
+        Dtype of the returned log_likelihood arrays, e.g. ``"float32"`` to halve their memory
+        footprint. Defaults to the dtype of the model logp.
 
     Returns
     -------
@@ -69,6 +83,12 @@ def compute_log_likelihood(
         if not set(observed_vars).issubset(model.observed_RVs):
             raise ValueError(f"var_names must refer to observed_RVs in the model. Got: {var_names}")
 
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer. Got: {chunk_size}")
+    if max_memory is not None and max_memory < 1:
+        raise ValueError(f"max_memory must be a positive integer. Got: {max_memory}")
+    chunked = chunk_size is not None or max_memory is not None
+
     # We need to temporarily disable transforms, because the InferenceData only keeps the untransformed values
     # pylint: disable=used-before-assignment
     try:
@@ -81,11 +101,16 @@ def compute_log_likelihood(
         }
         model.rvs_to_transforms = {rv: None for rv in model.basic_RVs}
 
-        elemwise_loglike_fn = model.compile_fn(
-            inputs=model.value_vars,
-            outs=model.logp(vars=observed_vars, sum=False),
-            on_unused_input="ignore",
-        )
+        if chunked:
+            elemwise_loglike_fn = _compile_batched_fn(
+                model, model.free_RVs, model.logp(vars=observed_vars, sum=False)
+            )
+        else:
+            elemwise_loglike_fn = model.compile_fn(
+                inputs=model.value_vars,
+                outs=model.logp(vars=observed_vars, sum=False),
+                on_unused_input="ignore",
+            )
     finally:
         model.rvs_to_values = original_rvs_to_values
         model.rvs_to_transforms = original_rvs_to_transforms
@@ -93,23 +118,37 @@ def compute_log_likelihood(
 
     # Ignore Deterministics
     posterior_values = posterior[[rv.name for rv in model.free_RVs]]
-    posterior_pts, stacked_dims = dataset_to_point_list(posterior_values, sample_dims)
-    n_pts = len(posterior_pts)
-    loglike_dict = _DefaultTrace(n_pts)
-    indices = range(n_pts)
-    if progressbar:
-        indices = progress_bar(indices, total=n_pts, display=progressbar)
-
-    for idx in indices:
-        loglikes_pts = elemwise_loglike_fn(posterior_pts[idx])
-        for rv_name, rv_loglike in zip(var_names, loglikes_pts):
-            loglike_dict.insert(rv_name, rv_loglike, idx)
-
-    loglike_trace = loglike_dict.trace_dict
-    for key, array in loglike_trace.items():
-        loglike_trace[key] = array.reshape(
-            (*[len(coord) for coord in stacked_dims.values()], *array.shape[1:])
+    if chunked:
+        loglike_trace = _evaluate_in_chunks(
+            elemwise_loglike_fn,
+            posterior_values,
+            var_names,
+            sample_dims=sample_dims,
+            chunk_size=chunk_size,
+            max_memory=max_memory,
+            dtype=dtype,
+            progressbar=progressbar,
         )
+    else:
+        posterior_pts, stacked_dims = dataset_to_point_list(posterior_values, sample_dims)
+        n_pts = len(posterior_pts)
+        loglike_dict = _DefaultTrace(n_pts)
+        indices = range(n_pts)
+        if progressbar:
+            indices = progress_bar(indices, total=n_pts, display=progressbar)
+
+        for idx in indices:
+            loglikes_pts = elemwise_loglike_fn(posterior_pts[idx])
+            for rv_name, rv_loglike in zip(var_names, loglikes_pts):
+                if dtype is not None:
+                    rv_loglike = np.asarray(rv_loglike, dtype=dtype)
+                loglike_dict.insert(rv_name, rv_loglike, idx)
+
+        loglike_trace = loglike_dict.trace_dict
+        for key, array in loglike_trace.items():
+            loglike_trace[key] = array.reshape(
+                (*[len(coord) for coord in stacked_dims.values()], *array.shape[1:])
+            )
 
     loglike_dataset = dict_to_dataset(
         loglike_trace,
@@ -260,7 +260,9 @@ class GradientSharedStep(ArrayStepShared):
         model = modelcontext(model)
 
         if logp_dlogp_func is None:
-            func = model.logp_dlogp_function(vars, dtype=dtype, **pytensor_kwargs)
+            func = model.logp_dlogp_function(
+                vars, dtype=dtype, ravel_inputs=True, **pytensor_kwargs
+            )
         else:
             func = logp_dlogp_func
 
@@ -22,7 +22,7 @@ from typing import Any, NamedTuple
 
 import numpy as np
 
-from pymc.blocking import DictToArrayBijection, RaveledVars, StatsType
+from pymc.blocking import DictToArrayBijection, PointType, RaveledVars, StatsType
 from pymc.exceptions import SamplingError
 from pymc.model import Point, modelcontext
 from pymc.pytensorf import floatX
@@ -149,6 +149,10 @@ class BaseHMC(GradientSharedStep):
 
         self._step_rand = step_rand
         self._num_divs_sample = 0
+        # The state at the end of the last trajectory, to avoid recomputing
+        # the logp and gradient at the start of the next one.
+        self._last_state: State | None = None
+        self._last_extra_values: dict[str, np.ndarray] = {}
 
     @abstractmethod
     def _hamiltonian_step(self, start, p0, step_size) -> HMCStepData:
@@ -165,9 +169,32 @@ class BaseHMC(GradientSharedStep):
         p0 = self.potential.random()
         p0 = RaveledVars(p0, q0.point_map_info)
 
-        start = self.integrator.compute_state(q0, p0)
-
-        warning: SamplerWarning | None = None
+        last = self._last_state
+        if last is not None and np.array_equal(q0.data, last.q):
+            start = self.integrator._make_state(q0, p0, last.model_logp, last.q_grad)
+        else:
+            start = self.integrator.compute_state(q0, p0)
+        step_size = self._start_trajectory(q0, start)
+        hmc_step = self._hamiltonian_step(start, p0.data, step_size)
+        end = hmc_step.end
+        q_end = end.q.data if isinstance(end.q, RaveledVars) else end.q
+        self._last_state = end._replace(q=q_end)
+        return self._end_trajectory(hmc_step, perf_start, process_start)
+
+    def step(self, point) -> tuple[PointType, StatsType]:
+        # Other step methods of a CompoundStep may have changed the values
+        # the logp depends on, so that the last state is no longer valid.
+        extra_values = {name: point[name] for name in self.shared}
+        if any(
+            not np.array_equal(value, self._last_extra_values.get(name))
+            for name, value in extra_values.items()
+        ):
+            self._last_state = None
+        self._last_extra_values = {name: np.copy(value) for name, value in extra_values.items()}
+        return super().step(point)
+
+    def _start_trajectory(self, q0: RaveledVars, start: State) -> float:
+        """Check the initial state of a trajectory and return its step size."""
         if not np.isfinite(start.energy):
             model = self._model
             check_test_point_dict = model.point_logps()
@@ -194,14 +221,20 @@ class BaseHMC(GradientSharedStep):
 
         if self._step_rand is not None:
             step_size = self._step_rand(step_size)
+        return step_size
 
-        hmc_step = self._hamiltonian_step(start, p0.data, step_size)
-
+    def _end_trajectory(
+        self, hmc_step: HMCStepData, perf_start: float, process_start: float
+    ) -> tuple[RaveledVars, StatsType]:
+        """Update the adaptation after a trajectory and collect the sampler stats."""
         perf_end = time.perf_counter()
         process_end = time.process_time()
 
+        adapt_step = self.tune and self.adapt_step_size
         self.step_adapt.update(hmc_step.accept_stat, adapt_step)
         self.potential.update(hmc_step.end.q, hmc_step.end.q_grad, self.tune)
+
+        warning: SamplerWarning | None = None
         if hmc_step.divergence_info:
             info = hmc_step.divergence_info
             point = None
@@ -250,6 +283,8 @@ class BaseHMC(GradientSharedStep):
         return hmc_step.end.q, [stats]
 
     def reset_tuning(self, start=None):
+        # The model data may have changed since the last call
+        self._last_state = None
         self.step_adapt.reset()
         self.reset(start=None)
 
@@ -12,7 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 
 import numpy as np
 
@@ -36,6 +36,20 @@ class IntegrationError(RuntimeError):
     pass
 
 
+def integration_error(err: Exception) -> Optional[IntegrationError]:
+    """Translate errors of the linear algebra in a leapfrog step.
+
+    Returns None if the error is not caused by the integration.
+    """
+    if isinstance(err, linalg.LinAlgError):
+        return IntegrationError("LinAlgError during leapfrog step.")
+    # Raised by many scipy.linalg functions
+    scipy_msg = "array must not contain infs or nans"
+    if isinstance(err, ValueError) and len(err.args) > 0 and scipy_msg in err.args[0].lower():
+        return IntegrationError("Infs or nans in scipy.linalg during leapfrog step.")
+    return None
+
+
 class CpuLeapfrogIntegrator:
     def __init__(self, potential: QuadPotential, logp_dlogp_func):
         """Leapfrog integrator using CPU."""
@@ -54,13 +68,15 @@ class CpuLeapfrogIntegrator:
             raise ValueError("Invalid dtype. Must be %s" % self._dtype)
 
         logp, dlogp = self._logp_dlogp_func(q)
+        return self._make_state(q, p, logp, dlogp)
 
+    def _make_state(self, q: RaveledVars, p: RaveledVars, logp, dlogp):
         v = self._potential.velocity(p.data, out=None)
         kinetic = self._potential.energy(p.data, velocity=v)
         energy = kinetic - logp
         return State(q, p, v, dlogp, energy, logp, 0)
 
-    def step(self, epsilon, state):
+    def step(self, epsilon, state, out=None):
         """Leapfrog integrator step.
 
         Half a momentum update, full position update, half momentum update.
@@ -72,34 +88,40 @@ class CpuLeapfrogIntegrator:
         state: State namedtuple,
             current position data
         out: (optional) State namedtuple,
-            preallocated arrays to write to in place
+            preallocated arrays to write to in place. They must not be
+            the arrays of `state`.
 
         Returns
         -------
-        None if `out` is provided, else a State namedtuple
+        A State namedtuple. If `out` is provided, it holds the arrays of `out`.
         """
         try:
-            return self._step(epsilon, state)
-        except linalg.LinAlgError as err:
-            msg = "LinAlgError during leapfrog step."
-            raise IntegrationError(msg)
-        except ValueError as err:
-            # Raised by many scipy.linalg functions
-            scipy_msg = "array must not contain infs or nans"
-            if len(err.args) > 0 and scipy_msg in err.args[0].lower():
-                msg = "Infs or nans in scipy.linalg during leapfrog step."
-                raise IntegrationError(msg)
-            else:
+            return self._step(epsilon, state, out)
+        except (linalg.LinAlgError, ValueError) as err:
+            error = integration_error(err)
+            if error is None:
                 raise
+            raise error
+
+    def _step(self, epsilon, state, out=None):
+        q_new, p_new, v_new = self._step_position(epsilon, state, out)
+        q_new_grad = np.empty_like(q_new.data) if out is None else out.q_grad
+        logp = self._logp_dlogp_func(q_new, grad_out=q_new_grad)
+        return self._step_momentum(epsilon, state, q_new, p_new, v_new, logp, q_new_grad)
 
-    def _step(self, epsilon, state):
+    def _step_position(self, epsilon, state, out=None):
+        """First half of a leapfrog step, up to the new position."""
         axpy = linalg.blas.get_blas_funcs("axpy", dtype=self._dtype)
         pot = self._potential
 
-        q_new = state.q.data.copy()
-        p_new = state.p.data.copy()
-        v_new = np.empty_like(q_new)
-        q_new_grad = np.empty_like(q_new)
+        if out is None:
+            q_new = state.q.data.copy()
+            p_new = state.p.data.copy()
+            v_new = np.empty_like(q_new)
+        else:
+            q_new, p_new, v_new = out.q.data, out.p.data, out.v
+            np.copyto(q_new, state.q.data)
+            np.copyto(p_new, state.p.data)
 
         dt = 0.5 * epsilon
 
@@ -114,8 +136,13 @@ class CpuLeapfrogIntegrator:
 
         p_new = RaveledVars(p_new, state.p.point_map_info)
         q_new = RaveledVars(q_new, state.q.point_map_info)
+        return q_new, p_new, v_new
 
-        logp = self._logp_dlogp_func(q_new, grad_out=q_new_grad)
+    def _step_momentum(self, epsilon, state, q_new, p_new, v_new, logp, q_new_grad):
+        """Second half of a leapfrog step, given the logp and gradient at the new position."""
+        axpy = linalg.blas.get_blas_funcs("axpy", dtype=self._dtype)
+        pot = self._potential
+        dt = 0.5 * epsilon
 
         # p_new = p_new + dt * q_new_grad
         axpy(q_new_grad, p_new.data, a=dt)
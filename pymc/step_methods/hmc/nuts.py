@@ -15,9 +15,11 @@
 from __future__ import annotations
 
 from collections import namedtuple
+from typing import Generator
 
 import numpy as np
 
+from pymc.blocking import RaveledVars
 from pymc.math import logbern
 from pymc.pytensorf import floatX
 from pymc.stats.convergence import SamplerWarning
@@ -184,19 +186,34 @@ class NUTS(BaseHMC):
         self.max_treedepth = max_treedepth
         self.early_max_treedepth = early_max_treedepth
         self._reached_max_treedepth = 0
+        self._tree_buffers = _TreeBuffers()
 
     def _hamiltonian_step(self, start, p0, step_size):
+        tree = _Tree(len(p0), self.integrator, start, step_size, self.Emax, self._tree_buffers)
+        trajectory = self._build_trajectory(tree)
+        try:
+            direction = next(trajectory)
+            while True:
+                direction = trajectory.send(tree.extend(direction))
+        except StopIteration as stop:
+            return stop.value
+
+    def _build_trajectory(self, tree: _Tree) -> Generator[int, tuple, HMCStepData]:
+        """Double the trajectory of `tree` until it turns around or diverges.
+
+        The generator yields the direction of every doubling, and is sent the
+        result of extending the tree in that direction. This allows to share the
+        logic with trees whose extensions are computed elsewhere.
+        """
         if self.tune and self.iter_count < 200:
             max_treedepth = self.early_max_treedepth
         else:
             max_treedepth = self.max_treedepth
 
-        tree = _Tree(len(p0), self.integrator, start, step_size, self.Emax)
-
         reached_max_treedepth = False
         for _ in range(max_treedepth):
             direction = logbern(np.log(0.5)) * 2 - 1
-            divergence_info, turning = tree.extend(direction)
+            divergence_info, turning = yield direction
 
             if divergence_info or turning:
                 break
@@ -228,6 +245,100 @@ Subtree = namedtuple(
 )
 
 
+def _copy_state(state: State) -> State:
+    """Copy a state out of the buffers of a tree."""
+    return state._replace(
+        q=RaveledVars(state.q.data.copy(), state.q.point_map_info),
+        p=RaveledVars(state.p.data.copy(), state.p.point_map_info),
+        v=state.v.copy(),
+        q_grad=state.q_grad.copy(),
+    )
+
+
+class _TreeBuffers:
+    """Pools of arrays for the states, momentum sums and proposals of NUTS trees.
+
+    Arrays are only allocated while the pools are empty, and they are reused by all
+    trees of a step method. Once the pools have grown to the largest tree, building a
+    tree does not allocate any arrays. An array is returned to its pool as soon as it
+    is no longer part of the tree, and all arrays are returned when a new tree starts.
+    """
+
+    def __init__(self):
+        self._states: list[State] = []
+        self._vectors: list[np.ndarray] = []
+        self._proposals: list[tuple[np.ndarray, np.ndarray]] = []
+        self._free_states: list[State] = []
+        self._free_vectors: list[np.ndarray] = []
+        self._free_proposals: list[tuple[np.ndarray, np.ndarray]] = []
+        self._like: State | None = None
+
+    def reset(self, like: State):
+        """Return all arrays to the pools, for a tree whose states look like `like`."""
+        if self._like is not None and (
+            self._like.q.data.shape != like.q.data.shape
+            or self._like.q.data.dtype != like.q.data.dtype
+        ):
+            self.__init__()
+        self._like = like
+        self._free_states = list(self._states)
+        self._free_vectors = list(self._vectors)
+        self._free_proposals = list(self._proposals)
+
+    def state(self, like: State) -> State:
+        """Take a state from the pool. The values of its arrays are undefined."""
+        if self._free_states:
+            return self._free_states.pop()
+        state = State(
+            RaveledVars(np.empty_like(like.q.data), like.q.point_map_info),
+            RaveledVars(np.empty_like(like.p.data), like.p.point_map_info),
+            np.empty_like(like.v),
+            np.empty_like(like.q_grad),
+            np.nan,
+            np.nan,
+            0,
+        )
+        self._states.append(state)
+        return state
+
+    def copy_state(self, state: State) -> State:
+        """Copy a state into a state from the pool."""
+        out = self.state(state)
+        np.copyto(out.q.data, state.q.data)
+        np.copyto(out.p.data, state.p.data)
+        np.copyto(out.v, state.v)
+        np.copyto(out.q_grad, state.q_grad)
+        return state._replace(q=out.q, p=out.p, v=out.v, q_grad=out.q_grad)
+
+    def release_state(self, state: State):
+        self._free_states.append(state)
+
+    def vector(self) -> np.ndarray:
+        """Take an array for a sum of momenta from the pool."""
+        if self._free_vectors:
+            return self._free_vectors.pop()
+        vector = np.empty_like(self._like.p.data)
+        self._vectors.append(vector)
+        return vector
+
+    def release_vector(self, vector: np.ndarray):
+        self._free_vectors.append(vector)
+
+    def proposal(self, state: State) -> Proposal:
+        """Copy the position and gradient of a state into a proposal from the pool."""
+        if self._free_proposals:
+            q, q_grad = self._free_proposals.pop()
+        else:
+            q, q_grad = np.empty_like(self._like.q.data), np.empty_like(self._like.q_grad)
+            self._proposals.append((q, q_grad))
+        np.copyto(q, state.q.data)
+        np.copyto(q_grad, state.q_grad)
+        return Proposal(q, q_grad, state.energy, state.model_logp, state.index_in_trajectory)
+
+    def release_proposal(self, proposal: Proposal):
+        self._free_proposals.append((proposal.q, proposal.q_grad))
+
+
 class _Tree:
     def __init__(
         self,
@@ -236,6 +347,7 @@ class _Tree:
         start: State,
         step_size: float,
         Emax: float,
+        buffers: _TreeBuffers | None = None,
     ):
         """Binary tree from the NUTS algorithm.
 
@@ -250,7 +362,16 @@ class _Tree:
         Emax: float
             The maximum energy change to accept before aborting the
             transition as diverging.
+        buffers: _TreeBuffers, optional
+            The pools of arrays that the states of the tree are stored in. The arrays
+            of a previous tree that used the same pools are overwritten.
         """
+        if buffers is None:
+            buffers = _TreeBuffers()
+        buffers.reset(start)
+        start = buffers.copy_state(start)
+        self._buffers = buffers
+
         self.ndim = ndim
         self.integrator = integrator
         self.start = start
@@ -259,13 +380,16 @@ class _Tree:
         self.start_energy = start.energy
 
         self.left = self.right = start
-        self.proposal = Proposal(start.q.data, start.q_grad, start.energy, start.model_logp, 0)
+        self.proposal = buffers.proposal(start._replace(index_in_trajectory=0))
         self.depth = 0
         self.log_size = 0.0
         self.log_accept_sum = -np.inf
         self.mean_tree_accept = 0.0
         self.n_proposals = 0
-        self.p_sum = start.p.data.copy()
+        self.p_sum = buffers.vector()
+        np.copyto(self.p_sum, start.p.data)
+        # Holds the sums of momenta of the additional U-turn checks
+        self._p_sum_scratch = buffers.vector()
         self.max_energy_change = 0.0
 
     def extend(self, direction):
@@ -284,19 +408,26 @@ class _Tree:
             tree, diverging, turning = self._build_subtree(
                 self.right, self.depth, floatX(np.asarray(self.step_size))
             )
+        else:
+            tree, diverging, turning = self._build_subtree(
+                self.left, self.depth, floatX(np.asarray(-self.step_size))
+            )
+        return self._add_subtree(direction, tree, diverging, turning)
+
+    def _add_subtree(self, direction, tree, diverging, turning):
+        """Add a new subtree at the left or right end of the tree."""
+        buffers = self._buffers
+        if direction > 0:
             leftmost_begin, leftmost_end = self.left, self.right
             rightmost_begin, rightmost_end = tree.left, tree.right
-            leftmost_p_sum = self.p_sum.copy()
+            leftmost_p_sum = self.p_sum
             rightmost_p_sum = tree.p_sum
             self.right = tree.right
         else:
-            tree, diverging, turning = self._build_subtree(
-                self.left, self.depth, floatX(np.asarray(-self.step_size))
-            )
             leftmost_begin, leftmost_end = tree.right, tree.left
             rightmost_begin, rightmost_end = self.left, self.right
             leftmost_p_sum = tree.p_sum
-            rightmost_p_sum = self.p_sum.copy()
+            rightmost_p_sum = self.p_sum
             self.left = tree.right
 
         self.depth += 1
@@ -306,37 +437,52 @@ class _Tree:
 
         size1, size2 = self.log_size, tree.log_size
         if logbern(size2 - size1):
+            buffers.release_proposal(self.proposal)
             self.proposal = tree.proposal
+        else:
+            buffers.release_proposal(tree.proposal)
 
         self.log_size = np.logaddexp(self.log_size, tree.log_size)
-        self.p_sum[:] += tree.p_sum
 
-        # Additional turning check only when tree depth > 0 to avoid redundant work
-        if self.depth > 0:
-            left, right = self.left, self.right
-            p_sum = self.p_sum
-            turning = (p_sum.dot(left.v) <= 0) or (p_sum.dot(right.v) <= 0)
-            p_sum1 = leftmost_p_sum + rightmost_begin.p.data
-            turning1 = (p_sum1.dot(leftmost_begin.v) <= 0) or (p_sum1.dot(rightmost_begin.v) <= 0)
-            p_sum2 = leftmost_end.p.data + rightmost_p_sum
-            turning2 = (p_sum2.dot(leftmost_end.v) <= 0) or (p_sum2.dot(rightmost_end.v) <= 0)
-            turning = turning | turning1 | turning2
+        # The additional turning checks use the sum of momenta from before the
+        # subtree is added
+        p_sum1 = np.add(leftmost_p_sum, rightmost_begin.p.data, out=self._p_sum_scratch)
+        turning1 = (p_sum1.dot(leftmost_begin.v) <= 0) or (p_sum1.dot(rightmost_begin.v) <= 0)
+        p_sum2 = np.add(leftmost_end.p.data, rightmost_p_sum, out=self._p_sum_scratch)
+        turning2 = (p_sum2.dot(leftmost_end.v) <= 0) or (p_sum2.dot(rightmost_end.v) <= 0)
+
+        self.p_sum += tree.p_sum
+        left, right = self.left, self.right
+        p_sum = self.p_sum
+        turning = (p_sum.dot(left.v) <= 0) or (p_sum.dot(right.v) <= 0)
+        turning = turning | turning1 | turning2
+
+        # The states where the tree and the subtree meet are no longer needed.
+        # The sum of momenta of a single leapfrog step is the momentum of its state.
+        if self.depth > 1:
+            buffers.release_vector(tree.p_sum)
+        for state in (leftmost_end, rightmost_begin):
+            if state is not left and state is not right:
+                buffers.release_state(state)
 
         return diverging, turning
 
     def _single_step(self, left: State, epsilon: float):
         """Perform a leapfrog step and handle error cases."""
-        right: State | None
-        error: IntegrationError | None
-        error_msg: str | None
+        out = self._buffers.state(left)
         try:
-            right = self.integrator.step(epsilon, left)
+            right = self.integrator.step(epsilon, left, out=out)
         except IntegrationError as err:
-            error_msg = str(err)
-            error = err
-            right = None
+            self._buffers.release_state(out)
+            return self._make_leaf(left, None, err)
+        return self._make_leaf(left, right, None)
+
+    def _make_leaf(self, left: State, right: State | None, error: IntegrationError | None):
+        """Turn the result of a leapfrog step into a subtree of depth zero."""
+        self.n_proposals += 1
+        if right is None:
+            error_msg = str(error)
         else:
-            assert right is not None  # since there was no IntegrationError
             # h - H0
             energy_change = right.energy - self.start_energy
             if np.isnan(energy_change):
@@ -351,22 +497,19 @@ class _Tree:
                 # e^{H(q_0, p_0) - H(q_n, p_n)} max(1, e^{H(q_0, p_0) - H(q_n, p_n)})
                 # Saturated Metropolis accept probability with Boltzmann weight
                 log_size = -energy_change
-                proposal = Proposal(
-                    right.q.data,
-                    right.q_grad,
-                    right.energy,
-                    right.model_logp,
-                    right.index_in_trajectory,
-                )
+                proposal = self._buffers.proposal(right)
                 tree = Subtree(right, right, right.p.data, proposal, log_size)
                 return tree, None, False
             else:
                 error_msg = f"Energy change in leapfrog step is too large: {energy_change}."
-                error = None
-        finally:
-            self.n_proposals += 1
         tree = Subtree(None, None, None, None, -np.inf)
-        divergence_info = DivergenceInfo(error_msg, error, left, right)
+        # The divergence info outlives the tree, whose buffers are reused
+        divergence_info = DivergenceInfo(
+            error_msg,
+            error,
+            _copy_state(left),
+            None if right is None else _copy_state(right),
+        )
         return tree, divergence_info, False
 
     def _build_subtree(self, left, depth, epsilon):
@@ -378,25 +521,40 @@ class _Tree:
             return tree1, diverging, turning
 
         tree2, diverging, turning = self._build_subtree(tree1.right, depth - 1, epsilon)
+        return self._merge_subtrees(tree1, tree2, depth, diverging, turning)
 
+    def _merge_subtrees(self, tree1, tree2, depth, diverging, turning):
+        """Combine two neighbouring subtrees of depth `depth - 1`."""
         left, right = tree1.left, tree2.right
 
         if not (diverging or turning):
-            p_sum = tree1.p_sum + tree2.p_sum
+            buffers = self._buffers
+            p_sum = np.add(tree1.p_sum, tree2.p_sum, out=buffers.vector())
             turning = (p_sum.dot(left.v) <= 0) or (p_sum.dot(right.v) <= 0)
             # Additional U turn check only when depth > 1 to avoid redundant work.
             if depth - 1 > 0:
-                p_sum1 = tree1.p_sum + tree2.left.p.data
+                p_sum1 = np.add(tree1.p_sum, tree2.left.p.data, out=self._p_sum_scratch)
                 turning1 = (p_sum1.dot(tree1.left.v) <= 0) or (p_sum1.dot(tree2.left.v) <= 0)
-                p_sum2 = tree1.right.p.data + tree2.p_sum
+                p_sum2 = np.add(tree1.right.p.data, tree2.p_sum, out=self._p_sum_scratch)
                 turning2 = (p_sum2.dot(tree1.right.v) <= 0) or (p_sum2.dot(tree2.right.v) <= 0)
                 turning = turning | turning1 | turning2
 
             log_size = np.logaddexp(tree1.log_size, tree2.log_size)
             if logbern(tree2.log_size - log_size):
                 proposal = tree2.proposal
+                buffers.release_proposal(tree1.proposal)
             else:
                 proposal = tree1.proposal
+                buffers.release_proposal(tree2.proposal)
+
+            # The states where the two subtrees meet are no longer needed
+            if depth - 1 > 0:
+                buffers.release_vector(tree1.p_sum)
+                buffers.release_vector(tree2.p_sum)
+            if tree1.right is not left:
+                buffers.release_state(tree1.right)
+            if tree2.left is not right:
+                buffers.release_state(tree2.left)
         else:
             p_sum = tree1.p_sum
             log_size = tree1.log_size
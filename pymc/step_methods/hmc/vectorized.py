@@ -0,0 +1,256 @@
+#   Copyright 2020 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from __future__ import annotations
+
+import copy
+import time
+
+from typing import Generator, Sequence
+
+import numpy as np
+import pytensor
+import pytensor.tensor as at
+
+from pytensor.graph.replace import clone_replace
+from scipy import linalg
+
+from pymc.blocking import DictToArrayBijection, PointType, RaveledVars, StatsType
+from pymc.model import Model
+from pymc.pytensorf import compile_pymc, floatX, gradient, join_nonshared_inputs
+from pymc.step_methods.hmc.integration import (
+    CpuLeapfrogIntegrator,
+    IntegrationError,
+    State,
+    integration_error,
+)
+from pymc.step_methods.hmc.nuts import NUTS, _Tree, _TreeBuffers
+
+__all__ = ["VectorizedNUTS"]
+
+# The trajectory of every chain is computed by a generator that yields the
+# positions at which it needs the logp and its gradient, and that is sent
+# a `(logp, grad)` tuple in return. This allows to evaluate the positions
+# of all chains in a single call of a compiled function.
+Evaluations = Generator[RaveledVars, tuple, object]
+
+
+def batched_logp_dlogp_function(model: Model, vars, dtype=None):
+    """Compile a function that computes the logp and its gradient for a batch of points.
+
+    The function takes a matrix whose rows are raveled values of `vars`, and returns
+    a vector with the logp of every row, and a matrix with their gradients.
+
+    The rows are evaluated one after the other by a ``scan`` in the compiled function,
+    so the computations are not batched: compared to a call per row, this only saves
+    the overhead of calling a compiled function.
+    """
+    if dtype is None:
+        dtype = pytensor.config.floatX
+
+    logp = model.logp()
+    dlogp = gradient(logp, vars)
+    [logp, dlogp], q = join_nonshared_inputs(model.initial_point(), [logp, dlogp], vars)
+
+    qs = at.matrix("qs", dtype=dtype)
+
+    def logp_dlogp(q_row):
+        return clone_replace([logp, dlogp.astype(dtype)], replace={q: q_row.astype(q.dtype)})
+
+    # Map over the leading chain dimension inside of the compiled function
+    (logps, dlogps), _ = pytensor.scan(logp_dlogp, sequences=[qs])
+    fn = compile_pymc([qs], [logps, dlogps])
+    fn.trust_input = True
+    return fn
+
+
+def _leapfrog(
+    integrator: CpuLeapfrogIntegrator, epsilon, state: State, out: State | None = None
+) -> Evaluations:
+    """Generator version of `CpuLeapfrogIntegrator.step`."""
+    try:
+        q_new, p_new, v_new = integrator._step_position(epsilon, state, out)
+        logp, q_new_grad = yield q_new
+        if out is not None:
+            np.copyto(out.q_grad, q_new_grad)
+            q_new_grad = out.q_grad
+        return integrator._step_momentum(epsilon, state, q_new, p_new, v_new, logp, q_new_grad)
+    except (linalg.LinAlgError, ValueError) as err:
+        error = integration_error(err)
+        if error is None:
+            raise
+        raise error
+
+
+class _BatchedTree(_Tree):
+    """NUTS tree whose leapfrog steps are evaluated by the caller."""
+
+    def extend(self, direction) -> Evaluations:
+        if direction > 0:
+            tree, diverging, turning = yield from self._build_subtree(
+                self.right, self.depth, floatX(np.asarray(self.step_size))
+            )
+        else:
+            tree, diverging, turning = yield from self._build_subtree(
+                self.left, self.depth, floatX(np.asarray(-self.step_size))
+            )
+        return self._add_subtree(direction, tree, diverging, turning)
+
+    def _single_step(self, left: State, epsilon: float) -> Evaluations:
+        out = self._buffers.state(left)
+        try:
+            right = yield from _leapfrog(self.integrator, epsilon, left, out)
+        except IntegrationError as err:
+            self._buffers.release_state(out)
+            return self._make_leaf(left, None, err)
+        return self._make_leaf(left, right, None)
+
+    def _build_subtree(self, left, depth, epsilon) -> Evaluations:
+        if depth == 0:
+            return (yield from self._single_step(left, epsilon))
+
+        tree1, diverging, turning = yield from self._build_subtree(left, depth - 1, epsilon)
+        if diverging or turning:
+            return tree1, diverging, turning
+
+        tree2, diverging, turning = yield from self._build_subtree(tree1.right, depth - 1, epsilon)
+        return self._merge_subtrees(tree1, tree2, depth, diverging, turning)
+
+
+def _nuts_astep(step: NUTS, q0: RaveledVars) -> Evaluations:
+    """Generator version of `NUTS.astep`."""
+    perf_start = time.perf_counter()
+    process_start = time.process_time()
+
+    p0 = step.potential.random()
+    p0 = RaveledVars(p0, q0.point_map_info)
+
+    logp, dlogp = yield q0
+    start = step.integrator._make_state(q0, p0, logp, dlogp)
+    step_size = step._start_trajectory(q0, start)
+
+    tree = _BatchedTree(
+        len(p0.data), step.integrator, start, step_size, step.Emax, step._tree_buffers
+    )
+    trajectory = step._build_trajectory(tree)
+    try:
+        direction = next(trajectory)
+        while True:
+            extension = yield from tree.extend(direction)
+            direction = trajectory.send(extension)
+    except StopIteration as stop:
+        hmc_step = stop.value
+    return step._end_trajectory(hmc_step, perf_start, process_start)
+
+
+def _copy_for_chain(step: NUTS) -> NUTS:
+    """Copy the tuning state of a step method, but not its compiled functions."""
+    chain_step = copy.copy(step)
+    chain_step.potential = copy.deepcopy(step.potential)
+    chain_step.step_adapt = copy.deepcopy(step.step_adapt)
+    chain_step.integrator = CpuLeapfrogIntegrator(chain_step.potential, step._logp_dlogp_func)
+    chain_step._tree_buffers = _TreeBuffers()
+    return chain_step
+
+
+class VectorizedNUTS:
+    """Advance several chains of :class:`~pymc.NUTS` in lockstep.
+
+    Every chain has its own momentum, trajectory, step size adaptation and mass
+    matrix adaptation, but the logp and its gradient are computed for all chains
+    that are waiting for them in a single call of a compiled function, see
+    :func:`batched_logp_dlogp_function`. Chains whose trajectory already ended,
+    because it turned around or diverged, no longer take part in the evaluations.
+
+    The timing statistics of a draw are shared by all chains.
+
+    Parameters
+    ----------
+    step : NUTS
+        The step method whose settings and initial tuning state are used for all chains.
+        It has to sample all free variables of its model.
+    chains : int
+        The number of chains.
+    random_seed : list of int, optional
+        A seed for every chain. The step methods draw from the global NumPy random
+        state, which is swapped for a state of its own while a chain is advanced.
+        If None, the chains share the global random state.
+    """
+
+    def __init__(self, step: NUTS, chains: int, random_seed: Sequence[int] | None = None):
+        if not isinstance(step, NUTS):
+            raise ValueError("Vectorized sampling is only supported for NUTS.")
+        if step._logp_dlogp_func._extra_vars:
+            raise ValueError(
+                "Vectorized sampling requires NUTS to sample all free variables of the model."
+            )
+        self.vars = step.vars
+        self.stats_dtypes = step.stats_dtypes
+        self.steps = [_copy_for_chain(step) for _ in range(chains)]
+        self._random_states = None
+        if random_seed is not None:
+            if len(random_seed) != chains:
+                raise ValueError("Expected a random seed for every chain.")
+            self._random_states = [np.random.RandomState(seed).get_state() for seed in random_seed]
+        self._logp_dlogp_batch = batched_logp_dlogp_function(
+            step._model, step.vars, step._logp_dlogp_func.dtype
+        )
+
+    def reset_tuning(self, tune: bool = True):
+        for step in self.steps:
+            step.tune = tune
+            step.reset_tuning()
+            step.iter_count = 0
+
+    def stop_tuning(self):
+        for step in self.steps:
+            step.stop_tuning()
+
+    def step(self, points: Sequence[PointType]) -> list[tuple[PointType, StatsType]]:
+        """Draw the next sample of every chain."""
+        qs = [
+            DictToArrayBijection.map({v.name: point[v.name] for v in self.vars}) for point in points
+        ]
+        results = self._evaluate_all([_nuts_astep(step, q) for step, q in zip(self.steps, qs)])
+
+        draws = []
+        for (q_new, stats), q, point in zip(results, qs, points):
+            if not isinstance(q_new, RaveledVars):
+                q_new = RaveledVars(q_new, q.point_map_info)
+            draws.append((DictToArrayBijection.rmap(q_new, start_point=point), stats))
+        return draws
+
+    def _evaluate_all(self, chains: list[Evaluations]) -> list:
+        results = [None] * len(chains)
+        requests = {i: self._resume(i, chain, None) for i, chain in enumerate(chains)}
+        while requests:
+            idxs = list(requests)
+            logps, dlogps = self._logp_dlogp_batch(np.stack([requests[i].data for i in idxs]))
+            requests = {}
+            for i, logp, dlogp in zip(idxs, logps, dlogps):
+                try:
+                    requests[i] = self._resume(i, chains[i], (logp, dlogp))
+                except StopIteration as stop:
+                    results[i] = stop.value
+        return results
+
+    def _resume(self, i: int, chain: Evaluations, value):
+        """Send `value` to the generator of chain `i`, with the random state of the chain."""
+        if self._random_states is None:
+            return chain.send(value)
+        np.random.set_state(self._random_states[i])
+        try:
+            return chain.send(value)
+        finally:
+            self._random_states[i] = np.random.get_state()
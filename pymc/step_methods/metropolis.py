@@ -11,7 +11,9 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-from typing import Callable, Dict, List, Optional, Tuple
+import warnings
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import numpy.random as nr
@@ -20,12 +22,14 @@ import scipy.linalg
 import scipy.special
 
 from pytensor import tensor as at
+from pytensor.graph.basic import graph_inputs
 from pytensor.graph.fg import MissingInputError
 from pytensor.tensor.random.basic import BernoulliRV, CategoricalRV
 
 import pymc as pm
 
-from pymc.blocking import DictToArrayBijection, RaveledVars
+from pymc.blocking import DictToArrayBijection, PointType, RaveledVars
+from pymc.model_graph import markov_blanket_terms
 from pymc.pytensorf import (
     CallableTensor,
     compile_pymc,
@@ -111,6 +115,51 @@ class MultivariateNormalProposal(Proposal):
             return np.dot(self.chol, b)
 
 
+class CurrentLogp:
+    """The logp at the current point of a Metropolis-type step method.
+
+    Keeping it between steps means that only the logp of the proposals has to be
+    evaluated. It is dropped as soon as any of the other variables that the logp
+    depends on change, for example because another step method of a `CompoundStep`
+    updated them.
+
+    Parameters
+    ----------
+    other_names: list of str
+        Names of the value variables, other than the ones that are sampled, that are
+        inputs of the logp. See `markov_blanket_inputs`.
+    """
+
+    def __init__(self, other_names: Sequence[str]):
+        self.other_names = list(other_names)
+        self.reset()
+
+    def reset(self):
+        self.q: Optional[np.ndarray] = None
+        self.logp = None
+        self._other_values: Optional[List[np.ndarray]] = None
+
+    def check_point(self, point: PointType):
+        """Drop the logp if the values of the other inputs of the logp in `point` changed."""
+        others = [point[name] for name in self.other_names]
+        previous = self._other_values
+        if previous is None or any(
+            not np.array_equal(value, prev) for value, prev in zip(others, previous)
+        ):
+            self.q = None
+        self._other_values = [np.copy(value) for value in others]
+
+    def get(self, q: np.ndarray):
+        """Return the logp at `q`, or None if it is not known."""
+        if self.q is None or not np.array_equal(q, self.q):
+            return None
+        return self.logp
+
+    def set(self, q: np.ndarray, logp):
+        self.q = q
+        self.logp = logp
+
+
 class Metropolis(ArrayStepShared):
     """Metropolis-Hastings sampling step"""
 
@@ -224,7 +273,10 @@ class Metropolis(ArrayStepShared):
         self.mode = mode
 
         shared = pm.make_shared_replacements(initial_values, vars, model)
-        self.delta_logp = delta_logp(initial_values, model.logp(), vars, shared)
+        # Only the logp terms that depend on vars are needed for the acceptance rate
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self.logp = logp_fn(initial_values, logp, vars, shared)
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
         super().__init__(vars, shared)
 
     def reset_tuning(self):
@@ -232,8 +284,14 @@ class Metropolis(ArrayStepShared):
         for attr, initial_value in self._untuned_settings.items():
             setattr(self, attr, initial_value)
         self.accepted_sum[:] = 0
+        # The model data may have changed since the last call
+        self._current_logp.reset()
         return
 
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
+
     def astep(self, q0: RaveledVars) -> Tuple[RaveledVars, StatsType]:
 
         point_map_info = q0.point_map_info
@@ -259,25 +317,35 @@ class Metropolis(ArrayStepShared):
         else:
             q = floatX(q0d + delta)
 
+        logp_curr = self._current_logp.get(q0d)
+        if logp_curr is None:
+            logp_curr = self.logp(q0d)
+
         if self.elemwise_update:
             q_temp = q0d.copy()
             # Shuffle order of updates (probably we don't need to do this in every step)
             np.random.shuffle(self.enum_dims)
             for i in self.enum_dims:
-                q_temp[i] = q[i]
-                accept_rate_i = self.delta_logp(q_temp, q0d)
-                q_temp_, accepted_i = metrop_select(accept_rate_i, q_temp, q0d)
-                q_temp[i] = q_temp_[i]
+                curr_val, q_temp[i] = q_temp[i], q[i]
+                logp_prop = self.logp(q_temp)
+                accept_rate_i = logp_prop - logp_curr
+                q_temp[i], accepted_i = metrop_select(accept_rate_i, q_temp[i], curr_val)
+                if accepted_i:
+                    logp_curr = logp_prop
                 self.accept_rate_iter[i] = accept_rate_i
                 self.accepted_iter[i] = accepted_i
                 self.accepted_sum[i] += accepted_i
             q = q_temp
         else:
-            accept_rate = self.delta_logp(q, q0d)
+            logp_prop = self.logp(q)
+            accept_rate = logp_prop - logp_curr
             q, accepted = metrop_select(accept_rate, q, q0d)
+            if accepted:
+                logp_curr = logp_prop
             self.accept_rate_iter = accept_rate
             self.accepted_iter = accepted
             self.accepted_sum += accepted
+        self._current_logp.set(q, logp_curr)
 
         self.steps_until_tune -= 1
 
@@ -387,13 +455,25 @@ class BinaryMetropolis(ArrayStep):
         if not all([v.dtype in pm.discrete_types for v in vars]):
             raise ValueError("All variables must be Bernoulli for BinaryMetropolis")
 
-        super().__init__(vars, [model.compile_logp()])
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
+        super().__init__(vars, [markov_blanket_logp(model, vars, logp)])
+
+    def reset_tuning(self):
+        # The model data may have changed since the last call
+        self._current_logp.reset()
+
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
 
     def astep(self, apoint: RaveledVars, *args) -> Tuple[RaveledVars, StatsType]:
         logp = args[0]
-        logp_q0 = logp(apoint)
         point_map_info = apoint.point_map_info
         q0 = apoint.data
+        logp_q0 = self._current_logp.get(q0)
+        if logp_q0 is None:
+            logp_q0 = logp(apoint)
 
         # Convert adaptive_scale_factor to a jump probability
         p_jump = 1.0 - 0.5**self.scaling
@@ -408,6 +488,7 @@ class BinaryMetropolis(ArrayStep):
         accept = logp_q - logp_q0
         q_new, accepted = metrop_select(accept, q, q0)
         self.accepted += accepted
+        self._current_logp.set(q_new, logp_q if accepted else logp_q0)
 
         stats = {
             "tune": self.tune,
@@ -487,7 +568,17 @@ class BinaryGibbsMetropolis(ArrayStep):
         if not all([v.dtype in pm.discrete_types for v in vars]):
             raise ValueError("All variables must be binary for BinaryGibbsMetropolis")
 
-        super().__init__(vars, [model.compile_logp()])
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
+        super().__init__(vars, [markov_blanket_logp(model, vars, logp)])
+
+    def reset_tuning(self):
+        # The model data may have changed since the last call
+        self._current_logp.reset()
+
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
 
     def astep(self, apoint: RaveledVars, *args) -> Tuple[RaveledVars, StatsType]:
         logp: Callable[[RaveledVars], np.ndarray] = args[0]
@@ -497,7 +588,9 @@ class BinaryGibbsMetropolis(ArrayStep):
 
         q = RaveledVars(np.copy(apoint.data), apoint.point_map_info)
 
-        logp_curr = logp(q)
+        logp_curr = self._current_logp.get(q.data)
+        if logp_curr is None:
+            logp_curr = logp(q)
 
         for idx in order:
             # No need to do metropolis update if the same value is proposed,
@@ -509,6 +602,7 @@ class BinaryGibbsMetropolis(ArrayStep):
                 if accepted:
                     logp_curr = logp_prop
 
+        self._current_logp.set(q.data, logp_curr)
         return q, []
 
     @staticmethod
@@ -601,7 +695,17 @@ class CategoricalGibbsMetropolis(ArrayStep):
         else:
             raise ValueError("Argument 'proposal' should either be 'uniform' or 'proportional'")
 
-        super().__init__(vars, [model.compile_logp()])
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
+        super().__init__(vars, [markov_blanket_logp(model, vars, logp)])
+
+    def reset_tuning(self):
+        # The model data may have changed since the last call
+        self._current_logp.reset()
+
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
 
     def astep_unif(self, apoint: RaveledVars, *args) -> Tuple[RaveledVars, StatsType]:
         logp = args[0]
@@ -613,7 +717,9 @@ class CategoricalGibbsMetropolis(ArrayStep):
             nr.shuffle(dimcats)
 
         q = RaveledVars(np.copy(q0), point_map_info)
-        logp_curr = logp(q)
+        logp_curr = self._current_logp.get(q0)
+        if logp_curr is None:
+            logp_curr = logp(q)
 
         for dim, k in dimcats:
             curr_val, q.data[dim] = q.data[dim], sample_except(k, q.data[dim])
@@ -622,6 +728,7 @@ class CategoricalGibbsMetropolis(ArrayStep):
             if accepted:
                 logp_curr = logp_prop
 
+        self._current_logp.set(q.data, logp_curr)
         return q, []
 
     def astep_prop(self, apoint: RaveledVars, *args) -> Tuple[RaveledVars, StatsType]:
@@ -634,11 +741,14 @@ class CategoricalGibbsMetropolis(ArrayStep):
             nr.shuffle(dimcats)
 
         q = RaveledVars(np.copy(q0), point_map_info)
-        logp_curr = logp(q)
+        logp_curr = self._current_logp.get(q0)
+        if logp_curr is None:
+            logp_curr = logp(q)
 
         for dim, k in dimcats:
             logp_curr = self.metropolis_proportional(q, logp, logp_curr, dim, k)
 
+        self._current_logp.set(q.data, logp_curr)
         return q, []
 
     def astep(self, apoint: RaveledVars, *args) -> Tuple[RaveledVars, StatsType]:
@@ -787,9 +897,19 @@ class DEMetropolis(PopulationArrayStepShared):
         self.mode = mode
 
         shared = pm.make_shared_replacements(initial_values, vars, model)
-        self.delta_logp = delta_logp(initial_values, model.logp(), vars, shared)
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self.logp = logp_fn(initial_values, logp, vars, shared)
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
         super().__init__(vars, shared)
 
+    def reset_tuning(self):
+        # The model data may have changed since the last call
+        self._current_logp.reset()
+
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
+
     def astep(self, q0: RaveledVars) -> Tuple[RaveledVars, StatsType]:
 
         point_map_info = q0.point_map_info
@@ -814,9 +934,14 @@ class DEMetropolis(PopulationArrayStepShared):
         # propose a jump
         q = floatX(q0d + self.lamb * (r1.data - r2.data) + epsilon)
 
-        accept = self.delta_logp(q, q0d)
+        logp_q0 = self._current_logp.get(q0d)
+        if logp_q0 is None:
+            logp_q0 = self.logp(q0d)
+        logp_q = self.logp(q)
+        accept = logp_q - logp_q0
         q_new, accepted = metrop_select(accept, q, q0d)
         self.accepted += accepted
+        self._current_logp.set(q_new, logp_q if accepted else logp_q0)
 
         self.steps_until_tune -= 1
 
@@ -946,7 +1071,9 @@ class DEMetropolisZ(ArrayStepShared):
         self.mode = mode
 
         shared = pm.make_shared_replacements(initial_values, vars, model)
-        self.delta_logp = delta_logp(initial_values, model.logp(), vars, shared)
+        logp = model.logp(markov_blanket_terms(model, vars))
+        self.logp = logp_fn(initial_values, logp, vars, shared)
+        self._current_logp = CurrentLogp(markov_blanket_inputs(model, logp, vars))
         super().__init__(vars, shared)
 
     def reset_tuning(self):
@@ -955,8 +1082,14 @@ class DEMetropolisZ(ArrayStepShared):
         self._history = []
         for attr, initial_value in self._untuned_settings.items():
             setattr(self, attr, initial_value)
+        # The model data may have changed since the last call
+        self._current_logp.reset()
         return
 
+    def step(self, point: PointType) -> Tuple[PointType, StatsType]:
+        self._current_logp.check_point(point)
+        return super().step(point)
+
     def astep(self, q0: RaveledVars) -> Tuple[RaveledVars, StatsType]:
 
         point_map_info = q0.point_map_info
@@ -992,9 +1125,14 @@ class DEMetropolisZ(ArrayStepShared):
             # propose just with noise in the first 2 iterations
             q = floatX(q0d + epsilon)
 
-        accept = self.delta_logp(q, q0d)
+        logp_q0 = self._current_logp.get(q0d)
+        if logp_q0 is None:
+            logp_q0 = self.logp(q0d)
+        logp_q = self.logp(q)
+        accept = logp_q - logp_q0
         q_new, accepted = metrop_select(accept, q, q0d)
         self.accepted += accepted
+        self._current_logp.set(q_new, logp_q if accepted else logp_q0)
         self._history.append(q_new)
 
         self.steps_until_tune -= 1
@@ -1032,12 +1170,40 @@ def sample_except(limit, excluded):
     return candidate
 
 
+def markov_blanket_logp(
+    model, vars: List[at.TensorVariable], logp: Optional[at.TensorVariable] = None
+) -> Callable[[PointType], np.ndarray]:
+    """Compile the logp terms in the Markov blanket of `vars` as a function of a point.
+
+    Differences of its values are the same as those of the model logp, as long as only
+    the values of `vars` change. The graph of the logp can be passed if it was built already.
+    """
+    if logp is None:
+        logp = model.logp(markov_blanket_terms(model, vars))
+    return model.compile_fn(logp, inputs=model.value_vars, on_unused_input="ignore")
+
+
+def markov_blanket_inputs(
+    model, logp: at.TensorVariable, vars: List[at.TensorVariable]
+) -> List[str]:
+    """Names of the value variables other than `vars` that the logp of their Markov blanket
+    depends on."""
+    names = {var.name for var in vars}
+    inputs = set(graph_inputs([logp]))
+    return [var.name for var in model.value_vars if var in inputs and var.name not in names]
+
+
 def delta_logp(
     point: Dict[str, np.ndarray],
     logp: at.TensorVariable,
     vars: List[at.TensorVariable],
     shared: Dict[at.TensorVariable, at.sharedvar.TensorSharedVariable],
 ) -> pytensor.compile.Function:
+    warnings.warn(
+        "delta_logp has been deprecated. Use markov_blanket_logp or logp_fn instead.",
+        FutureWarning,
+        stacklevel=2,
+    )
     [logp0], inarray0 = join_nonshared_inputs(
         point=point, outputs=[logp], inputs=vars, shared_inputs=shared
     )
@@ -1052,3 +1218,19 @@ def delta_logp(
     f = compile_pymc([inarray1, inarray0], logp1 - logp0)
     f.trust_input = True
     return f
+
+
+def logp_fn(
+    point: Dict[str, np.ndarray],
+    logp: at.TensorVariable,
+    vars: List[at.TensorVariable],
+    shared: Dict[at.TensorVariable, at.sharedvar.TensorSharedVariable],
+) -> pytensor.compile.Function:
+    """Compile the logp as a function of the raveled values of `vars`."""
+    [logp0], inarray0 = join_nonshared_inputs(
+        point=point, outputs=[logp], inputs=vars, shared_inputs=shared
+    )
+
+    f = compile_pymc([inarray0], logp0)
+    f.trust_input = True
+    return f
@@ -0,0 +1,119 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import pymc as pm
+
+from pymc.backends import chunked
+from pymc.tests.backends import fixtures as bf
+from pymc.tests.backends.test_ndarray import STATS1, STATS2
+
+
+class TestChunkedNPY0dSampling(bf.SamplingTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-0d-sampling"
+    shape = ()
+
+
+class TestChunkedNPY0dSamplingStats2(bf.SamplingTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-0d-sampling-stats"
+    sampler_vars = STATS2
+    shape = ()
+
+
+class TestChunkedNPY2dSampling(bf.SamplingTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-2d-sampling"
+    shape = (2, 3)
+
+
+class TestChunkedNPYStats(bf.StatsTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-stats"
+    shape = (2, 3)
+
+
+class TestChunkedNPY0dSelectionStats1(bf.SelectionTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-0d-selection-stats"
+    shape = ()
+    sampler_vars = STATS1
+
+
+class TestChunkedNPY2dSelection(bf.SelectionTestCase):
+    backend = chunked.ChunkedNPY
+    name = "chunked-npy-2d-selection"
+    shape = (2, 3)
+
+
+class TestChunkedNPY:
+    def test_flush_in_chunks(self, tmp_path):
+        with pm.Model() as model:
+            pm.Normal("x", shape=2)
+            strace = chunked.ChunkedNPY(str(tmp_path), buffer_size=3)
+        strace.setup(draws=7, chain=0, sampler_vars=[{"a": np.float64, "w": object}])
+
+        for i in range(4):
+            strace.record({"x": np.full(2, i)}, [{"a": i, "w": f"warning {i}"}])
+        # Only the full buffer has been written to disk
+        npt.assert_array_equal(chunked.load_chunked_npy(str(tmp_path), model)["x"][:, 0], [0, 1, 2])
+
+        # Selecting values flushes the buffer
+        npt.assert_array_equal(strace.get_values("x")[:, 0], [0, 1, 2, 3])
+        npt.assert_array_equal(strace.get_sampler_stats("a"), [0, 1, 2, 3])
+        npt.assert_array_equal(strace.get_sampler_stats("w")[-1], "warning 3")
+        strace.close()
+
+        loaded = chunked.load_chunked_npy(str(tmp_path), model)
+        assert len(loaded) == 4
+        npt.assert_array_equal(loaded["x"], strace.get_values("x"))
+        npt.assert_array_equal(loaded.get_sampler_stats("a"), [0, 1, 2, 3])
+        assert all(w is None for w in loaded.get_sampler_stats("w"))
+
+        # Slices with a step keep the last selected draw
+        sliced = strace[1::2]
+        assert len(sliced) == 2
+        npt.assert_array_equal(sliced.get_values("x")[:, 0], [1, 3])
+        npt.assert_array_equal(sliced.get_sampler_stats("a"), [1, 3])
+
+    def test_requires_name(self):
+        with pm.Model():
+            pm.Normal("x")
+            with pytest.raises(ValueError, match="requires the name of a directory"):
+                chunked.ChunkedNPY(None)
+
+    def test_sample(self, tmp_path):
+        with pm.Model() as model:
+            pm.Normal("x", shape=2)
+            pm.Deterministic("y", pm.math.exp(model["x"]))
+            idata = pm.sample(
+                tune=20,
+                draws=30,
+                chains=2,
+                cores=1,
+                trace=chunked.ChunkedNPY(str(tmp_path), buffer_size=7),
+                compute_convergence_checks=False,
+                random_seed=2,
+            )
+            loaded = chunked.load_chunked_npy(str(tmp_path))
+
+        assert idata.posterior["x"].shape == (2, 30, 2)
+        npt.assert_allclose(idata.posterior["y"], np.exp(idata.posterior["x"]))
+        # The tuning draws are discarded, so they are not written to the files
+        assert len(loaded) == 30
+        npt.assert_array_equal(loaded.get_values("x", combine=False), idata.posterior["x"])
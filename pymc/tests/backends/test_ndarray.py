@@ -16,6 +16,8 @@ import numpy as np
 import numpy.testing as npt
 import pytest
 
+import pymc as pm
+
 from pymc.backends import base, ndarray
 from pymc.tests.backends import fixtures as bf
 
@@ -172,3 +174,16 @@ class TestSqueezeCat:
         expected = np.concatenate([self.x, self.y])
         result = base._squeeze_cat([self.x, self.y], True, True)
         npt.assert_equal(result, expected)
+
+
+def test_record_beyond_expected_draws():
+    with pm.Model() as model:
+        pm.Normal("x", shape=2)
+    trace = ndarray.NDArray(model=model)
+    trace.setup(draws=2, chain=0, sampler_vars=STATS1)
+    for i in range(5):
+        trace.record({"x": np.full(2, i)}, [{"a": i, "b": i % 2 == 0}])
+    trace.close()
+    assert len(trace) == 5
+    npt.assert_array_equal(trace.get_values("x"), np.repeat(np.arange(5), 2).reshape(5, 2))
+    npt.assert_array_equal(trace.get_sampler_stats("a"), np.arange(5))
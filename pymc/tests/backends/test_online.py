@@ -0,0 +1,116 @@
+#   Copyright 2023 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import pymc as pm
+
+from pymc.backends.online import OnlineStats, combine_online_stats
+
+
+class TestOnlineStats:
+    def test_mean_var(self):
+        rng = np.random.default_rng(1)
+        draws = rng.normal(size=(500, 2, 3))
+        stats = OnlineStats({"x": (2, 3)})
+        for draw in draws:
+            stats.update({"x": draw}, None)
+
+        assert stats.n_draws == 500
+        npt.assert_allclose(stats.mean("x"), draws.mean(0))
+        npt.assert_allclose(stats.var("x"), draws.var(0, ddof=1))
+
+    def test_ess(self):
+        rng = np.random.default_rng(2)
+        stats = OnlineStats({"iid": (), "ar": ()}, batch_size=5)
+        ar = 0.0
+        for _ in range(4000):
+            ar = 0.9 * ar + rng.normal()
+            stats.update({"iid": rng.normal(), "ar": ar}, None)
+
+        # The batches were merged, and their number stays bounded
+        assert stats.batch_size > 5
+        assert 32 <= stats._n_batches < 64
+        # Independent draws have an ESS close to the number of draws, while
+        # correlated draws of an AR(1) process with rho=0.9 have an ESS of about n / 19
+        assert 2000 < stats.ess("iid") < 8000
+        assert 100 < stats.ess("ar") < 500
+
+    def test_skips_tuning_and_counts_divergences(self):
+        stats = OnlineStats({"x": ()})
+        for i in range(10):
+            sampler_stats = [{"tune": i < 4, "diverging": i in (2, 5, 7)}]
+            stats.update({"x": float(i)}, sampler_stats)
+
+        assert stats.n_draws == 6
+        assert stats.n_divergences == 2
+        npt.assert_allclose(stats.mean("x"), np.mean(np.arange(4, 10)))
+
+    def test_combine(self):
+        rng = np.random.default_rng(3)
+        draws = rng.normal(size=(3, 200)) + np.array([[0], [0], [5]])
+        chains = []
+        for chain_draws in draws:
+            stats = OnlineStats({"x": ()})
+            for draw in chain_draws:
+                stats.update({"x": draw}, None)
+            chains.append(stats)
+
+        summary = combine_online_stats(chains)["x"]
+        npt.assert_allclose(summary["mean"], draws.mean())
+        npt.assert_allclose(summary["sd"], draws.std(), rtol=1e-2)
+        # The third chain does not mix with the others
+        assert summary["r_hat"] > 1.5
+        assert combine_online_stats(chains[:2])["x"]["r_hat"] < 1.05
+
+
+@pytest.mark.parametrize("chain_method", ["sequential", "processes"])
+def test_sample_online_stats(chain_method):
+    with pm.Model() as model:
+        pm.Normal("x", shape=2)
+        mtrace = pm.sample(
+            draws=200,
+            tune=50,
+            chains=2,
+            cores=1 if chain_method == "sequential" else 2,
+            trace=pm.backends.NDArray(online_stats=True),
+            return_inferencedata=False,
+            compute_convergence_checks=False,
+            random_seed=5,
+        )
+
+    for chain in mtrace.chains:
+        stats = mtrace._straces[chain].online_stats
+        values = mtrace.get_values("x", chains=chain)
+        assert stats.n_draws == 200
+        npt.assert_allclose(stats.mean("x"), values.mean(0))
+        npt.assert_allclose(stats.var("x"), values.var(0, ddof=1))
+
+    summary = mtrace.get_online_stats()
+    npt.assert_allclose(summary["x"]["mean"], mtrace["x"].mean(0))
+    assert summary["diverging"] == mtrace.get_sampler_stats("diverging").sum()
+    assert np.all(summary["x"]["ess"] > 50)
+
+    with model:
+        mtrace = pm.sample(
+            draws=10,
+            tune=10,
+            chains=1,
+            return_inferencedata=False,
+            compute_convergence_checks=False,
+        )
+    with pytest.raises(ValueError, match="online_stats=True"):
+        mtrace.get_online_stats()
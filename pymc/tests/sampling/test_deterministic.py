@@ -0,0 +1,72 @@
+#   Copyright 2022 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import logging
+
+import numpy as np
+import pytensor.tensor as at
+import pytest
+
+from arviz import dict_to_dataset
+
+import pymc as pm
+
+from pymc.sampling.deterministic import compute_deterministics
+
+
+class TestComputeDeterministics:
+    @pytest.mark.parametrize("chunk_size, max_memory", [(7, None), (None, 100), (100, None)])
+    def test_basic(self, chunk_size, max_memory):
+        with pm.Model(coords={"obs": range(3)}) as m:
+            x = pm.Normal("x", shape=2)
+            s = pm.HalfNormal("s")
+            s_value_var = m.rvs_to_values[s]
+            pm.Deterministic("y", x.sum() * s)
+            pm.Deterministic("z", s * at.arange(3), dims="obs")
+
+        rng = np.random.default_rng(1)
+        posterior = dict_to_dataset(
+            {"x": rng.normal(size=(2, 25, 2)), "s": np.exp(rng.normal(size=(2, 25)))}
+        )
+        posterior = posterior.assign_coords(draw=np.arange(10, 35))
+        res = compute_deterministics(
+            posterior, model=m, chunk_size=chunk_size, max_memory=max_memory, progressbar=False
+        )
+
+        # Check we didn't erase the original mappings
+        assert m.rvs_to_values[s] is s_value_var
+        assert set(res.data_vars) == {"y", "z"}
+        assert res["z"].dims == ("chain", "draw", "obs")
+        np.testing.assert_array_equal(res["draw"], posterior["draw"])
+        np.testing.assert_allclose(res["y"], posterior["x"].sum("x_dim_0") * posterior["s"])
+        np.testing.assert_allclose(
+            res["z"], posterior["s"].values[..., None] * np.arange(3), rtol=1e-6
+        )
+
+    def test_var_names_and_merge(self):
+        with pm.Model() as m:
+            x = pm.Normal("x")
+            pm.Deterministic("y", 2 * x)
+            pm.Deterministic("z", 3 * x)
+
+        posterior = dict_to_dataset({"x": np.arange(20.0).reshape(2, 10)})
+        res = compute_deterministics(
+            posterior, var_names=["z"], model=m, merge_dataset=True, progressbar=False
+        )
+        assert set(res.data_vars) == {"x", "z"}
+        np.testing.assert_allclose(res["z"], 3 * posterior["x"])
+
+        with pytest.raises(ValueError, match="must refer to Deterministics"):
+            compute_deterministics(posterior, var_names=["x"], model=m)
+        with pytest.raises(ValueError, match="chunk_size must be a positive integer"):
+            compute_deterministics(posterior, model=m, chunk_size=0)
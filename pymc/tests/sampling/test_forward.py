@@ -12,9 +12,11 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import logging
+import os
 import warnings
 
 from typing import Tuple
+from unittest import mock
 
 import numpy as np
 import numpy.random as npr
@@ -437,6 +439,28 @@ class TestCompileForwardSampler:
             "offsets",
         }
 
+    def test_reused_after_resizing_data(self):
+        with pm.Model() as model:
+            x = pm.MutableData("x", np.linspace(0, 1, 10))
+            y = pm.MutableData("y", np.zeros(10))
+            beta = pm.Normal("beta")
+            obs = pm.Normal("obs", beta * x, 1e-3, observed=y, shape=x.shape)
+
+        f, _ = compile_forward_sampling_function(
+            [obs], vars_in_trace=[beta], basic_rvs=model.basic_RVs
+        )
+        beta_value = np.asarray(1.0, dtype=beta.dtype)
+        assert f(beta=beta_value)[0].shape == (10,)
+
+        # Resizing the data does not require compiling the function again
+        with model:
+            pm.set_data({"x": np.linspace(0, 1, 5), "y": np.zeros(5)})
+        with mock.patch.object(pytensor, "function", side_effect=AssertionError):
+            f, _ = compile_forward_sampling_function(
+                [obs], vars_in_trace=[beta], basic_rvs=model.basic_RVs
+            )
+        npt.assert_allclose(f(beta=beta_value)[0], np.linspace(0, 1, 5), atol=0.01)
+
 
 class TestSamplePPC(SeededTest):
     def test_normal_scalar(self):
@@ -523,6 +547,122 @@ class TestSamplePPC(SeededTest):
             assert ppc["a"].shape == (trace.nchains, len(trace), 2)
             assert ppc0["a"].shape == (1, 10, 2)
 
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+    def test_chunked(self, chunk_size):
+        with pm.Model() as model:
+            mu = pm.Normal("mu", 0.0, 1.0, shape=2)
+            a = pm.Normal("a", mu=mu, sigma=0.01, observed=np.array([0.5, 0.2]))
+            pm.Deterministic("b", 2 * a)
+        posterior = xr.Dataset(
+            {"mu": (("chain", "draw", "mu_dim"), np.random.normal(size=(2, 10, 2)) * 10)},
+            coords={"chain": np.arange(2), "draw": np.arange(10)},
+        )
+
+        with model:
+            ppc = pm.sample_posterior_predictive(
+                posterior,
+                var_names=["a", "b"],
+                chunk_size=chunk_size,
+                random_seed=1,
+                return_inferencedata=False,
+            )
+        assert ppc["a"].shape == (2, 10, 2)
+        npt.assert_allclose(ppc["a"], posterior["mu"].values, atol=0.1)
+        npt.assert_allclose(ppc["b"], 2 * ppc["a"])
+        # Every draw gets its own random numbers
+        assert len(np.unique(ppc["a"] - posterior["mu"].values)) == 40
+
+        with pytest.raises(ValueError, match="chunk_size must be a positive integer"):
+            pm.sample_posterior_predictive(posterior, model=model, chunk_size=0)
+
+    @pytest.mark.parametrize("chunk_size", [None, 3])
+    def test_output_dir(self, chunk_size, tmp_path):
+        with pm.Model() as model:
+            mu = pm.Normal("mu", 0.0, 1.0, shape=2)
+            a = pm.Normal("a", mu=mu, sigma=0.01, observed=np.array([0.5, 0.2]))
+        posterior = xr.Dataset(
+            {"mu": (("chain", "draw", "mu_dim"), np.random.normal(size=(2, 10, 2)) * 10)},
+            coords={"chain": np.arange(2), "draw": np.arange(10)},
+        )
+
+        with model:
+            in_memory = pm.sample_posterior_predictive(
+                posterior, chunk_size=chunk_size, random_seed=1, return_inferencedata=False
+            )
+            on_disk = pm.sample_posterior_predictive(
+                posterior,
+                chunk_size=chunk_size,
+                random_seed=1,
+                return_inferencedata=False,
+                output_dir=tmp_path / "ppc",
+            )
+            idata = pm.sample_posterior_predictive(
+                posterior, chunk_size=chunk_size, output_dir=tmp_path / "idata"
+            )
+
+        assert isinstance(on_disk["a"], np.memmap)
+        npt.assert_array_equal(on_disk["a"], in_memory["a"])
+        npt.assert_array_equal(np.load(tmp_path / "ppc" / "a.npy").reshape(2, 10, 2), on_disk["a"])
+        npt.assert_array_equal(
+            np.load(tmp_path / "idata" / "a.npy").reshape(2, 10, 2),
+            idata.posterior_predictive["a"].values,
+        )
+
+        with pytest.raises(FileExistsError, match="already exists"):
+            pm.sample_posterior_predictive(posterior, model=model, output_dir=tmp_path / "ppc")
+
+    def test_output_dir_sanitizes_names(self, tmp_path):
+        with pm.Model() as model:
+            mu = pm.Normal("mu", 0.0, 1.0)
+            pm.Normal("../a/b", mu=mu, sigma=0.01, observed=np.array([0.5, 0.2]))
+        posterior = xr.Dataset(
+            {"mu": (("chain", "draw"), np.random.normal(size=(1, 5)))},
+            coords={"chain": np.arange(1), "draw": np.arange(5)},
+        )
+
+        with model:
+            ppc = pm.sample_posterior_predictive(
+                posterior, return_inferencedata=False, output_dir=tmp_path / "ppc"
+            )
+        assert os.listdir(tmp_path) == ["ppc"]
+        assert os.listdir(tmp_path / "ppc") == [".._a_b.npy"]
+        npt.assert_array_equal(
+            np.load(tmp_path / "ppc" / ".._a_b.npy").reshape(1, 5, 2), ppc["../a/b"]
+        )
+
+    @pytest.mark.parametrize("chunk_size", [None, 3])
+    def test_cores(self, chunk_size):
+        with pm.Model() as model:
+            mu = pm.Normal("mu", 0.0, 1.0, shape=2)
+            a = pm.Normal("a", mu=mu, sigma=0.01, observed=np.array([0.5, 0.2]))
+        posterior = xr.Dataset(
+            {"mu": (("chain", "draw", "mu_dim"), np.random.normal(size=(2, 10, 2)) * 10)},
+            coords={"chain": np.arange(2), "draw": np.arange(10)},
+        )
+
+        ppcs = []
+        for cores in (1, 2):
+            with model:
+                ppcs.append(
+                    pm.sample_posterior_predictive(
+                        posterior,
+                        chunk_size=chunk_size,
+                        cores=cores,
+                        random_seed=1,
+                        return_inferencedata=False,
+                        mp_ctx="spawn",
+                    )
+                )
+        ppc_one_core, ppc_two_cores = ppcs
+        assert ppc_one_core["a"].shape == (2, 10, 2)
+        npt.assert_allclose(ppc_one_core["a"], posterior["mu"].values, atol=0.1)
+        # Chunks are seeded on their own, so the draws don't depend on the number of cores
+        npt.assert_array_equal(ppc_one_core["a"], ppc_two_cores["a"])
+        assert len(np.unique(ppc_one_core["a"] - posterior["mu"].values)) == 40
+
+        with pytest.raises(ValueError, match="cores must be a positive integer"):
+            pm.sample_posterior_predictive(posterior, model=model, cores=0)
+
     def test_normal_vector_idata(self):
         with pm.Model() as model:
             mu = pm.Normal("mu", 0.0, 1.0)
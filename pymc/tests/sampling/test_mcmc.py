@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import logging
+import os
 import unittest.mock as mock
 import warnings
 
@@ -34,6 +35,14 @@ import pymc as pm
 from pymc.backends.ndarray import NDArray
 from pymc.distributions import transforms
 from pymc.exceptions import SamplingError
+from pymc.sampling.checkpoint import (
+    _draws_file,
+    dump_step_state,
+    load_checkpoint,
+    load_step_state,
+    make_checkpoint,
+    save_checkpoint,
+)
 from pymc.sampling.mcmc import assign_step_methods
 from pymc.stats.convergence import SamplerWarning, WarningType
 from pymc.step_methods import (
@@ -411,6 +420,325 @@ class TestSample(SeededTest):
             with pytest.raises(NotImplementedError):
                 xvars = [t["mu"] for t in trace]
 
+    def test_sample_threads(self):
+        with pm.Model():
+            x = pm.Normal("x", shape=2)
+            k = pm.Poisson("k", 3)
+            pm.Deterministic("y", x + k)
+            pm.Normal("obs", x, 1, observed=np.array([[0.5, -0.2], [1.0, 0.3]]))
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+                idata = pm.sample(
+                    draws=20,
+                    tune=10,
+                    chains=3,
+                    cores=2,
+                    chain_method="threads",
+                    compute_convergence_checks=False,
+                )
+        assert idata.posterior.sizes["chain"] == 3
+        assert idata.posterior.sizes["draw"] == 20
+        np.testing.assert_allclose(
+            idata.posterior["y"], idata.posterior["x"] + idata.posterior["k"]
+        )
+        # The chains must not share their sampler state
+        assert not np.all(idata.posterior["x"].sel(chain=0) == idata.posterior["x"].sel(chain=1))
+
+    def test_threads_callback_can_cancel(self):
+        def callback(trace, draw):
+            if len(trace) >= 5:
+                raise KeyboardInterrupt()
+
+        with self.model:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+                trace = pm.sample(
+                    100,
+                    tune=0,
+                    chains=2,
+                    cores=2,
+                    step=self.step,
+                    chain_method="threads",
+                    callback=callback,
+                    return_inferencedata=False,
+                )
+        assert 5 <= len(trace) < 100
+
+    def test_interrupt_keeps_chain_without_index_zero(self):
+        # After an interrupt _choose_chains may drop chain 0, whose tuning
+        # draws must then not be counted.
+        def callback(trace, draw):
+            if draw.chain == 1 and len(trace) >= 5:
+                raise KeyboardInterrupt()
+
+        def drop_first_chain(traces, tune):
+            kept = [trace for trace in traces if trace.chain != 0]
+            return kept, min(len(trace) for trace in kept)
+
+        with self.model:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+                with mock.patch("pymc.sampling.mcmc._choose_chains", side_effect=drop_first_chain):
+                    trace = pm.sample(
+                        100,
+                        tune=0,
+                        chains=2,
+                        cores=2,
+                        step=self.step,
+                        chain_method="threads",
+                        callback=callback,
+                        discard_tuned_samples=False,
+                        return_inferencedata=False,
+                    )
+        assert trace.chains == [1]
+        assert 5 <= len(trace) < 100
+
+    def test_unknown_chain_method(self):
+        with self.model:
+            with pytest.raises(ValueError, match="Unknown chain_method"):
+                pm.sample(10, tune=0, chains=2, cores=2, chain_method="gpu")
+
+    def test_threads_can_not_be_seeded(self):
+        with self.model:
+            with pytest.raises(ValueError, match="random_seed is not supported"):
+                pm.sample(10, tune=0, chains=2, cores=2, chain_method="threads", random_seed=1)
+
+    @pytest.mark.parametrize("cores", (1, 2))
+    def test_checkpoint_resume(self, cores, tmp_path):
+        def interrupt(trace, draw):
+            if draw.chain == 0 and draw.draw_idx == 25:
+                raise KeyboardInterrupt()
+
+        with pm.Model():
+            x = pm.Normal("x", shape=2)
+            pm.HalfNormal("s")
+            pm.Deterministic("y", 2 * x)
+            sample_kwargs = dict(
+                draws=20,
+                tune=20,
+                chains=2,
+                cores=cores,
+                random_seed=self.random_seed,
+                compute_convergence_checks=False,
+                checkpoint_every=10,
+            )
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+                expected = pm.sample(checkpoint=str(tmp_path / "complete"), **sample_kwargs)
+                pm.sample(
+                    checkpoint=str(tmp_path / "interrupted"), callback=interrupt, **sample_kwargs
+                )
+                resumed = pm.sample(checkpoint=str(tmp_path / "interrupted"), **sample_kwargs)
+                # Completed chains are loaded from their checkpoints
+                reloaded = pm.sample(checkpoint=str(tmp_path / "complete"), **sample_kwargs)
+
+        for idata in (resumed, reloaded):
+            for name, values in expected.posterior.items():
+                npt.assert_array_equal(idata.posterior[name], values)
+            for name in ("step_size", "tree_depth", "energy"):
+                npt.assert_array_equal(idata.sample_stats[name], expected.sample_stats[name])
+
+    def test_checkpoint_unsupported(self, tmp_path):
+        with self.model:
+            with pytest.raises(ValueError, match="not supported with chain_method='threads'"):
+                pm.sample(chains=2, cores=2, chain_method="threads", checkpoint=str(tmp_path))
+            with pytest.raises(ValueError, match="can not be used with mp_buffer_size"):
+                pm.sample(chains=2, cores=2, mp_buffer_size=10, checkpoint=str(tmp_path))
+
+    def test_checkpoint_appends_draws(self, tmp_path):
+        with pm.Model() as model:
+            pm.Normal("x", shape=2)
+        strace = NDArray(model=model)
+        strace.setup(draws=6, chain=0)
+        for i in range(6):
+            strace.record({"x": np.full(2, float(i))})
+        directory = str(tmp_path)
+        point = {"x": np.full(2, 5.0)}
+        save_checkpoint(directory, 0, make_checkpoint(strace, 4, point, b"", None))
+        save_checkpoint(directory, 0, make_checkpoint(strace, 6, point, b"", None, start=4))
+        size = os.path.getsize(_draws_file(directory, 0))
+        # An interrupted update of the checkpoint leaves incomplete draws behind
+        with open(_draws_file(directory, 0), "ab") as f:
+            f.write(b"incomplete")
+
+        resume = load_checkpoint(directory, 0)
+        assert resume.draw == 6
+        assert resume.stats is None
+        npt.assert_array_equal(resume.samples["x"], strace.get_values("x"))
+        assert os.path.getsize(_draws_file(directory, 0)) == size
+
+    def test_load_step_state_in_place(self):
+        with self.model:
+            step = pm.NUTS()
+        potential = step.potential
+        step_state = dump_step_state(step)
+        step.potential._n_samples = 100
+        step.step_size = 0.0
+        load_step_state(step, step_state)
+        assert step.potential is potential
+        assert step.potential._n_samples == 0
+        assert step.step_size != 0.0
+
+    @pytest.mark.parametrize("chain_method", ["vectorized", "threads"])
+    def test_convergence_targets(self, chain_method, caplog):
+        with pm.Model():
+            pm.Normal("x", shape=2)
+            kwargs = dict(
+                tune=100,
+                chains=4,
+                cores=4,
+                chain_method=chain_method,
+                convergence_check_every=50,
+                compute_convergence_checks=False,
+                random_seed=3 if chain_method == "vectorized" else None,
+            )
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+                idata = pm.sample(
+                    draws=100, target_ess=50, target_rhat=1.1, max_draws=1000, **kwargs
+                )
+                # The targets are met long before the maximum number of draws
+                assert 100 <= idata.posterior.sizes["draw"] < 1000
+
+                with caplog.at_level(logging.WARNING):
+                    idata = pm.sample(draws=100, target_ess=1e6, max_draws=150, **kwargs)
+                assert idata.posterior.sizes["draw"] == 150
+                assert "did not reach the convergence targets" in caplog.text
+
+    def test_defer_deterministics(self):
+        with pm.Model(coords={"obs": range(3)}):
+            x = pm.Normal("x", shape=2)
+            s = pm.HalfNormal("s")
+            pm.Deterministic("y", 2 * x)
+            pm.Deterministic("z", s * at.ones(3), dims="obs")
+            kwargs = dict(
+                tune=20,
+                draws=30,
+                chains=2,
+                cores=1,
+                compute_convergence_checks=False,
+                random_seed=1,
+            )
+            expected = pm.sample(**kwargs)
+            idata = pm.sample(defer_deterministics=True, **kwargs)
+            selected = pm.sample(defer_deterministics=["y"], discard_tuned_samples=False, **kwargs)
+
+            with pytest.raises(ValueError, match="requires return_inferencedata=True"):
+                pm.sample(defer_deterministics=True, return_inferencedata=False, **kwargs)
+
+        for name in ("x", "s", "y", "z"):
+            assert idata.posterior[name].dims == expected.posterior[name].dims
+            npt.assert_allclose(idata.posterior[name], expected.posterior[name])
+        assert "z" not in selected.posterior
+        npt.assert_allclose(selected.posterior["y"], expected.posterior["y"])
+        npt.assert_allclose(selected.warmup_posterior["y"], 2 * selected.warmup_posterior["x"])
+
+    @pytest.mark.parametrize(
+        "cores, sample_kwargs",
+        [(1, {}), (2, {}), (2, {"mp_buffer_size": 4}), (2, {"chain_method": "vectorized"})],
+    )
+    def test_thin(self, cores, sample_kwargs):
+        with pm.Model():
+            x = pm.Normal("x", shape=2)
+            pm.Deterministic("y", 2 * x)
+            kwargs = dict(
+                tune=20,
+                draws=30,
+                chains=2,
+                cores=cores,
+                discard_tuned_samples=False,
+                compute_convergence_checks=False,
+                random_seed=4,
+                **sample_kwargs,
+            )
+            expected = pm.sample(**kwargs)
+            idata = pm.sample(thin=4, **kwargs)
+
+        # The last draws of the tuning and of the posterior are kept
+        for name in ("x", "y"):
+            npt.assert_array_equal(idata.posterior[name], expected.posterior[name][:, 1::4])
+            npt.assert_array_equal(
+                idata.warmup_posterior[name], expected.warmup_posterior[name][:, 3::4]
+            )
+        npt.assert_array_equal(
+            idata.sample_stats["energy"], expected.sample_stats["energy"][:, 1::4]
+        )
+
+    def test_var_names(self):
+        with pm.Model():
+            x = pm.Normal("x", shape=2)
+            pm.HalfNormal("s")
+            pm.Deterministic("y", 2 * x)
+            idata = pm.sample(
+                tune=10, draws=20, chains=1, var_names=["s", "y"], compute_convergence_checks=False
+            )
+            assert set(idata.posterior.data_vars) == {"s", "y"}
+
+            sent_names = set()
+
+            def callback(trace, draw):
+                sent_names.update(draw.point)
+
+            for mp_buffer_size in (None, 4):
+                idata = pm.sample(
+                    tune=10,
+                    draws=20,
+                    chains=2,
+                    cores=2,
+                    var_names=["y"],
+                    mp_buffer_size=mp_buffer_size,
+                    callback=callback,
+                    compute_convergence_checks=False,
+                )
+                assert set(idata.posterior.data_vars) == {"y"}
+                # The chain processes only send the values that y depends on
+                assert sent_names == {"x"}
+
+            with pytest.raises(ValueError, match="can not be recorded"):
+                pm.sample(var_names=["z"])
+            with pytest.raises(ValueError, match="thin must be a positive integer"):
+                pm.sample(thin=0)
+
+    @pytest.mark.parametrize(
+        "cores, sample_kwargs",
+        [(1, {}), (2, {}), (2, {"chain_method": "threads"}), (2, {"chain_method": "vectorized"})],
+    )
+    def test_discarded_tuning_is_not_recorded(self, cores, sample_kwargs):
+        # Sampling in threads is not reproducible
+        seeded = sample_kwargs.get("chain_method") != "threads"
+        with pm.Model():
+            pm.Normal("x", shape=2)
+            kwargs = dict(
+                tune=20,
+                draws=30,
+                chains=2,
+                cores=cores,
+                compute_convergence_checks=False,
+                random_seed=6 if seeded else None,
+                **sample_kwargs,
+            )
+            expected = pm.sample(discard_tuned_samples=False, **kwargs)
+            idata = pm.sample(**kwargs)
+            mtrace = pm.sample(return_inferencedata=False, **kwargs)
+
+        assert len(mtrace) == 30
+        assert mtrace.report.n_tune == 20
+        assert mtrace.report.n_draws == 30
+        assert idata.posterior.attrs["tuning_steps"] == 20
+        assert "warmup_posterior" not in idata
+        if seeded:
+            npt.assert_array_equal(idata.posterior["x"], expected.posterior["x"])
+            npt.assert_array_equal(mtrace.get_values("x", combine=False), expected.posterior["x"])
+
+    def test_convergence_targets_unsupported(self):
+        with self.model:
+            with pytest.raises(ValueError, match="require the chains to be sampled in parallel"):
+                pm.sample(chains=2, cores=1, target_ess=100)
+            with pytest.raises(ValueError, match="require chains <= cores"):
+                pm.sample(chains=4, cores=2, target_ess=100)
+            with pytest.raises(ValueError, match="max_draws must be at least draws"):
+                pm.sample(draws=100, chains=2, cores=2, target_rhat=1.01, max_draws=50)
+
     @pytest.mark.parametrize("symbolic_rv", (False, True))
     def test_deterministic_of_unobserved(self, symbolic_rv):
         with pm.Model() as model:
@@ -226,3 +226,257 @@ def test_spawn_densitydist_bound_method():
         with warnings.catch_warnings():
             warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
             pm.sample(draws=10, tune=10, step=pm.Metropolis(), cores=2, mp_ctx="spawn")
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 50])
+def test_iterator_buffered(buffer_size):
+    with pm.Model() as model:
+        a = pm.Normal("a", shape=1)
+        b = pm.HalfNormal("b")
+        step1 = pm.NUTS([model.rvs_to_values[a]])
+        step2 = pm.Metropolis([model.rvs_to_values[b]])
+
+    step = pm.CompoundStep([step1, step2])
+
+    start = {"a": floatX(np.array([1.0])), "b_log__": floatX(np.array(2.0))}
+    sampler = ps.ParallelSampler(
+        draws=10,
+        tune=10,
+        chains=3,
+        cores=2,
+        seeds=[2, 3, 4],
+        start_points=[start] * 3,
+        step_method=step,
+        progressbar=False,
+        buffer_size=buffer_size,
+    )
+    draw_idxs = {chain: [] for chain in range(3)}
+    with sampler:
+        for draw in sampler:
+            draw_idxs[draw.chain].append(draw.draw_idx)
+            assert draw.tuning == (draw.draw_idx < 10)
+            assert draw.is_last == (draw.draw_idx == 19)
+    assert all(idxs == list(range(20)) for idxs in draw_idxs.values())
+
+
+def test_buffered_sampling_matches_lockstep():
+    with pm.Model():
+        pm.Normal("x", shape=2)
+        pm.HalfNormal("y")
+        kwargs = dict(
+            draws=30,
+            tune=10,
+            chains=2,
+            cores=2,
+            random_seed=42,
+            return_inferencedata=False,
+            compute_convergence_checks=False,
+            progressbar=False,
+        )
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+            trace_lockstep = pm.sample(**kwargs)
+            trace_buffered = pm.sample(**kwargs, mp_buffer_size=4)
+
+    for chain in trace_lockstep.chains:
+        for var in ["x", "y"]:
+            np.testing.assert_array_equal(
+                trace_lockstep.get_values(var, chains=chain),
+                trace_buffered.get_values(var, chains=chain),
+            )
+        np.testing.assert_array_equal(
+            trace_lockstep.get_sampler_stats("energy", chains=chain),
+            trace_buffered.get_sampler_stats("energy", chains=chain),
+        )
+
+
+def test_buffered_remote_pipe_closed():
+    master_pid = os.getpid()
+    with pm.Model():
+        x = pm.Normal("x", shape=2, mu=0.1)
+        at_pid = at.as_tensor_variable(np.array(master_pid, dtype="int32"))
+        pm.Normal("y", mu=_crash_remote_process(x, at_pid), shape=2)
+
+        step = pm.Metropolis()
+        with pytest.raises(ps.ParallelSamplingError, match="Chain [0-9] failed with"):
+            pm.sample(
+                step=step,
+                mp_ctx="spawn",
+                tune=2,
+                draws=2,
+                cores=2,
+                chains=2,
+                mp_buffer_size=2,
+            )
+
+
+@pytest.mark.parametrize("mp_ctx", ["spawn", "fork"])
+def test_shared_trace_matches_lockstep(mp_ctx):
+    with pm.Model():
+        x = pm.Normal("x", shape=2)
+        pm.HalfNormal("y")
+        pm.Deterministic("z", x.sum())
+        kwargs = dict(
+            draws=30,
+            tune=10,
+            chains=3,
+            cores=2,
+            random_seed=42,
+            return_inferencedata=False,
+            compute_convergence_checks=False,
+            progressbar=False,
+            mp_ctx=mp_ctx,
+        )
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+            trace_lockstep = pm.sample(**kwargs)
+            trace_shared = pm.sample(**kwargs, mp_shared_trace=True)
+
+    assert trace_shared.nchains == 3
+    assert len(trace_shared) == 30
+    for chain in trace_lockstep.chains:
+        for var in ["x", "y_log__", "y", "z"]:
+            np.testing.assert_array_equal(
+                trace_lockstep.get_values(var, chains=chain),
+                trace_shared.get_values(var, chains=chain),
+            )
+        for stat in ["energy", "diverging", "tune", "warning"]:
+            np.testing.assert_array_equal(
+                trace_lockstep.get_sampler_stats(stat, chains=chain),
+                trace_shared.get_sampler_stats(stat, chains=chain),
+            )
+
+
+def test_shared_trace_rejects_buffer_size():
+    with pm.Model():
+        pm.Normal("x")
+        with pytest.raises(ValueError, match="can not be combined"):
+            pm.sample(
+                draws=2,
+                tune=2,
+                chains=2,
+                cores=2,
+                mp_buffer_size=2,
+                mp_shared_trace=True,
+            )
+
+
+def test_thread_local_copy():
+    with pm.Model() as model:
+        data = pm.MutableData("data", np.ones(2))
+        x = pm.Normal("x", data, shape=2)
+        k = pm.Poisson("k", 3)
+        nuts = pm.NUTS([x])
+        metropolis = pm.Metropolis([k])
+    step = pm.CompoundStep([nuts, metropolis])
+
+    step_copy = ps.thread_local_copy(step)
+    nuts_copy, metropolis_copy = step_copy.methods
+
+    assert nuts_copy is not nuts
+    assert nuts_copy._model is model
+    assert nuts_copy.vars == nuts.vars
+    assert nuts_copy.potential is not nuts.potential
+    assert nuts_copy.integrator._potential is nuts_copy.potential
+    assert nuts_copy.integrator._logp_dlogp_func is nuts_copy._logp_dlogp_func
+
+    fn = nuts._logp_dlogp_func._pytensor_function
+    fn_copy = nuts_copy._logp_dlogp_func._pytensor_function
+    assert fn_copy is not fn
+    assert fn_copy.maker.linker is not None
+
+    # Data containers are shared by all threads
+    (i,) = [i for i, inp in enumerate(fn.maker.inputs) if inp.variable is data]
+    assert fn_copy.maker.inputs[i].variable is data
+    assert fn_copy.input_storage[i] is fn.input_storage[i] is data.container
+
+    # Shared variables that hold the values of other variables are not shared
+    assert nuts_copy.shared["k"] is not nuts.shared["k"]
+    assert nuts_copy.shared["k"] is nuts_copy._logp_dlogp_func._extra_vars_shared["k"]
+    nuts_copy.shared["k"].set_value(np.array(10))
+    assert nuts.shared["k"].get_value() == 3
+    point = {"x": floatX(np.zeros(2)), "k": np.array(10)}
+    nuts_copy._logp_dlogp_func.set_extra_values(point)
+    nuts._logp_dlogp_func.set_extra_values({"k": np.array(3)})
+    logp_copy, _ = nuts_copy._logp_dlogp_func(
+        pm.blocking.DictToArrayBijection.map({"x": point["x"]})
+    )
+    logp, _ = nuts._logp_dlogp_func(pm.blocking.DictToArrayBijection.map({"x": point["x"]}))
+    assert logp_copy < logp
+    nuts_copy._logp_dlogp_func.set_extra_values({"k": np.array(3)})
+    logp_copy, _ = nuts_copy._logp_dlogp_func(
+        pm.blocking.DictToArrayBijection.map({"x": point["x"]})
+    )
+    assert logp_copy == logp
+
+    assert metropolis_copy.logp is not metropolis.logp
+    assert metropolis_copy.logp.trust_input
+    assert metropolis_copy._current_logp is not metropolis._current_logp
+
+
+@pytest.mark.parametrize("mp_ctx", ["spawn", "fork"])
+def test_sampler_pool_reused_with_new_data(mp_ctx):
+    with pm.Model() as model:
+        mu = pm.MutableData("mu", np.zeros(2))
+        pm.Normal("x", mu, 0.1, shape=2)
+        step = pm.Metropolis()
+
+        with ps.SamplerPool(step, cores=2, mp_ctx=mp_ctx) as pool:
+            processes = list(pool._processes)
+            idata = pm.sample(draws=200, tune=100, chains=3, pool=pool, random_seed=1)
+            assert idata.posterior.x.shape == (3, 200, 2)
+            assert np.abs(idata.posterior.x.mean()) < 0.1
+
+            pm.set_data({"mu": np.array([10.0, -10.0])})
+            idata2 = pm.sample(draws=200, tune=100, chains=3, pool=pool, random_seed=1)
+            np.testing.assert_allclose(
+                idata2.posterior.x.mean(("chain", "draw")), [10, -10], atol=0.1
+            )
+            # The same workers sampled both runs
+            assert pool._processes == processes
+            assert all(process.is_alive() for process in processes)
+
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_sampler_pool_ring_buffer():
+    with pm.Model():
+        pm.Normal("x", shape=2)
+        pm.Normal("z")
+        step = pm.Metropolis()
+
+        with ps.SamplerPool(step, cores=2, mp_ctx="spawn", buffer_size=2) as pool:
+            with pytest.raises(ValueError, match="step and cores can not be combined"):
+                pm.sample(draws=10, tune=10, chains=2, pool=pool, cores=2)
+            with pytest.raises(ValueError, match="step and cores can not be combined"):
+                pm.sample(draws=10, tune=10, chains=2, pool=pool, step=step)
+
+            # The chains write many more draws than the ring buffers have slots
+            idata = pm.sample(draws=50, tune=10, chains=3, pool=pool, var_names=["x"])
+    assert idata.posterior.x.shape == (3, 50, 2)
+    assert "z" not in idata.posterior
+    assert len(np.unique(idata.posterior.x.values[..., 0])) > 10
+
+
+@as_op([at_vector, at.dscalar], [at_vector])
+def _fail_if_set(a, fail):
+    if fail:
+        raise ValueError("Failing on request")
+    return np.array(a)
+
+
+def test_sampler_pool_survives_chain_error():
+    with pm.Model() as model:
+        fail = pm.MutableData("fail", 1.0)
+        x = pm.Normal("x", shape=2)
+        pm.Normal("y", _fail_if_set(x, fail), 1, observed=[1, 2])
+        step = pm.Metropolis()
+        model.check_start_vals = lambda start: None
+
+        with ps.SamplerPool(step, cores=2, mp_ctx="spawn") as pool:
+            with pytest.raises(ps.ParallelSamplingError, match="Failing on request"):
+                pm.sample(draws=10, tune=10, chains=2, pool=pool)
+
+            pm.set_data({"fail": 0.0})
+            idata = pm.sample(draws=10, tune=10, chains=2, pool=pool)
+            assert idata.posterior.x.shape == (2, 10, 2)
@@ -24,7 +24,7 @@ import pymc as pm
 
 from pymc.backends.base import MultiTrace
 from pymc.pytensorf import floatX
-from pymc.smc.kernels import IMH, systematic_resampling
+from pymc.smc.kernels import IMH, MH, systematic_resampling
 from pymc.tests.helpers import SeededTest, assert_random_state_equal
 
 
@@ -103,6 +103,28 @@ class TestSMC(SeededTest):
         assert np.isclose(smc.prior_logp_func(floatX(np.array([0.51]))), np.log(0.7))
         assert smc.prior_logp_func(floatX(np.array([1.51]))) == -np.inf
 
+    @pytest.mark.parametrize("kernel", [IMH, MH])
+    def test_vectorized_logp(self, kernel):
+        with pm.Model() as m:
+            z = pm.Bernoulli("z", p=0.7)
+            x = pm.Normal("x", z, 1, shape=2)
+            pm.Normal("y", x, 1, observed=[0.3, -0.2])
+
+        smc = kernel(draws=50, model=m, vectorized=True, random_seed=1)
+        smc._initialize_kernel()
+
+        assert smc.prior_logp.shape == (50,)
+        assert smc.likelihood_logp.shape == (50,)
+        for particle, prior, likelihood in zip(
+            smc.tempered_posterior, smc.prior_logp, smc.likelihood_logp
+        ):
+            np.testing.assert_allclose(prior, smc.prior_logp_func(particle), rtol=1e-6)
+            np.testing.assert_allclose(likelihood, smc.likelihood_logp_func(particle), rtol=1e-6)
+
+        with m:
+            idata = pm.sample_smc(draws=100, chains=1, kernel=kernel, vectorized=True)
+        assert idata.posterior.sizes["draw"] == 100
+
     def test_unobserved_bernoulli(self):
         n = 10
         rng = self.get_random_state()
@@ -104,3 +104,49 @@ class TestComputeLogLikelihood:
             idata = InferenceData(posterior=dict_to_dataset({"x": np.arange(100).reshape(4, 25)}))
             with pytest.raises(ValueError, match="var_names must refer to observed_RVs"):
                 compute_log_likelihood(idata, var_names=["x"])
+
+    @pytest.mark.parametrize(
+        "chunk_size, max_memory",
+        [(7, None), (None, 10 * 5 * 8), (100, 3 * 5 * 8), (1000, None)],
+    )
+    def test_chunked(self, chunk_size, max_memory):
+        with Model() as m:
+            x = Normal("x")
+            s = Dirichlet("s", a=np.ones(2))
+            y1 = Normal("y1", x, observed=[0, 1, 2])
+            y2 = Normal("y2", x + s[0], observed=[3, 4])
+
+        rng = np.random.default_rng(7)
+        idata = InferenceData(
+            posterior=dict_to_dataset(
+                {
+                    "x": rng.normal(size=(4, 25)),
+                    "s": st.dirichlet(np.ones(2)).rvs((4, 25), random_state=rng),
+                }
+            )
+        )
+        expected = compute_log_likelihood(
+            idata, model=m, extend_inferencedata=False, progressbar=False
+        )
+        res = compute_log_likelihood(
+            idata,
+            model=m,
+            extend_inferencedata=False,
+            progressbar=False,
+            chunk_size=chunk_size,
+            max_memory=max_memory,
+            dtype="float32",
+        )
+        assert res.dims == expected.dims
+        for name in ("y1", "y2"):
+            assert res[name].dtype == np.float32
+            np.testing.assert_allclose(res[name].values, expected[name].values, rtol=1e-6)
+
+    def test_invalid_chunk_size(self):
+        with Model() as m:
+            x = Normal("x")
+            y = Normal("y", x, observed=[0, 1, 2])
+
+        idata = InferenceData(posterior=dict_to_dataset({"x": np.arange(100).reshape(4, 25)}))
+        with pytest.raises(ValueError, match="chunk_size must be a positive integer"):
+            compute_log_likelihood(idata, model=m, chunk_size=0)
@@ -74,6 +74,17 @@ def test_leapfrog_reversible():
             npt.assert_allclose(state.q.data, start.q.data, rtol=1e-5)
             npt.assert_allclose(state.p.data, start.p.data, rtol=1e-5)
 
+    # The step can write into preallocated arrays
+    out = step.integrator.step(0.1, start)
+    buffers = [out.q.data, out.p.data, out.v, out.q_grad]
+    expected = step.integrator.step(0.1, start)
+    state = step.integrator.step(0.1, start, out=out)
+    assert all(a is b for a, b in zip(buffers, [state.q.data, state.p.data, state.v, state.q_grad]))
+    npt.assert_allclose(state.q.data, expected.q.data)
+    npt.assert_allclose(state.p.data, expected.p.data)
+    npt.assert_allclose(state.q_grad, expected.q_grad)
+    npt.assert_allclose(state.energy, expected.energy)
+
 
 def test_nuts_tuning():
     with pm.Model():
@@ -89,3 +100,55 @@ def test_nuts_tuning():
     ss_tuned = idata.warmup_sample_stats["step_size"][0, -1]
     ss_posterior = idata.sample_stats["step_size"][0, :]
     np.testing.assert_array_equal(ss_posterior, ss_tuned)
+
+
+@pytest.mark.parametrize("step_method", [pm.NUTS, HamiltonianMC])
+def test_reuse_last_state(step_method):
+    with pm.Model() as model:
+        pm.Normal("x", shape=3)
+        step = step_method()
+
+    n_evals = 0
+    compute_state = step.integrator.compute_state
+
+    def counting_compute_state(q, p):
+        nonlocal n_evals
+        n_evals += 1
+        return compute_state(q, p)
+
+    step.integrator.compute_state = counting_compute_state
+    point = model.initial_point()
+    for _ in range(5):
+        point, _ = step.step(point)
+    assert n_evals == 1
+
+    # A new point, as set by another step method, is evaluated again
+    point = {"x": point["x"] + 1}
+    step.step(point)
+    assert n_evals == 2
+
+
+def test_last_state_invalidated_by_other_step():
+    with pm.Model() as model:
+        k = pm.Bernoulli("k", 0.5)
+        x = pm.Normal("x", mu=10 * k)
+        step = pm.NUTS([x])
+
+    n_evals = 0
+    compute_state = step.integrator.compute_state
+
+    def counting_compute_state(q, p):
+        nonlocal n_evals
+        n_evals += 1
+        return compute_state(q, p)
+
+    step.integrator.compute_state = counting_compute_state
+    point = model.initial_point()
+    point, _ = step.step(point)
+    point, _ = step.step(point)
+    assert n_evals == 1
+
+    # The logp at the same position changes with the value of `k`
+    point["k"] = 1 - point["k"]
+    step.step(point)
+    assert n_evals == 2
@@ -25,6 +25,7 @@ import pymc as pm
 from pymc.exceptions import SamplingError
 from pymc.pytensorf import floatX
 from pymc.step_methods.hmc import NUTS
+from pymc.step_methods.hmc.nuts import _TreeBuffers
 from pymc.tests import sampler_fixtures as sf
 from pymc.tests.helpers import RVsAssignmentStepsTester, StepMethodTester
 
@@ -185,6 +186,32 @@ class TestNutsCheckTrace:
         assert (trace.model_logp == model_logp_).all()
 
 
+def test_tree_buffers_are_reused():
+    with pm.Model() as model:
+        pm.Normal("x", shape=5)
+        pm.StudentT("y", nu=3)
+        reused = NUTS(adapt_step_size=False)
+        fresh = NUTS(adapt_step_size=False)
+    reused.tune = fresh.tune = False
+
+    point_reused = point_fresh = model.initial_point()
+    for i in range(20):
+        np.random.seed(i)
+        point_reused, stats_reused = reused.step(point_reused)
+        fresh._tree_buffers = _TreeBuffers()
+        np.random.seed(i)
+        point_fresh, stats_fresh = fresh.step(point_fresh)
+
+        # Reusing the arrays of earlier trees does not change the trajectories
+        for name in point_fresh:
+            np.testing.assert_array_equal(point_reused[name], point_fresh[name])
+        for name in ("energy", "tree_size", "index_in_trajectory"):
+            assert stats_reused[0][name] == stats_fresh[0][name]
+
+    # The pools only hold the states that a tree needs at the same time
+    assert len(reused._tree_buffers._states) <= 2 * reused.max_treedepth + 4
+
+
 class TestStepNUTS(StepMethodTester):
     @pytest.mark.parametrize(
         "step_fn, draws",
@@ -0,0 +1,107 @@
+#   Copyright 2020 The PyMC Developers
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import warnings
+
+import numpy as np
+import pytest
+
+import pymc as pm
+
+from pymc.blocking import DictToArrayBijection, RaveledVars
+from pymc.step_methods.hmc import NUTS
+from pymc.step_methods.hmc.vectorized import VectorizedNUTS, batched_logp_dlogp_function
+
+
+def test_batched_logp_dlogp_function():
+    with pm.Model() as model:
+        x = pm.Normal("x", shape=2)
+        pm.HalfNormal("s")
+        pm.Normal("obs", x, 1, observed=[0.3, -1.2])
+
+    value_vars = model.value_vars
+    fn = model.logp_dlogp_function()
+    fn.set_extra_values({})
+    batch_fn = batched_logp_dlogp_function(model, value_vars)
+
+    rng = np.random.default_rng(42)
+    point = model.initial_point()
+    qs = []
+    for _ in range(4):
+        q = DictToArrayBijection.map({v.name: point[v.name] for v in value_vars})
+        qs.append(RaveledVars(q.data + rng.normal(size=q.data.shape), q.point_map_info))
+    logps, dlogps = batch_fn(np.stack([q.data for q in qs]).astype(fn.dtype))
+
+    assert logps.shape == (4,)
+    assert dlogps.shape == (4, 3)
+    for q, logp, dlogp in zip(qs, logps, dlogps):
+        expected_logp, expected_dlogp = fn(q)
+        np.testing.assert_allclose(logp, expected_logp, rtol=1e-6)
+        np.testing.assert_allclose(dlogp, expected_dlogp, rtol=1e-6)
+
+
+def test_sample_vectorized():
+    with pm.Model():
+        x = pm.Normal("x", shape=2)
+        pm.Deterministic("y", 2 * x)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+            idata = pm.sample(
+                draws=50,
+                tune=50,
+                chains=5,
+                chain_method="vectorized",
+                random_seed=2023,
+                compute_convergence_checks=False,
+            )
+    assert idata.posterior.sizes["chain"] == 5
+    assert idata.posterior.sizes["draw"] == 50
+    assert "diverging" in idata.sample_stats
+    np.testing.assert_allclose(idata.posterior["y"], 2 * idata.posterior["x"])
+    # Every chain runs its own trajectory and adaptation
+    x_draws = idata.posterior["x"].values
+    assert not np.all(x_draws[0] == x_draws[1])
+    step_sizes = idata.sample_stats["step_size"].values[:, -1]
+    assert len(np.unique(step_sizes)) > 1
+
+
+def test_sample_vectorized_seeding():
+    with pm.Model():
+        pm.Normal("x", shape=2)
+        kwargs = dict(
+            draws=10,
+            tune=10,
+            chains=3,
+            chain_method="vectorized",
+            compute_convergence_checks=False,
+        )
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", ".*number of samples.*", UserWarning)
+            idata1 = pm.sample(random_seed=2023, **kwargs)
+            np.random.seed(1)
+            idata2 = pm.sample(random_seed=2023, **kwargs)
+            idata3 = pm.sample(random_seed=2024, **kwargs)
+    # Every chain only depends on its own seed, not on the global random state
+    np.testing.assert_array_equal(idata1.posterior["x"], idata2.posterior["x"])
+    assert not np.array_equal(idata1.posterior["x"], idata3.posterior["x"])
+
+
+def test_vectorized_requires_nuts_for_all_vars():
+    with pm.Model():
+        x = pm.Normal("x")
+        y = pm.Normal("y")
+        with pytest.raises(ValueError, match="only supported for NUTS"):
+            VectorizedNUTS(pm.Metropolis([x, y]), chains=2)
+        with pytest.raises(ValueError, match="all free variables"):
+            VectorizedNUTS(NUTS([x]), chains=2)
@@ -24,12 +24,15 @@ import pymc as pm
 
 from pymc.step_methods.metropolis import (
     BinaryGibbsMetropolis,
+    BinaryMetropolis,
     CategoricalGibbsMetropolis,
     DEMetropolis,
     DEMetropolisZ,
     Metropolis,
     MultivariateNormalProposal,
     NormalProposal,
+    delta_logp,
+    markov_blanket_logp,
 )
 from pymc.tests import sampler_fixtures as sf
 from pymc.tests.helpers import (
@@ -130,6 +133,64 @@ class TestMetropolis:
                 step = pm.Metropolis([batched_dist])
                 assert not step.elemwise_update
 
+    @pytest.mark.parametrize(
+        "step_fn",
+        [
+            lambda x, k: Metropolis([x]),
+            lambda x, k: DEMetropolisZ([x]),
+            lambda x, k: BinaryMetropolis([k]),
+            lambda x, k: BinaryGibbsMetropolis([k]),
+            lambda x, k: CategoricalGibbsMetropolis([k]),
+        ],
+    )
+    def test_current_logp(self, step_fn):
+        with pm.Model() as model:
+            k = pm.Bernoulli("k", 0.3, shape=3)
+            x = pm.Normal("x", mu=k, shape=3)
+            step = step_fn(x, k)
+        # The step methods only evaluate the logp terms that depend on their variables
+        logp = markov_blanket_logp(model, step.vars)
+
+        point = model.initial_point()
+        for _ in range(5):
+            point, _ = step.step(point)
+            npt.assert_allclose(step._current_logp.logp, logp(point))
+
+        # Change the variables sampled by another step method
+        other = "k" if step.vars[0].name == "x" else "x"
+        point[other] = 1 - point[other]
+        point, _ = step.step(point)
+        npt.assert_allclose(step._current_logp.logp, logp(point))
+
+    def test_markov_blanket_logp(self):
+        with pm.Model() as model:
+            mu = pm.Normal("mu")
+            k = pm.Bernoulli("k", 0.5, shape=2)
+            pm.Normal("y", mu + k, observed=[0.5, 1.0])
+            pm.Normal("z", 2 * mu)
+            step = BinaryGibbsMetropolis([k])
+
+        (logp,) = step.fs
+        full_logp = model.compile_logp()
+        point = model.initial_point()
+        point_k = {**point, "k": np.array([1, 0])}
+        npt.assert_allclose(
+            logp(point_k) - logp(point), full_logp(point_k) - full_logp(point), rtol=1e-6
+        )
+        # The logp of z does not depend on k
+        point_z = {**point, "z": np.array(3.0)}
+        npt.assert_allclose(logp(point_z), logp(point))
+        # Only the variables in the Markov blanket are compared between steps
+        assert step._current_logp.other_names == ["mu"]
+
+    def test_delta_logp_deprecated(self):
+        with pm.Model() as model:
+            x = pm.Normal("x", shape=2)
+        point = model.initial_point()
+        with pytest.warns(FutureWarning, match="delta_logp has been deprecated"):
+            f = delta_logp(point, model.logp(), [model.rvs_to_values[x]], {})
+        npt.assert_allclose(f(np.ones(2), np.zeros(2)), -1.0)
+
 
 class TestDEMetropolis:
     def test_demcmc_tune_parameter(self):
@@ -11,6 +11,8 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+from unittest import mock
+
 import cloudpickle
 import numpy as np
 import pytensor
@@ -172,6 +174,16 @@ class TestInitvalEvaluation:
         assert fn(0) == fn(0)
         assert fn(0) != fn(1)
 
+    def test_seeding_of_cached_function(self):
+        with pm.Model() as pmodel:
+            A = pm.HalfFlat("A", initval="moment")
+        make_initial_point_fn(model=pmodel, jitter_rvs={A})
+        # The second function is a copy of the first one, that uses its own RNGs
+        with mock.patch.object(pytensor, "function", side_effect=AssertionError):
+            fn = make_initial_point_fn(model=pmodel, jitter_rvs={A})
+        assert fn(0) == fn(0)
+        assert fn(0) != fn(1)
+
     def test_respects_overrides(self):
         with pm.Model() as pmodel:
             A = pm.Flat("A", initval="moment")
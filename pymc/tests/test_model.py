@@ -17,6 +17,8 @@ import traceback
 import unittest
 import warnings
 
+from unittest import mock
+
 import arviz as az
 import cloudpickle
 import numpy as np
@@ -321,6 +323,30 @@ class TestValueGradFunction(unittest.TestCase):
         assert val == 21
         npt.assert_allclose(grad, [5, 5, 5, 1, 1, 1, 1, 1, 1])
 
+    def test_grad_ravel_inputs(self):
+        f_grad = ValueGradFunction(
+            [self.cost],
+            [self.val1, self.val2],
+            {self.extra1: self.extra1_},
+            ravel_inputs=True,
+            initial_point={"val1": self.val1_, "val2": self.val2_},
+            mode="FAST_COMPILE",
+        )
+        f_grad.set_extra_values({"extra1": 5})
+        q = np.arange(9, dtype=f_grad.dtype)
+        val, grad = f_grad(q)
+        assert val == 5 * 3 + 33
+        npt.assert_allclose(grad, [5, 5, 5, 1, 1, 1, 1, 1, 1])
+
+        # The gradient is written into the buffer of the caller
+        grad_out = np.zeros(9, dtype=f_grad.dtype)
+        val = f_grad(RaveledVars(q, ()), grad_out=grad_out)
+        assert val == 5 * 3 + 33
+        npt.assert_allclose(grad_out, grad)
+
+        with pytest.raises(ValueError, match="initial_point is required"):
+            ValueGradFunction([self.cost], [self.val1, self.val2], {}, ravel_inputs=True)
+
     @pytest.mark.xfail(reason="Test not refactored for v4")
     def test_edge_case(self):
         # Edge case discovered in #2948
@@ -410,6 +436,44 @@ def test_multiple_observed_rv():
     assert model["x"] not in model.value_vars
 
 
+def test_logp_dlogp_function_ravel_inputs():
+    with pm.Model() as model:
+        pm.Normal("x", shape=(2, 3))
+        pm.HalfNormal("s")
+        pm.Normal("y", observed=1)
+
+    func = model.logp_dlogp_function()
+    func.set_extra_values({})
+    func_raveled = model.logp_dlogp_function(ravel_inputs=True)
+    func_raveled.set_extra_values({})
+
+    q = DictToArrayBijection.map(model.initial_point())
+    q = RaveledVars(np.linspace(-1, 1, 7).astype(func.dtype), q.point_map_info)
+    logp, dlogp = func(q)
+    logp_raveled, dlogp_raveled = func_raveled(q)
+    npt.assert_allclose(logp_raveled, logp)
+    npt.assert_allclose(dlogp_raveled, dlogp)
+
+
+@pytest.mark.parametrize("ravel_inputs", [False, True])
+def test_logp_dlogp_function_reused_after_resizing_data(ravel_inputs):
+    with pm.Model() as model:
+        data = pm.MutableData("data", np.zeros(3))
+        pm.Normal("x")
+        pm.Normal("y", model["x"], observed=data)
+
+    model.logp_dlogp_function(ravel_inputs=ravel_inputs)
+    model.set_data("data", np.ones(5))
+    with mock.patch.object(pytensor, "function", side_effect=AssertionError):
+        func = model.logp_dlogp_function(ravel_inputs=ravel_inputs)
+    func.set_extra_values({})
+
+    q = DictToArrayBijection.map({"x": np.array(0.5, dtype=func.dtype)})
+    logp, dlogp = func(q)
+    npt.assert_allclose(logp, st.norm.logpdf(0.5) + 5 * st.norm.logpdf(0.5), rtol=1e-6)
+    npt.assert_allclose(dlogp, [-0.5 - 5 * (0.5 - 1)], rtol=1e-6)
+
+
 def test_tempered_logp_dlogp():
     with pm.Model() as model:
         pm.Normal("x")
@@ -1058,6 +1122,57 @@ def test_compile_fn():
     np.testing.assert_allclose(result_compute, result_expect)
 
 
+def test_compiled_functions_are_cached():
+    with pm.Model() as m:
+        data = pm.MutableData("data", np.zeros(3))
+        x = pm.Normal("x", 0, 1)
+        pm.Normal("y", x, 1, observed=data)
+
+    no_compilation = mock.patch.object(pm.Model, "compile_fn", side_effect=AssertionError)
+
+    logp_fn = m.compile_logp()
+    m.compile_dlogp()
+    with no_compilation:
+        logp_copy = m.compile_logp()
+        m.compile_dlogp()
+        with pytest.raises(AssertionError):
+            m.compile_logp(jacobian=False)
+        with pytest.raises(AssertionError):
+            m.compile_logp(vars=[x])
+    np.testing.assert_allclose(logp_fn({"x": 0.0}), 4 * st.norm.logpdf(0.0))
+
+    # Every caller gets its own copy of the cached function
+    assert logp_copy is not logp_fn
+    logp_copy.f.trust_input = True
+    assert not logp_fn.f.trust_input
+
+    # Changing the values of data does not require a new function
+    m.set_data("data", np.ones(3))
+    with no_compilation:
+        logp_fn = m.compile_logp()
+    np.testing.assert_allclose(logp_fn({"x": 0.0}), st.norm.logpdf(0.0) + 3 * st.norm.logpdf(1.0))
+
+    # But changing their shape, or adding variables does
+    m.set_data("data", np.ones(4))
+    with no_compilation:
+        with pytest.raises(AssertionError):
+            m.compile_logp()
+    np.testing.assert_allclose(
+        m.compile_logp()({"x": 0.0}), st.norm.logpdf(0.0) + 4 * st.norm.logpdf(1.0)
+    )
+    with m:
+        pm.Normal("z", 0, 1)
+    with no_compilation:
+        with pytest.raises(AssertionError):
+            m.compile_logp()
+    assert set(m.point_logps()) == {"x", "y", "z"}
+
+    # Initial values can be changed without adding variables
+    assert m.initial_point()["x"] == 0
+    m.rvs_to_initial_values[x] = 1.5
+    assert m.initial_point()["x"] == 1.5
+
+
 def test_model_pytensor_config():
     assert pytensor.config.mode != "JAX"
     with pm.Model(pytensor_config=dict(mode="JAX")) as model:
@@ -24,7 +24,12 @@ from pytensor.tensor.var import TensorConstant
 import pymc as pm
 
 from pymc.exceptions import ImputationWarning
-from pymc.model_graph import ModelGraph, model_to_graphviz, model_to_networkx
+from pymc.model_graph import (
+    ModelGraph,
+    markov_blanket_terms,
+    model_to_graphviz,
+    model_to_networkx,
+)
 from pymc.tests.helpers import SeededTest
 
 
@@ -405,5 +410,23 @@ class TestVariableSelection:
         assert mg.make_compute_graph(var_names=var_names) == compute_graph
 
 
+@pytest.mark.parametrize(
+    "var_names, terms",
+    [
+        (["a"], ["a", "c", "L"]),
+        (["c"], ["c"]),
+        (["a", "c"], ["a", "c", "L"]),
+    ],
+)
+def test_markov_blanket_terms(var_names, terms):
+    model = model_with_different_descendants()
+    with model:
+        pm.Potential("pot", model["c"] ** 2)
+    if "c" in var_names:
+        terms = terms + ["pot"]
+    value_vars = [model.rvs_to_values[model[name]] for name in var_names]
+    assert [term.name for term in markov_blanket_terms(model, value_vars)] == terms
+
+
 class TestModelNonRandomVariableRVs(BaseModelGraphTest):
     model_func = model_non_random_variable_rvs
@@ -11,6 +11,9 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import gc
+import weakref
+
 from unittest import mock
 
 import numpy as np
@@ -46,6 +49,7 @@ from pymc.pytensorf import (
     replace_rvs_by_values,
     reseed_rngs,
     rvs_to_value_vars,
+    set_compile_cache_dir,
     walk_model,
 )
 from pymc.tests.helpers import assert_no_rvs
@@ -454,6 +458,80 @@ class TestCompilePyMC:
         with pytest.raises(ValueError, match=msg):
             compile_pymc([], [x, y])
 
+    def test_cache(self, tmp_path, monkeypatch):
+        def make_graph():
+            data = pytensor.shared(np.arange(3.0), name="data")
+            rng = pytensor.shared(np.random.default_rng(), name="rng")
+            x = at.scalar("x")
+            y = at.random.normal(x * data, rng=rng)
+            return data, x, [(x * data).sum(), y]
+
+        # Without a cache directory nothing is stored
+        data, x, outputs = make_graph()
+        compile_pymc([x], outputs, cache=True)
+
+        set_compile_cache_dir(tmp_path)
+        try:
+            fn = compile_pymc([x], outputs, cache=True)
+            assert len(list(tmp_path.glob("*.pkl"))) == 1
+            assert not list(tmp_path.glob("*.tmp"))
+
+            # A new graph with the same structure loads the function without compiling it
+            data, x, outputs = make_graph()
+            with mock.patch.object(pytensor, "function", side_effect=AssertionError):
+                cached_fn = compile_pymc([x], outputs, cache=True, random_seed=1)
+            assert cached_fn(2.0)[0] == fn(2.0)[0] == 6.0
+
+            # The loaded function uses the shared variables of the new graph
+            data.set_value(np.full(3, 2.0))
+            assert cached_fn(2.0)[0] == 12.0
+            assert fn(2.0)[0] == 6.0
+            draws = cached_fn(2.0)[1], cached_fn(2.0)[1]
+            assert not np.array_equal(*draws)
+            npt.assert_array_equal(
+                compile_pymc([x], outputs, cache=True, random_seed=1)(2.0)[1],
+                compile_pymc([x], outputs, random_seed=1)(2.0)[1],
+            )
+
+            # Different constants lead to a different entry
+            x = at.scalar("x")
+            compile_pymc([x], x * 2, cache=True)
+            compile_pymc([x], x * 3, cache=True)
+            assert len(list(tmp_path.glob("*.pkl"))) == 3
+        finally:
+            set_compile_cache_dir(None)
+
+    def test_cache_in_memory(self):
+        with pm.Model() as m:
+            data = pm.MutableData("data", np.arange(3.0))
+            x = pm.Normal("x")
+            y = pm.Normal("y", x * data)
+        fn = compile_pymc([x], [(x * data).sum(), y], cache=True)
+        assert fn(2.0)[1].shape == (3,)
+
+        # Resizing the data does not require compiling the function again
+        m.set_data("data", np.arange(5.0))
+        with mock.patch.object(pytensor, "function", side_effect=AssertionError):
+            resized_fn = compile_pymc([x], [(x * data).sum(), y], cache=True)
+        assert resized_fn is not fn
+        assert resized_fn(2.0)[0] == 20.0
+        assert resized_fn(2.0)[1].shape == (5,)
+
+        # Changes of the returned functions are not passed on to later copies
+        resized_fn.trust_input = True
+        assert not compile_pymc([x], [(x * data).sum(), y], cache=True).trust_input
+
+    def test_cache_in_memory_does_not_keep_data(self):
+        data = pytensor.shared(np.arange(3.0), name="data")
+        x = at.scalar("x")
+        data_ref = weakref.ref(data.get_value(borrow=True))
+        fn = compile_pymc([x], (x * data).sum(), cache=True)
+        assert fn(2.0) == 6.0
+
+        del fn, data
+        gc.collect()
+        assert data_ref() is None
+
 
 def test_replace_rng_nodes():
     rng = pytensor.shared(np.random.default_rng())